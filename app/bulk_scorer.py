@@ -0,0 +1,420 @@
+"""Offline bulk scoring of local audio files, without the web stack."""
+import gc
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from app.prefork import pin_threads, worker_threads
+from app.services.audio_cache import DecodedAudioCache
+from app.services.audio_preprocessor import AudioPreprocessor
+from app.services.detection_pipeline import MAX_DURATION_SECONDS
+from app.services.inference_service import InferenceService, preload_model
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".mp3", ".ogg", ".opus", ".m4a", ".aac", ".aif", ".aiff")
+
+
+def find_audio_files(root: str, extensions: Iterable[str] = AUDIO_EXTENSIONS) -> Iterator[str]:
+    """Audio files under ``root``, in a stable (sorted) order."""
+    extensions = tuple(ext.lower() for ext in extensions)
+    for directory, subdirs, files in os.walk(root):
+        subdirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(extensions):
+                yield os.path.join(directory, name)
+
+
+def read_manifest(path: str) -> Iterator[str]:
+    """
+    Audio paths listed in a manifest.
+
+    Each line is either a path or a JSON object with a ``path`` key; blank
+    lines and ``#`` comments are skipped. Relative paths are resolved
+    against the manifest's directory.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                try:
+                    line = json.loads(line)["path"]
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    raise ValueError(f"{path}:{number}: expected a JSON object with a 'path' key")
+            yield os.path.join(base, line)
+
+
+class JsonlResultWriter:
+    """
+    Appends results to a JSON Lines file, one object per scored file.
+
+    Every ``write`` is flushed, so an interrupted run loses nothing that was
+    reported as written. On resume, a truncated last line left by a crash
+    is dropped and the file is appended to.
+    """
+
+    def __init__(self, path: str, resume: bool = True):
+        self.path = path
+        self.results: Dict[str, bool] = {}
+        if resume and os.path.exists(path):
+            self._load()
+            self._file = open(path, "a", encoding="utf-8")
+        else:
+            self._file = open(path, "w", encoding="utf-8")
+
+    def _load(self) -> None:
+        with open(self.path, "rb+") as f:
+            good = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                self.results[record["path"]] = "error" not in record
+                good += len(line)
+            if good != f.seek(0, os.SEEK_END):
+                logger.warning(f"Dropping incomplete results at the end of {self.path}")
+                f.truncate(good)
+
+    def write(self, records: List[dict]) -> None:
+        self._file.write("".join(json.dumps(record) + "\n" for record in records))
+        self._file.flush()
+        for record in records:
+            self.results[record["path"]] = "error" not in record
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetResultWriter:
+    """
+    Writes results as a directory of Parquet part files (one dataset).
+
+    Rows are buffered and written every ``rows_per_file`` rows as a new
+    part, via a temporary file and a rename, so parts on disk are always
+    complete. An interrupted run loses at most the buffered rows, which are
+    scored again on resume. Requires ``pyarrow``.
+    """
+
+    def __init__(self, path: str, resume: bool = True, rows_per_file: int = 10000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ValueError(f"Parquet output requires pyarrow (pip install pyarrow): {str(e)}")
+
+        self._pa, self._pq = pa, pq
+        self._schema = pa.schema([
+            ("path", pa.string()),
+            ("prediction", pa.string()),
+            ("confidence", pa.float64()),
+            ("model_version", pa.string()),
+            ("error", pa.string())
+        ])
+        self.path = path
+        self.rows_per_file = rows_per_file
+        self.results: Dict[str, bool] = {}
+        self._pending: List[dict] = []
+
+        os.makedirs(path, exist_ok=True)
+        parts = self._parts()
+        if resume:
+            for part in parts:
+                table = pq.read_table(os.path.join(path, part), columns=["path", "error"])
+                for file_path, error in zip(table.column("path").to_pylist(), table.column("error").to_pylist()):
+                    self.results[file_path] = error is None
+        else:
+            for part in parts:
+                os.remove(os.path.join(path, part))
+        self._next_part = len(parts) if resume else 0
+
+    def _parts(self) -> List[str]:
+        return sorted(name for name in os.listdir(self.path) if name.startswith("part-") and name.endswith(".parquet"))
+
+    def write(self, records: List[dict]) -> None:
+        self._pending.extend(records)
+        for record in records:
+            self.results[record["path"]] = "error" not in record
+        if len(self._pending) >= self.rows_per_file:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        table = self._pa.Table.from_pylist(self._pending, schema=self._schema)
+        name = os.path.join(self.path, f"part-{self._next_part:05d}.parquet")
+        self._pq.write_table(table, name + ".tmp")
+        os.replace(name + ".tmp", name)
+        self._next_part += 1
+        self._pending = []
+
+    def close(self) -> None:
+        self._flush()
+
+
+def open_result_writer(path: str, resume: bool = True):
+    """JSONL writer, or a Parquet dataset writer for paths ending in ``.parquet``."""
+    if path.endswith(".parquet"):
+        return ParquetResultWriter(path, resume=resume)
+    return JsonlResultWriter(path, resume=resume)
+
+
+class ShardScorer:
+    """
+    Scores shards of files inside one worker process.
+
+    A small thread pool reads and decodes the next files while the model
+    runs on the current batch (libsndfile, soxr and the model runtime all
+    release the GIL), so file I/O and decoding overlap with inference.
+    Decoded clips are grouped into batches of similar length, as the
+    ``BatchScheduler`` does for the API, so little padding is added.
+
+    With ``AUDIO_CACHE_ENABLED``, decoded clips are looked up in and added
+    to the decoded-audio cache, whose disk tier all workers share, so
+    re-scoring a corpus with another model skips decoding entirely.
+    """
+
+    def __init__(self, batch_size: int = 16, prefetch: int = 32, io_threads: int = 2):
+        """
+        Args:
+            batch_size: Clips per forward pass
+            prefetch: Files read and decoded ahead of inference
+            io_threads: Threads reading and decoding files
+        """
+        self.batch_size = max(1, batch_size)
+        self.prefetch = max(self.batch_size, prefetch)
+        self.preprocessor = AudioPreprocessor()
+        self.inference_service = InferenceService()
+        self.inference_service.load()
+        self.audio_cache = None
+        if settings.AUDIO_CACHE_ENABLED:
+            self.audio_cache = DecodedAudioCache(
+                settings.AUDIO_CACHE_MAX_ENTRIES,
+                settings.AUDIO_CACHE_MAX_BYTES,
+                directory=settings.AUDIO_CACHE_DIR,
+                disk_max_bytes=settings.AUDIO_CACHE_DISK_MAX_BYTES
+            )
+        self._bucket_samples = max(1, int(settings.BATCH_BUCKET_SECONDS * settings.SAMPLE_RATE))
+        self._loader = ThreadPoolExecutor(max_workers=max(1, io_threads), thread_name_prefix="bulk-io")
+
+    def score(self, paths: List[str]) -> List[dict]:
+        """
+        Score a shard of files.
+
+        Returns:
+            One record per file: ``path``, ``prediction``, ``confidence`` and
+            ``model_version``, or ``path`` and ``error`` if it failed
+        """
+        records: List[dict] = []
+        buckets: Dict[int, List[Tuple[str, np.ndarray]]] = {}
+        remaining = iter(paths)
+        loading: Deque = deque()
+
+        def fill() -> None:
+            while len(loading) < self.prefetch:
+                path = next(remaining, None)
+                if path is None:
+                    return
+                loading.append((path, self._loader.submit(self._load, path)))
+
+        fill()
+        while loading:
+            path, future = loading.popleft()
+            fill()
+            try:
+                audio = future.result()
+            except ValueError as e:
+                records.append({"path": path, "error": str(e)})
+                continue
+            bucket = buckets.setdefault(len(audio) // self._bucket_samples, [])
+            bucket.append((path, audio))
+            if len(bucket) >= self.batch_size:
+                records.extend(self._predict(bucket))
+                bucket.clear()
+
+        for bucket in buckets.values():
+            if bucket:
+                records.extend(self._predict(bucket))
+        return records
+
+    def close(self) -> None:
+        self._loader.shutdown(wait=False, cancel_futures=True)
+
+    def _load(self, path: str) -> np.ndarray:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            raise ValueError(f"Cannot read file: {str(e)}")
+        if self.audio_cache is None:
+            return self.preprocessor.preprocess(data)
+
+        # Same content hash and duration limit as the API, so clips the API
+        # would accept share entries with it; longer clips get their own
+        content_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+        try:
+            self.preprocessor.check_duration(data, MAX_DURATION_SECONDS)
+            key = self.audio_cache.key(content_hash, MAX_DURATION_SECONDS)
+        except ValueError:
+            key = self.audio_cache.key(content_hash)
+        audio = self.audio_cache.get(key)
+        if audio is None:
+            audio = self.audio_cache.store(key, self.preprocessor.preprocess(data))
+        return audio
+
+    def _predict(self, batch: List[Tuple[str, np.ndarray]]) -> List[dict]:
+        model_version = self.inference_service.model_version
+        try:
+            if settings.SEGMENTED_INFERENCE:
+                results = [self.inference_service.predict_segments(audio)[:2] for _, audio in batch]
+            else:
+                results = self.inference_service.predict_batch([audio for _, audio in batch])
+        except ValueError as e:
+            if len(batch) == 1:
+                return [{"path": batch[0][0], "error": str(e)}]
+            # Score the clips one by one so a bad clip fails alone
+            return [record for item in batch for record in self._predict([item])]
+        return [
+            {"path": path, "prediction": prediction, "confidence": round(confidence, 4), "model_version": model_version}
+            for (path, _), (prediction, confidence) in zip(batch, results)
+        ]
+
+
+# Scorer of this worker process, created by the pool initializer
+_worker_scorer: Optional[ShardScorer] = None
+
+
+def _init_worker(workers: int, threads: int, batch_size: int, prefetch: int, io_threads: int, log_level: int) -> None:
+    global _worker_scorer
+    logging.getLogger().setLevel(log_level)
+    pin_threads(workers, threads)
+    _worker_scorer = ShardScorer(batch_size=batch_size, prefetch=prefetch, io_threads=io_threads)
+
+
+def _score_shard(paths: List[str]) -> List[dict]:
+    return _worker_scorer.score(paths)
+
+
+def score_files(
+    paths: Iterable[str],
+    output: str,
+    workers: int = 0,
+    shard_size: int = 256,
+    batch_size: int = 16,
+    prefetch: int = 32,
+    io_threads: int = 2,
+    resume: bool = True,
+    retry_errors: bool = False
+) -> Dict[str, int]:
+    """
+    Score audio files on a pool of worker processes and write the results.
+
+    Files are split into shards of ``shard_size`` handed out to workers as
+    they free up, so a slow shard does not hold the others back. Each
+    worker runs its own preprocessor and model, pinned to its share of the
+    cores like a pre-fork server worker, so throughput grows with the
+    number of cores. Where the platform allows, the model is loaded once
+    and the workers are forked from this process to share its memory.
+
+    Results are written as each shard finishes. With ``resume``, files that
+    already have a result in ``output`` are skipped (failed ones too, unless
+    ``retry_errors``), so an interrupted run continues where it stopped.
+
+    Args:
+        paths: Audio files to score
+        output: JSONL file, or Parquet dataset directory ending in ``.parquet``
+        workers: Worker processes (0 = one per CPU core, 1 = in this process)
+        shard_size: Files per unit of work
+        batch_size: Clips per forward pass
+        prefetch: Files each worker reads and decodes ahead of inference
+        io_threads: Threads per worker reading and decoding files
+        resume: Continue an existing output instead of replacing it
+        retry_errors: On resume, score files that failed before again
+
+    Returns:
+        Counts of ``scored``, ``failed`` and ``skipped`` files
+    """
+    writer = open_result_writer(output, resume=resume)
+    done: Set[str] = {path for path, ok in writer.results.items() if ok or not retry_errors}
+    todo = [path for path in dict.fromkeys(paths) if path not in done]
+    shards = [todo[i:i + shard_size] for i in range(0, len(todo), max(1, shard_size))]
+    counts = {"scored": 0, "failed": 0, "skipped": len(done)}
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    workers = max(1, min(workers, len(shards)))
+
+    logger.info(f"Scoring {len(todo)} files ({len(done)} already done) with {workers} workers into {output}")
+    start = time.perf_counter()
+
+    def record(records: List[dict]) -> None:
+        writer.write(records)
+        failed = sum(1 for r in records if "error" in r)
+        counts["failed"] += failed
+        counts["scored"] += len(records) - failed
+        finished = counts["scored"] + counts["failed"]
+        rate = finished / max(time.perf_counter() - start, 1e-9)
+        logger.info(f"{finished}/{len(todo)} files ({rate:.1f} files/s, {counts['failed']} failed)")
+
+    try:
+        if not shards:
+            return counts
+        if workers == 1:
+            scorer = ShardScorer(batch_size=batch_size, prefetch=prefetch, io_threads=io_threads)
+            try:
+                for shard in shards:
+                    record(scorer.score(shard))
+            finally:
+                scorer.close()
+            return counts
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            # Workers inherit the model copy-on-write; see app.prefork
+            if settings.SERVER_PRELOAD_MODEL:
+                preload_model()
+            gc.collect()
+            gc.freeze()
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context("spawn")
+
+        initargs = (
+            workers, worker_threads(workers), batch_size, prefetch, io_threads, logging.getLogger().level
+        )
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=initargs) as pool:
+            # Keep a couple of shards queued per worker rather than submitting everything up front
+            queued = iter(shards)
+            running = set()
+            try:
+                for shard in queued:
+                    running.add(pool.submit(_score_shard, shard))
+                    if len(running) >= 2 * workers:
+                        finished, running = wait(running, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            record(future.result())
+                for future in as_completed(running):
+                    record(future.result())
+            except BaseException:
+                for future in running:
+                    future.cancel()
+                raise
+        return counts
+    finally:
+        writer.close()
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"Scored {counts['scored']} files, {counts['failed']} failed, {counts['skipped']} skipped "
+            f"in {elapsed:.1f}s"
+        )
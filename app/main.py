@@ -1,20 +1,49 @@
 """Main FastAPI application."""
-import time
+import asyncio
+import json
 import logging
-from fastapi import FastAPI, HTTPException, Depends
+import os
+from functools import partial
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, WebSocket, WebSocketException, status
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
+from contextlib import AsyncExitStack, asynccontextmanager, nullcontext
 
 from config.settings import settings
 from app.models.schemas import (
+    Base64AudioRequest,
     VoiceDetectionRequest,
     VoiceDetectionResponse,
+    BatchDetectionRequest,
+    JobRequest,
+    JobResponse,
     ErrorResponse
 )
-from app.middleware.auth import verify_api_key
-from app.services.audio_downloader import AudioDownloader
-from app.services.audio_preprocessor import AudioPreprocessor
+from app.middleware.auth import (
+    api_key_id, api_key_quota, get_key_registry, verify_admin_api_key, verify_api_key, verify_websocket_api_key
+)
+from app.middleware.metrics import MetricsMiddleware
+from app.prefork import is_primary_worker, is_respawned_worker, server_started_at, worker_index
+from app.services.audio_downloader import AudioDownloader, create_http_client
 from app.services.inference_service import InferenceService
+from app.services.batch_scheduler import BatchScheduler
+from app.services.stage_executor import ExecutionBackend, StageSaturatedError
+from app.services.result_cache import ResultCache
+from app.services.audio_cache import DecodedAudioCache
+from app.services.detection_pipeline import DetectionPipeline, DetectionResult
+from app.services.audio_buffer import AudioBuffer
+from app.services.upload_reader import (
+    decode_base64_audio, read_body, read_body_audio, read_multipart_audio, read_multipart_field
+)
+from app.services.metrics import ADMISSION_STATE, REGISTRY, STAGE_IN_FLIGHT
+from app.services.admission import AdmissionController
+from app.services.job_queue import JobQueue, job_payload
+from app.services.job_store import Job, create_job_store
+from app.services.stream_detector import StreamSession
+from app.services.profiler import SamplingProfiler, SlowRequestLog
 
 logging.basicConfig(
     level=logging.INFO if not settings.DEBUG else logging.DEBUG,
@@ -23,24 +52,135 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 inference_service = None
+http_client = None
 audio_downloader = None
-audio_preprocessor = None
+batch_scheduler = None
+execution_backend = None
+result_cache = None
+audio_cache = None
+detection_pipeline = None
+admission_controller = None
+job_queue = None
+warmup_task = None
+stream_sessions = 0
+startup_complete = False
+# Why warm-up failed, reported by /health so the worker gets restarted
+warmup_error: Optional[str] = None
+# Created at import, not in the lifespan, because middleware is configured at import
+profiler = SamplingProfiler()
+slow_request_log = (
+    SlowRequestLog(settings.SLOW_REQUEST_THRESHOLD_MS / 1000, settings.SLOW_REQUEST_LOG_SIZE)
+    if settings.SLOW_REQUEST_THRESHOLD_MS > 0 else None
+)
+
+
+async def warm_up() -> None:
+    """
+    Load the model and warm up the worker pools in the background.
+    
+    Runs after the server has started listening, so ``/health`` answers
+    immediately while ``/ready`` reports 503 until this finishes. If it
+    fails, ``/health`` reports 503 as well, so the worker is restarted
+    rather than left up but never ready.
+    """
+    global startup_complete, warmup_error
+    
+    try:
+        await asyncio.to_thread(inference_service.load)
+        await execution_backend.warmup()
+        startup_complete = True
+        logger.info("Warm-up complete, ready to serve traffic")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Warm-up failed: {str(e)}", exc_info=True)
+        warmup_error = str(e) or type(e).__name__
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup/shutdown."""
-    global inference_service, audio_downloader, audio_preprocessor
+    global inference_service, http_client, audio_downloader, batch_scheduler, execution_backend
+    global result_cache, audio_cache, detection_pipeline, admission_controller, job_queue, warmup_task
+    global startup_complete, warmup_error
     
     logger.info("Starting up application...")
+    warmup_error = None
     inference_service = InferenceService()
-    audio_downloader = AudioDownloader()
-    audio_preprocessor = AudioPreprocessor()
+    http_client = create_http_client()
+    audio_downloader = AudioDownloader(client=http_client)
+    execution_backend = ExecutionBackend()
+    if settings.RESULT_CACHE_ENABLED:
+        result_cache = ResultCache()
+    if settings.AUDIO_CACHE_ENABLED:
+        audio_cache = DecodedAudioCache(
+            settings.AUDIO_CACHE_MAX_ENTRIES,
+            settings.AUDIO_CACHE_MAX_BYTES,
+            directory=settings.AUDIO_CACHE_DIR,
+            disk_max_bytes=settings.AUDIO_CACHE_DISK_MAX_BYTES
+        )
+    if settings.BATCH_INFERENCE_ENABLED:
+        batch_scheduler = BatchScheduler(
+            inference_service,
+            executor=execution_backend.inference.executor,
+            max_concurrent_batches=execution_backend.inference.max_workers,
+            max_queue_size=settings.INFERENCE_QUEUE_SIZE
+        )
+        await batch_scheduler.start()
+    detection_pipeline = DetectionPipeline(
+        audio_downloader,
+        execution_backend,
+        inference_service,
+        batch_scheduler=batch_scheduler,
+        result_cache=result_cache,
+        audio_cache=audio_cache,
+        coalesce=settings.COALESCE_REQUESTS
+    )
+    if settings.ADMISSION_ENABLED:
+        admission_controller = AdmissionController(
+            max_concurrent=settings.ADMISSION_MAX_CONCURRENT,
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+            memory_budget_bytes=settings.ADMISSION_MEMORY_BUDGET_BYTES,
+            per_key_max_concurrent=settings.ADMISSION_PER_KEY_MAX_CONCURRENT
+        )
+    if settings.JOBS_ENABLED:
+        job_queue = JobQueue(
+            create_job_store(settings.JOBS_STORE, settings.JOBS_SQLITE_PATH),
+            _run_job,
+            workers=settings.JOBS_WORKERS,
+            max_pending=settings.JOBS_MAX_PENDING,
+            max_pending_per_key=settings.JOBS_MAX_PENDING_PER_KEY,
+            http_client=http_client,
+            worker=worker_index()
+        )
+        # The first start resumes every unfinished job; a restarted worker resumes its predecessor's
+        await job_queue.start(
+            recover=is_primary_worker() or is_respawned_worker(),
+            only_own=not is_primary_worker(),
+            created_before=server_started_at()
+        )
+    # Model loading and warm-up run in the background so the port opens immediately
+    warmup_task = asyncio.create_task(warm_up())
     logger.info("Application startup complete")
     
     yield
     
     logger.info("Shutting down application...")
+    # Stop reporting ready while draining, and until a restarted app has warmed up again
+    startup_complete = False
+    if not warmup_task.done():
+        warmup_task.cancel()
+        try:
+            await warmup_task
+        except asyncio.CancelledError:
+            pass
+    if job_queue:
+        await job_queue.stop()
+    if batch_scheduler:
+        await batch_scheduler.stop()
+    execution_backend.shutdown()
+    await http_client.aclose()
 
 
 app = FastAPI(
@@ -57,78 +197,724 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    MetricsMiddleware,
+    server_timing=settings.SERVER_TIMING_ENABLED,
+    trace=settings.REQUEST_TRACE_ENABLED,
+    slow_requests=slow_request_log
+)
 
 
 @app.get("/health", tags=["Health"])
 async def health_check():
-    """Health check endpoint."""
+    """Liveness endpoint: 200 while the worker can still become ready, 503 once warm-up has failed."""
+    if warmup_error is not None:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unhealthy", "version": settings.API_VERSION, "error": f"Warm-up failed: {warmup_error}"}
+        )
     return {"status": "healthy", "version": settings.API_VERSION}
 
 
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    """Readiness endpoint: 200 once the model is loaded and workers are warm, 503 before."""
+    if warmup_error is not None:
+        return JSONResponse(status_code=503, content={"status": "failed", "error": f"Warm-up failed: {warmup_error}"})
+    if not startup_complete:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready", "model_backend": inference_service.backend_name}
+
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    """Prometheus metrics in text exposition format."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _collect_stage_metrics() -> None:
+    """Refresh worker pool gauges before a scrape."""
+    if execution_backend:
+        STAGE_IN_FLIGHT.set(execution_backend.preprocess.in_flight, stage="preprocess")
+        STAGE_IN_FLIGHT.set(execution_backend.inference.in_flight, stage="inference")
+    if batch_scheduler:
+        STAGE_IN_FLIGHT.set(batch_scheduler.queue_depth, stage="batch_queue")
+    if admission_controller:
+        ADMISSION_STATE.set(admission_controller.active, state="active")
+        ADMISSION_STATE.set(admission_controller.queued, state="queued")
+        ADMISSION_STATE.set(admission_controller.memory_reserved, state="reserved_bytes")
+    if job_queue:
+        STAGE_IN_FLIGHT.set(job_queue.pending, stage="jobs_pending")
+    STAGE_IN_FLIGHT.set(stream_sessions, stage="stream_sessions")
+
+
+REGISTRY.add_collector(_collect_stage_metrics)
+
+
 @app.post(
     "/detect-voice",
     response_model=VoiceDetectionResponse,
-    responses={400: {"model": ErrorResponse}, 401: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
+    response_model_exclude_none=True,
+    responses={
+        400: {"model": ErrorResponse},
+        401: {"model": ErrorResponse},
+        429: {"model": ErrorResponse},
+        500: {"model": ErrorResponse},
+        503: {"model": ErrorResponse}
+    },
     tags=["Voice Detection"]
 )
 async def detect_voice(
     request: VoiceDetectionRequest,
-    authenticated: bool = Depends(verify_api_key)
+    api_key: str = Depends(verify_api_key)
 ) -> VoiceDetectionResponse:
     """
     Detect if audio contains AI-generated voice.
     
     Args:
         request: Voice detection request with audio URL
-        authenticated: Authentication dependency
+        api_key: Validated API key (authentication dependency)
         
     Returns:
         VoiceDetectionResponse with prediction and metadata
     """
-    temp_file_path = None
-    
     try:
         logger.info(f"Received detection request for URL: {request.audio_url}")
         
-        temp_file_path = await audio_downloader.download(str(request.audio_url))
+        async with _admit(api_key):
+            result = await detection_pipeline.detect_url(str(request.audio_url), request.include_segments)
+        response = _build_response(result, request.language)
         
-        audio_preprocessor.check_duration(temp_file_path, max_seconds=30.0)
+        logger.info(
+            f"Detection complete: {result.prediction} (confidence={result.confidence:.4f}, "
+            f"time={result.processing_time_ms}ms)"
+        )
         
-        processing_start_time = time.time()
-        audio = audio_preprocessor.preprocess(temp_file_path)
+        return response
         
-        prediction, confidence = inference_service.predict(audio)
-        processing_time_ms = int((time.time() - processing_start_time) * 1000)
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except StageSaturatedError as e:
+        logger.warning(f"Rejecting request under load: {str(e)}")
+        raise _busy_exception(e)
+    except Exception as e:
+        logger.error(f"Internal server error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@app.post(
+    "/detect-voice/base64",
+    response_model=VoiceDetectionResponse,
+    response_model_exclude_none=True,
+    responses={
+        400: {"model": ErrorResponse},
+        401: {"model": ErrorResponse},
+        429: {"model": ErrorResponse},
+        500: {"model": ErrorResponse},
+        503: {"model": ErrorResponse}
+    },
+    tags=["Voice Detection"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": Base64AudioRequest.model_json_schema()}}
+        }
+    }
+)
+async def detect_voice_base64(
+    request: Request,
+    api_key: str = Depends(verify_api_key)
+) -> VoiceDetectionResponse:
+    """
+    Detect AI-generated voice in base64-encoded audio sent in the request.
+    
+    The JSON body (``Base64AudioRequest``) is read with a running size cap
+    before it is parsed, so an oversized payload is rejected from its
+    ``Content-Length`` or as soon as it crosses the limit, never buffered
+    whole.
+    
+    Args:
+        request: Raw HTTP request
+        api_key: Validated API key (authentication dependency)
         
-        language = request.language or "unknown"
+    Returns:
+        VoiceDetectionResponse with prediction and metadata
+    """
+    # Base64 takes 4 characters per 3 bytes; leave room for the other JSON fields
+    max_body_bytes = settings.UPLOAD_MAX_BYTES * 4 // 3 + 64 * 1024
+    content_length = request.headers.get("Content-Length")
+    if content_length and content_length.isdigit() and int(content_length) > max_body_bytes:
+        raise HTTPException(status_code=400, detail="Upload exceeds size limit")
+    
+    try:
+        body = await read_body(request.stream(), max_body_bytes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        payload = Base64AudioRequest.model_validate_json(body)
+    except ValidationError as e:
+        # Same 422 response FastAPI gives for a declared body model
+        raise RequestValidationError([
+            {**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)
+        ])
+    del body
+    
+    logger.info(f"Received base64 detection request ({len(payload.audioBase64)} chars)")
+    # Decode off the event loop; large payloads take a few milliseconds
+    reader = partial(asyncio.to_thread, decode_base64_audio, payload.audioBase64, settings.UPLOAD_MAX_BYTES)
+    return await _detect_upload(reader, payload.language, api_key, len(payload.audioBase64) * 3 // 4)
+
+
+@app.post(
+    "/detect-voice/upload",
+    response_model=VoiceDetectionResponse,
+    response_model_exclude_none=True,
+    responses={
+        400: {"model": ErrorResponse},
+        401: {"model": ErrorResponse},
+        429: {"model": ErrorResponse},
+        500: {"model": ErrorResponse},
+        503: {"model": ErrorResponse}
+    },
+    tags=["Voice Detection"]
+)
+async def detect_voice_upload(
+    request: Request,
+    language: Optional[str] = None,
+    api_key: str = Depends(verify_api_key)
+) -> VoiceDetectionResponse:
+    """
+    Detect AI-generated voice in audio uploaded as the request body.
+    
+    Accepts the raw audio bytes (``application/octet-stream`` or
+    ``audio/*``) or a ``multipart/form-data`` upload in the ``file`` field.
+    The body is streamed into memory and rejected as soon as it exceeds
+    ``UPLOAD_MAX_BYTES``.
+    
+    Args:
+        request: Raw HTTP request
+        language: Optional language hint echoed in the response
+        api_key: Validated API key (authentication dependency)
         
-        response = VoiceDetectionResponse(
-            prediction=prediction,
-            confidence=confidence,
-            language=language,
-            model_version=inference_service.model_version,
-            processing_time_ms=processing_time_ms
-        )
+    Returns:
+        VoiceDetectionResponse with prediction and metadata
+    """
+    content_type = request.headers.get("Content-Type", "")
+    content_length = request.headers.get("Content-Length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.UPLOAD_MAX_BYTES + 64 * 1024:
+        raise HTTPException(status_code=400, detail="Upload exceeds size limit")
+    
+    logger.info(f"Received upload detection request ({content_type or 'no content type'})")
+    if content_type.lower().startswith("multipart/form-data"):
+        reader = partial(read_multipart_audio, request.stream(), content_type, settings.UPLOAD_MAX_BYTES)
+    else:
+        reader = partial(read_body_audio, request.stream(), settings.UPLOAD_MAX_BYTES)
+    # Reserve memory for the declared size before reading the body
+    reserve_bytes = int(content_length) if content_length and content_length.isdigit() else settings.UPLOAD_MAX_BYTES
+    return await _detect_upload(reader, language, api_key, reserve_bytes)
+
+
+async def _detect_upload(
+    reader: Callable[[], Awaitable[AudioBuffer]],
+    language: Optional[str],
+    api_key: str,
+    reserve_bytes: int
+) -> VoiceDetectionResponse:
+    """Admit the request, read uploaded audio into a buffer and run it through the pipeline."""
+    audio_buffer: Optional[AudioBuffer] = None
+    try:
+        async with _admit(api_key, reserve_bytes):
+            audio_buffer = await reader()
+            result = await detection_pipeline.detect_buffer(audio_buffer)
         
         logger.info(
-            f"Detection complete: {prediction} (confidence={confidence:.4f}, "
-            f"time={processing_time_ms}ms)"
+            f"Detection complete: {result.prediction} (confidence={result.confidence:.4f}, "
+            f"time={result.processing_time_ms}ms)"
         )
-        
-        return response
+        return _build_response(result, language)
         
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
-        error_msg = str(e)
-        if "duration exceeds" in error_msg.lower():
-            raise HTTPException(status_code=400, detail=error_msg)
-        raise HTTPException(status_code=400, detail=error_msg)
+        raise HTTPException(status_code=400, detail=str(e))
+    except StageSaturatedError as e:
+        logger.warning(f"Rejecting request under load: {str(e)}")
+        raise _busy_exception(e)
     except Exception as e:
         logger.error(f"Internal server error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
     finally:
-        if temp_file_path:
-            audio_preprocessor.cleanup(temp_file_path)
+        if audio_buffer:
+            audio_buffer.close()
+
+
+@app.post(
+    "/detect-voice/batch",
+    responses={
+        200: {"content": {"application/x-ndjson": {}}, "description": "One JSON result per line, in completion order"},
+        400: {"model": ErrorResponse},
+        401: {"model": ErrorResponse}
+    },
+    tags=["Voice Detection"]
+)
+async def detect_voice_batch(
+    request: Request,
+    api_key: str = Depends(verify_api_key)
+) -> StreamingResponse:
+    """
+    Detect AI-generated voice for many audio URLs in one call.
+    
+    Accepts either a JSON body ``{"items": [{"audio_url": ...}, ...]}`` or a
+    JSONL body (``application/x-ndjson``, or a multipart upload in the
+    ``file`` field) with one ``{"audio_url": ...}`` object per line. Items
+    are downloaded and processed concurrently, and results are streamed
+    back as NDJSON in completion order, each tagged with its input index.
+    
+    Args:
+        request: Raw HTTP request
+        api_key: Validated API key (authentication dependency)
+        
+    Returns:
+        StreamingResponse of NDJSON result lines
+    """
+    items = await _parse_batch_items(request)
+    logger.info(f"Received batch detection request with {len(items)} items")
+    return StreamingResponse(_stream_batch_results(items, api_key), media_type="application/x-ndjson")
+
+
+async def _parse_batch_items(request: Request) -> List[VoiceDetectionRequest]:
+    """
+    Read batch items from a JSON, JSONL or multipart JSONL body.
+    
+    The body (or the multipart ``file`` part) is read with a running cap of
+    ``BATCH_REQUEST_MAX_BYTES``, and rejected up front from its
+    ``Content-Length`` when that is already over the limit.
+    """
+    full_content_type = request.headers.get("Content-Type", "")
+    content_type = full_content_type.split(";")[0].strip().lower()
+    max_bytes = settings.BATCH_REQUEST_MAX_BYTES
+    content_length = request.headers.get("Content-Length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + 64 * 1024:
+        raise HTTPException(status_code=400, detail="Batch request exceeds size limit")
+    
+    try:
+        if content_type == "multipart/form-data":
+            body = await read_multipart_field(request.stream(), full_content_type, max_bytes)
+        else:
+            body = await read_body(request.stream(), max_bytes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        if content_type == "application/json":
+            items = BatchDetectionRequest.model_validate_json(body).items
+        else:
+            items = [
+                VoiceDetectionRequest.model_validate_json(line)
+                for line in body.splitlines()
+                if line.strip()
+            ]
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch request: {str(e)}")
+    
+    if not items:
+        raise HTTPException(status_code=400, detail="Batch request contains no items")
+    if len(items) > settings.BATCH_REQUEST_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch request has {len(items)} items (max {settings.BATCH_REQUEST_MAX_ITEMS})"
+        )
+    return items
+
+
+async def _stream_batch_results(items: List[VoiceDetectionRequest], api_key: str) -> AsyncIterator[bytes]:
+    """Run batch items concurrently and yield NDJSON lines as they finish."""
+    slots = asyncio.Semaphore(settings.BATCH_REQUEST_CONCURRENCY)
+    
+    async def run_item(index: int, item: VoiceDetectionRequest) -> dict:
+        line = {"index": index, "audio_url": str(item.audio_url)}
+        async with slots:
+            try:
+                async with _admit(api_key):
+                    result = await detection_pipeline.detect_url(str(item.audio_url), item.include_segments)
+                line["status"] = 200
+                line.update(_build_response(result, item.language).model_dump(exclude_none=True))
+            except ValueError as e:
+                line.update(status=400, error=str(e))
+            except StageSaturatedError as e:
+                line.update(status=getattr(e, "status_code", 503), error=str(e))
+            except Exception as e:
+                logger.error(f"Batch item {index} failed: {str(e)}", exc_info=True)
+                line.update(status=500, error=f"Internal server error: {str(e)}")
+        return line
+    
+    tasks = [asyncio.create_task(run_item(index, item)) for index, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            yield (json.dumps(line) + "\n").encode()
+    finally:
+        # Client went away or streaming failed; stop outstanding work
+        for task in tasks:
+            task.cancel()
+
+
+@app.post(
+    "/jobs",
+    response_model=JobResponse,
+    response_model_exclude_none=True,
+    status_code=202,
+    responses={
+        401: {"model": ErrorResponse},
+        404: {"model": ErrorResponse},
+        503: {"model": ErrorResponse}
+    },
+    tags=["Jobs"]
+)
+async def submit_job(
+    request: JobRequest,
+    api_key: str = Depends(verify_api_key)
+) -> JobResponse:
+    """
+    Queue a detection to run in the background.
+    
+    Returns immediately with a job ID. Poll ``GET /jobs/{job_id}`` for the
+    result, or pass ``webhook_url`` to have the finished job POSTed there.
+    
+    Args:
+        request: Detection request with optional webhook URL
+        api_key: Validated API key (authentication dependency)
+        
+    Returns:
+        JobResponse with the job ID and ``queued`` status
+    """
+    if job_queue is None:
+        raise HTTPException(status_code=404, detail="Background jobs are disabled")
+    
+    key = api_key_quota(api_key)
+    job = Job(
+        audio_url=str(request.audio_url),
+        owner=api_key_id(api_key),
+        key_name=key.name if key else None,
+        language=request.language,
+        include_segments=request.include_segments,
+        webhook_url=str(request.webhook_url) if request.webhook_url else None
+    )
+    try:
+        await job_queue.submit(job)
+    except StageSaturatedError as e:
+        logger.warning(f"Rejecting job under load: {str(e)}")
+        raise _busy_exception(e)
+    return JobResponse(**job_payload(job))
+
+
+@app.get(
+    "/jobs/{job_id}",
+    response_model=JobResponse,
+    response_model_exclude_none=True,
+    responses={
+        401: {"model": ErrorResponse},
+        404: {"model": ErrorResponse}
+    },
+    tags=["Jobs"]
+)
+async def get_job(
+    job_id: str,
+    api_key: str = Depends(verify_api_key)
+) -> JobResponse:
+    """
+    Get the status and, once finished, the result of a background job.
+    
+    Args:
+        job_id: ID returned by ``POST /jobs``
+        api_key: Validated API key (authentication dependency)
+        
+    Returns:
+        JobResponse with the current status, result or error
+    """
+    job = await job_queue.store.get(job_id) if job_queue else None
+    # Jobs are only visible to the key that submitted them
+    if job is None or job.owner != api_key_id(api_key):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobResponse(**job_payload(job))
+
+
+@app.post("/admin/profiler/start", tags=["Admin"], include_in_schema=False)
+async def start_profiler(
+    interval_ms: float = Query(settings.PROFILER_INTERVAL_MS, ge=1.0),
+    seconds: float = Query(settings.PROFILER_MAX_SECONDS, gt=0, le=settings.PROFILER_MAX_SECONDS),
+    idle: bool = False,
+    _: None = Depends(verify_admin_api_key)
+):
+    """
+    Start the sampling profiler in this worker process.
+    
+    Args:
+        interval_ms: Milliseconds between samples
+        seconds: Stop sampling by itself after this long
+        idle: Also count threads blocked waiting for work
+    """
+    try:
+        profiler.start(interval_ms / 1000, seconds, idle=idle)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"status": "started", "interval_ms": interval_ms, "max_seconds": seconds, "pid": os.getpid()}
+
+
+@app.post("/admin/profiler/stop", tags=["Admin"], include_in_schema=False)
+async def stop_profiler(_: None = Depends(verify_admin_api_key)):
+    """
+    Stop the sampling profiler and return its samples as collapsed stacks.
+    
+    The body can be fed to ``flamegraph.pl`` or opened in speedscope.
+    """
+    try:
+        stacks = await asyncio.to_thread(profiler.stop)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(stacks, headers={"X-Profile-Samples": str(profiler.samples)})
+
+
+@app.get("/admin/slow-requests", tags=["Admin"], include_in_schema=False)
+async def slow_requests(_: None = Depends(verify_admin_api_key)):
+    """Recent requests over ``SLOW_REQUEST_THRESHOLD_MS`` in this worker, with stage times and input metadata."""
+    if slow_request_log is None:
+        raise HTTPException(status_code=404, detail="Slow-request capture is disabled")
+    return {
+        "threshold_ms": settings.SLOW_REQUEST_THRESHOLD_MS,
+        "captured": slow_request_log.total,
+        "requests": slow_request_log.entries()
+    }
+
+
+@app.websocket("/detect-voice/stream")
+async def detect_voice_stream(
+    websocket: WebSocket,
+    audio_format: str = Query("pcm_s16le", alias="format"),
+    sample_rate: Optional[int] = None,
+    channels: int = 1,
+    language: Optional[str] = None,
+    api_key: str = Depends(verify_websocket_api_key)
+) -> None:
+    """
+    Detect AI-generated voice in audio streamed over a WebSocket.
+    
+    The client sends audio as binary messages: raw PCM (``format=pcm_s16le``
+    or ``pcm_f32le`` with ``sample_rate`` and ``channels``) or
+    self-contained encoded chunks (``format=encoded``). The server replies
+    with ``{"type": "verdict", ...}`` messages scored on the most recent
+    ``STREAM_WINDOW_SECONDS`` of audio: the first after
+    ``STREAM_MIN_SECONDS``, then every ``STREAM_HOP_SECONDS``. Scoring runs
+    alongside receiving, so a client sending faster than the model scores
+    gets fewer, newer verdicts rather than a backlog.
+    
+    The stream ends with a verdict marked ``"final": true`` once the verdict
+    has stabilized, after ``{"type": "end"}`` from the client, or at
+    ``STREAM_MAX_SECONDS`` of audio. Errors are sent as
+    ``{"type": "error", "status": ..., "detail": ...}`` before closing.
+    
+    A stream holds an admission slot, charged to its API key, from before
+    the handshake completes until it closes. The handshake is refused with
+    close code 1013 when ``STREAM_MAX_SESSIONS`` streams are open, the
+    model is still loading or admission rejects the stream, and with 1008
+    for invalid audio parameters.
+    
+    Args:
+        websocket: Client connection
+        audio_format: "pcm_s16le", "pcm_f32le" or "encoded"
+        sample_rate: PCM sample rate in Hz
+        channels: Interleaved PCM channels
+        language: Language reported back in verdicts
+        api_key: Validated API key (authentication dependency)
+    """
+    global stream_sessions
+    if stream_sessions >= settings.STREAM_MAX_SESSIONS:
+        raise WebSocketException(code=status.WS_1013_TRY_AGAIN_LATER, reason="Too many concurrent streams")
+    if not inference_service.ready:
+        raise WebSocketException(code=status.WS_1013_TRY_AGAIN_LATER, reason="Server is starting: model is still loading")
+    try:
+        session = StreamSession(
+            audio_format,
+            sample_rate,
+            channels,
+            target_sr=settings.SAMPLE_RATE,
+            window_seconds=settings.STREAM_WINDOW_SECONDS,
+            hop_seconds=settings.STREAM_HOP_SECONDS,
+            min_seconds=settings.STREAM_MIN_SECONDS,
+            stable_updates=settings.STREAM_STABLE_UPDATES,
+            early_stop_confidence=settings.STREAM_EARLY_STOP_CONFIDENCE
+        )
+    except ValueError as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=str(e)[:120])
+    
+    # Counted before waiting for admission, so handshakes cannot overshoot the limit
+    stream_sessions += 1
+    try:
+        async with AsyncExitStack() as stack:
+            try:
+                await stack.enter_async_context(_admit(api_key))
+            except StageSaturatedError as e:
+                logger.warning(f"Rejecting stream under load: {str(e)}")
+                raise WebSocketException(code=status.WS_1013_TRY_AGAIN_LATER, reason=str(e)[:120])
+            await websocket.accept()
+            await _serve_stream(websocket, session, language)
+    finally:
+        stream_sessions -= 1
+
+
+async def _serve_stream(websocket: WebSocket, session: StreamSession, language: Optional[str]) -> None:
+    """Receive audio and send verdicts on an accepted stream until it ends."""
+    receiving: Optional[asyncio.Future] = asyncio.ensure_future(websocket.receive())
+    scoring: Optional[asyncio.Task] = None
+    ending = False
+    last_verdict: Optional[dict] = None
+    try:
+        while True:
+            waiting = {f for f in (receiving, scoring) if f is not None}
+            done, _ = await asyncio.wait(
+                waiting, timeout=settings.STREAM_IDLE_TIMEOUT_SECONDS, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                if scoring is None:
+                    await _close_stream(websocket, 408, "No audio received", status.WS_1001_GOING_AWAY)
+                    return
+                continue
+            
+            if receiving in done:
+                message = receiving.result()
+                receiving = None
+                if message["type"] == "websocket.disconnect":
+                    return
+                if message.get("bytes") is not None:
+                    if len(message["bytes"]) > settings.STREAM_MAX_CHUNK_BYTES:
+                        raise ValueError(f"Chunk exceeds {settings.STREAM_MAX_CHUNK_BYTES} bytes")
+                    # Decoding and resampling are CPU work; this coroutine is the session's only user
+                    await asyncio.to_thread(session.push, message["bytes"])
+                elif _stream_control(message.get("text")) == "end":
+                    ending = True
+                if session.audio_seconds >= settings.STREAM_MAX_SECONDS:
+                    ending = True
+                if ending:
+                    await asyncio.to_thread(session.flush)
+                else:
+                    receiving = asyncio.ensure_future(websocket.receive())
+            
+            if scoring in done:
+                try:
+                    prediction, confidence = scoring.result()
+                    stable = session.record(prediction, confidence)
+                    last_verdict = {
+                        "type": "verdict",
+                        "prediction": prediction,
+                        "confidence": round(confidence, 4),
+                        "language": language or "unknown",
+                        "model_version": inference_service.model_version,
+                        "audio_seconds": round(session.audio_seconds, 3),
+                        "window_seconds": round(scored_seconds, 3),
+                        "final": stable or (ending and not session.due(final=True))
+                    }
+                    await websocket.send_json(last_verdict)
+                    if last_verdict["final"]:
+                        logger.info(
+                            f"Stream verdict: {prediction} (confidence={confidence:.4f}, "
+                            f"audio={session.audio_seconds:.1f}s)"
+                        )
+                        await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
+                        return
+                except StageSaturatedError as e:
+                    # Try again on the next hop with newer audio
+                    logger.warning(f"Skipping stream update under load: {str(e)}")
+                scoring = None
+            
+            if scoring is None and session.due(final=ending):
+                window = session.take_window()
+                scored_seconds = len(window) / settings.SAMPLE_RATE
+                scoring = asyncio.ensure_future(detection_pipeline.score_window(window))
+            elif scoring is None and ending:
+                if session.total_samples == 0:
+                    await _close_stream(websocket, 400, "No audio received", status.WS_1003_UNSUPPORTED_DATA)
+                elif last_verdict is None:
+                    await _close_stream(websocket, 503, "Server is busy", status.WS_1013_TRY_AGAIN_LATER)
+                else:
+                    await websocket.send_json({**last_verdict, "final": True})
+                    await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
+                return
+    
+    except ValueError as e:
+        logger.error(f"Stream validation error: {str(e)}")
+        await _close_stream(websocket, 400, str(e), status.WS_1003_UNSUPPORTED_DATA)
+    except Exception as e:
+        logger.error(f"Stream error: {str(e)}", exc_info=True)
+        await _close_stream(websocket, 500, f"Internal server error: {str(e)}", status.WS_1011_INTERNAL_ERROR)
+    finally:
+        for pending in (receiving, scoring):
+            if pending is not None and not pending.done():
+                pending.cancel()
+
+
+def _stream_control(text: Optional[str]) -> Optional[str]:
+    """Type of a text control message on a stream (currently only "end")."""
+    try:
+        message = json.loads(text or "")
+    except json.JSONDecodeError:
+        raise ValueError("Control messages must be JSON")
+    if not isinstance(message, dict) or message.get("type") != "end":
+        raise ValueError('Unknown control message (expected {"type": "end"})')
+    return message["type"]
+
+
+async def _close_stream(websocket: WebSocket, status_code: int, detail: str, close_code: int) -> None:
+    """Report an error on a stream and close it; the client may already be gone."""
+    try:
+        await websocket.send_json({"type": "error", "status": status_code, "detail": detail})
+        await websocket.close(code=close_code, reason=detail[:120])
+    except Exception:
+        pass
+
+
+async def _run_job(job: Job) -> dict:
+    """Process one background job through the detection pipeline, under its key's admission limits."""
+    async with _admit_job(job):
+        result = await detection_pipeline.detect_url(job.audio_url, job.include_segments)
+    return _build_response(result, job.language).model_dump(exclude_none=True)
+
+
+def _admit(api_key: str, reserve_bytes: int = 0):
+    """Admission slot for one detection, or a no-op when admission control is off."""
+    if admission_controller is None:
+        return nullcontext()
+    return admission_controller.admit(api_key, reserve_bytes)
+
+
+def _admit_job(job: Job):
+    """Admission slot for a background job, charged to the key that submitted it."""
+    if admission_controller is None:
+        return nullcontext()
+    key = get_key_registry().get(job.key_name) if job.key_name else None
+    return admission_controller.admit_key(job.owner, key.max_concurrent if key else 0)
+
+
+def _busy_exception(e: StageSaturatedError) -> HTTPException:
+    """Map an overload error to a 429/503 response with Retry-After."""
+    return HTTPException(
+        status_code=getattr(e, "status_code", 503),
+        detail=str(e),
+        headers={"Retry-After": str(getattr(e, "retry_after", settings.BUSY_RETRY_AFTER_SECONDS))}
+    )
+
+
+def _build_response(result: DetectionResult, language: Optional[str]) -> VoiceDetectionResponse:
+    """Convert a pipeline result into the API response model."""
+    return VoiceDetectionResponse(
+        prediction=result.prediction,
+        confidence=result.confidence,
+        language=language or "unknown",
+        model_version=result.model_version,
+        processing_time_ms=result.processing_time_ms,
+        segments=result.segments
+    )
 
 
 if __name__ == "__main__":
@@ -1,26 +1,53 @@
 """API key authentication middleware."""
-from fastapi import HTTPException, Security
+from fastapi import HTTPException, Security, WebSocket, WebSocketException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from typing import Optional
 from config.settings import settings
+from app.services.api_keys import ApiKey, ApiKeyRegistry
+from app.services.metrics import ADMISSION_REJECTED
+import hashlib
+import hmac
 import logging
+import math
 
 logger = logging.getLogger(__name__)
 
 security = HTTPBearer()
 
+# Built on first use, so settings changed at startup are honoured
+_registry: Optional[ApiKeyRegistry] = None
 
-async def verify_api_key(credentials: HTTPAuthorizationCredentials = Security(security)) -> bool:
+
+def get_key_registry() -> ApiKeyRegistry:
+    """The process-wide API key registry (``API_KEYS_FILE``, or ``API_KEY`` alone)."""
+    global _registry
+    if _registry is None:
+        _registry = ApiKeyRegistry(
+            settings.API_KEYS_FILE,
+            fallback_key=settings.API_KEY,
+            reload_seconds=settings.API_KEYS_RELOAD_SECONDS,
+            defaults={
+                "rate_per_second": settings.API_KEY_DEFAULT_RATE_PER_SECOND,
+                "burst": settings.API_KEY_DEFAULT_BURST,
+                "max_concurrent": settings.API_KEY_DEFAULT_MAX_CONCURRENT
+            }
+        )
+    return _registry
+
+
+async def verify_api_key(credentials: HTTPAuthorizationCredentials = Security(security)) -> str:
     """
-    Verify API key from Authorization header.
+    Verify API key from Authorization header and apply its rate quota.
     
     Args:
         credentials: HTTPBearer credentials containing the token
         
     Returns:
-        True if API key is valid
+        The validated API key, used to identify the caller for per-key limits
         
     Raises:
-        HTTPException: If API key is invalid or missing
+        HTTPException: 401 if the API key is invalid or missing, 429 with
+            Retry-After if the key is over its request rate
     """
     token = credentials.credentials
     
@@ -31,12 +58,86 @@ async def verify_api_key(credentials: HTTPAuthorizationCredentials = Security(se
             detail="Missing API key"
         )
     
-    if token != settings.API_KEY:
-        logger.warning(f"Invalid API key attempt: {token[:10]}...")
+    key = get_key_registry().authenticate(token)
+    if key is None:
+        logger.warning("Invalid API key attempt")
         raise HTTPException(
             status_code=401,
             detail="Invalid API key"
         )
     
-    return True
+    wait = key.throttle()
+    if wait > 0:
+        ADMISSION_REJECTED.inc(reason="rate_limit")
+        logger.warning(f"Rate limit exceeded for API key '{key.name}'")
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded ({key.rate_per_second:g} requests/s)",
+            headers={"Retry-After": str(math.ceil(wait))}
+        )
+    
+    return token
+
+
+async def verify_websocket_api_key(websocket: WebSocket) -> str:
+    """
+    Verify the API key of a WebSocket handshake.
+    
+    Accepts a Bearer token in the Authorization header or, for browser
+    clients that cannot set handshake headers, an ``api_key`` query
+    parameter. Opening a stream counts against the key's request rate.
+    
+    Returns:
+        The validated API key
+        
+    Raises:
+        WebSocketException: Closes the connection (1008) if the key is
+            missing or invalid, or (1013) if it is over its request rate
+    """
+    scheme, _, token = websocket.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        token = websocket.query_params.get("api_key", "")
+    
+    if not token:
+        logger.warning("Missing API key in WebSocket handshake")
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Missing API key")
+    
+    key = get_key_registry().authenticate(token)
+    if key is None:
+        logger.warning("Invalid API key attempt")
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid API key")
+    
+    if key.throttle() > 0:
+        ADMISSION_REJECTED.inc(reason="rate_limit")
+        logger.warning(f"Rate limit exceeded for API key '{key.name}'")
+        raise WebSocketException(code=status.WS_1013_TRY_AGAIN_LATER, reason="Rate limit exceeded")
+    
+    return token
+
+
+async def verify_admin_api_key(credentials: HTTPAuthorizationCredentials = Security(security)) -> None:
+    """
+    Verify the admin key (``ADMIN_API_KEY``) from the Authorization header.
+    
+    Raises:
+        HTTPException: 404 if no admin key is configured, 401 if the key
+            does not match
+    """
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(credentials.credentials.encode(), settings.ADMIN_API_KEY.encode()):
+        logger.warning("Invalid admin API key attempt")
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid admin API key"
+        )
+
+
+def api_key_quota(api_key: str) -> Optional[ApiKey]:
+    """Registry entry (name and quotas) of an already verified API key."""
+    return get_key_registry().authenticate(api_key)
+
 
+def api_key_id(api_key: str) -> str:
+    """Stable, non-reversible identifier for an API key (for ownership and limits)."""
+    return hashlib.blake2b(api_key.encode(), digest_size=8).hexdigest()
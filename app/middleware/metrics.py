@@ -0,0 +1,94 @@
+"""Request metrics, Server-Timing and trace middleware."""
+import time
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.metrics import (
+    REQUESTS_IN_FLIGHT,
+    REQUESTS_TOTAL,
+    REQUEST_SECONDS,
+    server_timing_header,
+    start_request_trace,
+    trace_header,
+)
+from app.services.profiler import SlowRequestLog
+
+
+class MetricsMiddleware:
+    """
+    Records request latency, status counts and in-flight requests.
+
+    Stage timings collected while handling the request are attached as a
+    ``Server-Timing`` header when ``server_timing`` is enabled. With
+    ``trace``, a request sent with ``X-Trace: 1`` also gets an ``X-Trace``
+    header listing every stage span with its start offset and duration.
+    Streaming responses only include the stages that finished before the
+    headers were sent.
+
+    Finished requests are offered to ``slow_requests``, which keeps those
+    over its threshold together with their input metadata.
+
+    Implemented as plain ASGI middleware so the response body is passed
+    through without extra buffering.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        server_timing: bool = True,
+        trace: bool = True,
+        slow_requests: Optional[SlowRequestLog] = None
+    ):
+        self.app = app
+        self.server_timing = server_timing
+        self.trace = trace
+        self.slow_requests = slow_requests
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = start_request_trace()
+        start = trace.start
+        timings = trace.timings
+        traced = self.trace and _wants_trace(scope)
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = []
+                if self.server_timing and timings:
+                    header = server_timing_header(
+                        {**timings, "total": time.perf_counter() - start}
+                    )
+                    headers.append((b"server-timing", header.encode("latin-1")))
+                if traced:
+                    headers.append((b"x-trace", trace_header(trace).encode("latin-1")))
+                if headers:
+                    message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # Label by route template so per-item URLs do not explode cardinality
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+            elapsed = time.perf_counter() - start
+            REQUEST_SECONDS.observe(elapsed, endpoint=endpoint)
+            REQUESTS_TOTAL.inc(endpoint=endpoint, status=str(status))
+            if self.slow_requests is not None:
+                self.slow_requests.record(scope["method"], endpoint, status, elapsed, trace)
+
+
+def _wants_trace(scope: Scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"x-trace":
+            return value.strip().lower() in (b"1", b"true", b"yes")
+    return False
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Literal
+
+from pydantic import BaseModel, HttpUrl
+from typing import List, Literal, Optional
 
 class Base64AudioRequest(BaseModel):
     language: Literal["Tamil", "English", "Hindi", "Malayalam", "Telugu"]
@@ -7,10 +8,45 @@ class Base64AudioRequest(BaseModel):
     audioBase64: str
 
 
+class VoiceDetectionRequest(BaseModel):
+    audio_url: HttpUrl
+    language: Optional[str] = None
+    include_segments: bool = False
+
+
+class SegmentScore(BaseModel):
+    start_seconds: float
+    end_seconds: float
+    ai_probability: float
+
+
 class VoiceDetectionResponse(BaseModel):
-    status: str
+    prediction: Literal["AI_GENERATED", "HUMAN"]
+    confidence: float
     language: str
-    classification: Literal["AI_GENERATED", "HUMAN"]
-    confidenceScore: float
-    explanation: str
-    
\ No newline at end of file
+    model_version: str
+    processing_time_ms: int
+    segments: Optional[List[SegmentScore]] = None
+
+
+class BatchDetectionRequest(BaseModel):
+    items: List[VoiceDetectionRequest]
+
+
+class JobRequest(VoiceDetectionRequest):
+    webhook_url: Optional[HttpUrl] = None
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    audio_url: str
+    created_at: float
+    updated_at: float
+    result: Optional[VoiceDetectionResponse] = None
+    error: Optional[str] = None
+    error_status: Optional[int] = None
+
+
+class ErrorResponse(BaseModel):
+    error: str
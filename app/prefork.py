@@ -0,0 +1,205 @@
+"""Pre-fork multi-worker server: load the model once, then fork uvicorn workers."""
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+
+import uvicorn
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Workers that exit sooner than this after starting are restarted with a delay
+_MIN_WORKER_UPTIME_SECONDS = 5.0
+
+# Slot of this process in the pre-fork server; None outside a pre-fork worker
+_worker_index: Optional[int] = None
+_respawned = False
+# Wall-clock time the pre-fork master started, inherited by its workers
+_server_started_at: Optional[float] = None
+
+
+def is_primary_worker() -> bool:
+    """
+    Whether this process should run once-per-server startup tasks.
+
+    True for a single-process server and for the first start of worker 0,
+    so work such as requeueing unfinished jobs is not repeated by every
+    worker or by a worker that was restarted.
+    """
+    return _worker_index is None or (_worker_index == 0 and not _respawned)
+
+
+def worker_index() -> Optional[int]:
+    """Slot of this pre-fork worker (kept across restarts), or None outside one."""
+    return _worker_index
+
+
+def is_respawned_worker() -> bool:
+    """Whether this process replaced a pre-fork worker that died."""
+    return _respawned
+
+
+def server_started_at() -> Optional[float]:
+    """When the pre-fork server started, before any worker; None outside one."""
+    return _server_started_at
+
+
+def worker_threads(workers: int) -> int:
+    """Intra-op threads per worker: ``INFERENCE_INTRA_OP_THREADS`` or an even split of the cores."""
+    if settings.INFERENCE_INTRA_OP_THREADS > 0:
+        return settings.INFERENCE_INTRA_OP_THREADS
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def share_job_store(workers: int) -> None:
+    """
+    Switch background jobs to the SQLite store when several workers serve the API.
+
+    The in-memory store is private to each worker, so a job polled through
+    any other worker would not be found.
+    """
+    if workers > 1 and settings.JOBS_ENABLED and settings.JOBS_STORE == "memory":
+        logger.warning(
+            f"JOBS_STORE=memory cannot be shared by {workers} workers; "
+            f"using JOBS_STORE=sqlite at {settings.JOBS_SQLITE_PATH}"
+        )
+        settings.JOBS_STORE = "sqlite"
+
+
+def serve(host: str, port: int, workers: int) -> None:
+    """
+    Run the API in ``workers`` forked processes sharing one listening socket.
+
+    The master binds the socket, loads the model and imports the app, then
+    forks. Workers inherit the model weights and imported modules
+    copy-on-write, so adding workers adds little memory beyond each
+    worker's own buffers. ``gc.freeze`` keeps the garbage collector from
+    writing to (and so copying) the inherited objects.
+
+    Each worker is pinned to its share of the CPU cores for inference and
+    preprocessing. The master restarts workers that die and forwards
+    SIGTERM/SIGINT to them for a graceful shutdown. Background jobs use
+    the SQLite store so that every worker sees every job.
+
+    Args:
+        host: Interface to listen on
+        port: Port to listen on
+        workers: Worker processes (0 = one per CPU core)
+    """
+    global _server_started_at
+    _server_started_at = time.time()
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    threads = worker_threads(workers)
+    share_job_store(workers)
+
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    if settings.SERVER_PRELOAD_MODEL:
+        from app.services.inference_service import preload_model
+        preload_model()
+    # Import everything the workers run before forking so it is shared
+    from app.main import app
+
+    gc.collect()
+    gc.freeze()
+
+    logger.info(f"Pre-fork server on {host}:{port} with {workers} workers ({threads} threads each)")
+
+    children: Dict[int, int] = {}
+    started: Dict[int, float] = {}
+    stopping = False
+
+    def spawn(index: int, respawned: bool) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(index, respawned, sock, app, workers, threads)
+            except BaseException:
+                logger.exception(f"Worker {index} crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = index
+        started[index] = time.monotonic()
+
+    def shutdown(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    for index in range(workers):
+        spawn(index, respawned=False)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is None or stopping:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        logger.warning(f"Worker {index} (pid {pid}) exited with status {code}, restarting")
+        if time.monotonic() - started[index] < _MIN_WORKER_UPTIME_SECONDS:
+            time.sleep(1.0)
+        if not stopping:
+            spawn(index, respawned=True)
+
+    sock.close()
+    logger.info("Pre-fork server stopped")
+
+
+def _run_worker(index: int, respawned: bool, sock: socket.socket, app, workers: int, threads: int) -> None:
+    """Body of a forked worker: pin threads and serve on the shared socket."""
+    global _worker_index, _respawned
+    _worker_index, _respawned = index, respawned
+
+    # uvicorn installs its own handlers for a graceful shutdown
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    pin_threads(workers, threads)
+    logger.info(f"Worker {index} started (pid {os.getpid()})")
+
+    config = uvicorn.Config(app, lifespan="on", log_level="debug" if settings.DEBUG else "info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def pin_threads(workers: int, threads: int) -> None:
+    """Limit this worker to its share of the cores so workers do not oversubscribe them."""
+    # Inherited by the preprocessing processes this worker spawns
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+    settings.INFERENCE_INTRA_OP_THREADS = threads
+    if settings.PREPROCESS_WORKERS == 0:
+        settings.PREPROCESS_WORKERS = max(1, (os.cpu_count() or 1) // workers)
+
+    # Only torch models are preloaded; do not pull torch into workers that do not use it
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return
+    torch.set_num_threads(threads)
+    if settings.INFERENCE_INTER_OP_THREADS:
+        try:
+            torch.set_num_interop_threads(settings.INFERENCE_INTER_OP_THREADS)
+        except RuntimeError as e:
+            logger.warning(f"Could not set inter-op threads: {str(e)}")
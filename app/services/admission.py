@@ -0,0 +1,270 @@
+"""Admission control: bound concurrent detections and shed overload early."""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from config.settings import settings
+from app.middleware.auth import api_key_id, api_key_quota
+from app.services.metrics import ADMISSION_REJECTED
+from app.services.stage_executor import StageSaturatedError
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejectedError(StageSaturatedError):
+    """
+    Raised when a request is not admitted.
+
+    ``status_code`` is 429 when the caller's API key is over its share and
+    503 when the server as a whole is overloaded; ``retry_after`` is the
+    suggested wait in seconds.
+    """
+
+    def __init__(self, message: str, status_code: int = 503, retry_after: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """A granted slot plus the memory reserved for the request so far."""
+
+    def __init__(self, controller: "AdmissionController", key: str):
+        self.controller = controller
+        self.key = key
+        self.reserved_bytes = 0
+        self.released = False
+
+    def reserve(self, nbytes: int) -> None:
+        """
+        Grow this request's memory reservation to at least ``nbytes``.
+
+        Ignored once the request has left admission, e.g. when work it
+        started is finished for other requests that joined it.
+
+        Raises:
+            AdmissionRejectedError: If the server's memory budget is exhausted
+        """
+        extra = nbytes - self.reserved_bytes
+        if extra <= 0 or self.released:
+            return
+        self.controller._reserve_memory(extra)
+        self.reserved_bytes = nbytes
+
+
+# Ticket of the request being handled in the current task
+_current_ticket: ContextVar[Optional[AdmissionTicket]] = ContextVar("admission_ticket", default=None)
+
+
+def reserve_memory(nbytes: int) -> None:
+    """
+    Reserve memory for the current request, e.g. once Content-Length is known.
+
+    No-op outside an admitted request.
+
+    Raises:
+        AdmissionRejectedError: If the server's memory budget is exhausted
+    """
+    ticket = _current_ticket.get()
+    if ticket is not None:
+        ticket.reserve(nbytes)
+
+
+class AdmissionController:
+    """
+    Gatekeeper in front of the detection pipeline.
+
+    At most ``max_concurrent`` requests run at once; up to ``max_queue``
+    more wait in FIFO order for at most ``queue_timeout`` seconds. A
+    request is rejected immediately instead of queueing when the expected
+    wait (queue position times the recent average service time) would
+    exceed that deadline, so overload is shed before any download starts.
+
+    Each request also reserves memory for its audio (from the declared
+    Content-Length) against ``memory_budget_bytes``.
+
+    Per API key, a caller may hold at most ``per_key_max_concurrent``
+    running or queued requests. With 0, the limit is a fair share: while the
+    server is saturated and several keys have work in flight, each key gets
+    an equal part of the running and queued places; otherwise keys are not
+    limited. A key's own ``max_concurrent`` quota from the key registry
+    applies on top of either.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+        memory_budget_bytes: int,
+        per_key_max_concurrent: int = 0
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.memory_budget_bytes = memory_budget_bytes
+        self.per_key_max_concurrent = per_key_max_concurrent
+
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._per_key: Dict[str, int] = {}
+        self._memory_used = 0
+        # Moving average of how long an admitted request holds its slot
+        self._avg_service_seconds = 0.5
+
+    @property
+    def active(self) -> int:
+        """Requests currently holding a slot."""
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        """Requests waiting for a slot."""
+        return len(self._waiters)
+
+    @property
+    def memory_reserved(self) -> int:
+        """Bytes reserved by admitted requests."""
+        return self._memory_used
+
+    def estimated_wait(self, position: Optional[int] = None) -> float:
+        """Expected seconds until a request at ``position`` in the queue gets a slot."""
+        if position is None:
+            position = len(self._waiters) + 1
+        return position * self._avg_service_seconds / self.max_concurrent
+
+    @asynccontextmanager
+    async def admit(self, api_key: str, reserve_bytes: int = 0) -> AsyncIterator[AdmissionTicket]:
+        """
+        Hold a slot for the duration of the block.
+
+        Args:
+            api_key: Caller's API key, used for per-key limits
+            reserve_bytes: Memory to reserve up front (e.g. an upload's Content-Length)
+
+        Yields:
+            AdmissionTicket for growing the memory reservation
+
+        Raises:
+            AdmissionRejectedError: If the request is over its key's share,
+                the queue is full, the expected wait exceeds the deadline,
+                or the memory budget is exhausted
+        """
+        quota = api_key_quota(api_key)
+        async with self.admit_key(api_key_id(api_key), quota.max_concurrent if quota else 0, reserve_bytes) as ticket:
+            yield ticket
+
+    @asynccontextmanager
+    async def admit_key(self, key: str, key_quota: int = 0, reserve_bytes: int = 0) -> AsyncIterator[AdmissionTicket]:
+        """
+        Hold a slot for a caller identified by its key ID rather than the key.
+
+        Used for work that outlives the request that submitted it, such as
+        background jobs, where only the key's ID is kept.
+
+        Args:
+            key: ``api_key_id`` of the caller's API key
+            key_quota: The key's own ``max_concurrent`` quota (0 = none)
+            reserve_bytes: Memory to reserve up front
+
+        Yields:
+            AdmissionTicket for growing the memory reservation
+
+        Raises:
+            AdmissionRejectedError: As for ``admit``
+        """
+        self._check_key(key, key_quota)
+
+        self._per_key[key] = self._per_key.get(key, 0) + 1
+        ticket = AdmissionTicket(self, key)
+        try:
+            await self._acquire_slot()
+            started = time.monotonic()
+            try:
+                ticket.reserve(reserve_bytes)
+                token = _current_ticket.set(ticket)
+                try:
+                    yield ticket
+                finally:
+                    _current_ticket.reset(token)
+            finally:
+                ticket.released = True
+                self._memory_used -= ticket.reserved_bytes
+                elapsed = time.monotonic() - started
+                self._avg_service_seconds = 0.8 * self._avg_service_seconds + 0.2 * elapsed
+                self._release_slot()
+        finally:
+            self._per_key[key] -= 1
+            if not self._per_key[key]:
+                del self._per_key[key]
+
+    def _check_key(self, key: str, key_quota: int = 0) -> None:
+        held = self._per_key.get(key, 0)
+        if 0 < key_quota <= held:
+            self._reject("key_quota", f"Too many concurrent requests for this API key (quota {key_quota})", 429)
+        if self.per_key_max_concurrent > 0:
+            limit = self.per_key_max_concurrent
+        else:
+            keys = len(self._per_key) + (0 if key in self._per_key else 1)
+            if keys < 2 or self._active < self.max_concurrent:
+                return
+            # Saturated and shared: split running and queued places evenly across keys
+            limit = max(1, math.ceil((self.max_concurrent + self.max_queue) / keys))
+
+        if held >= limit:
+            self._reject("key_limit", f"Too many concurrent requests for this API key (limit {limit})", 429)
+
+    async def _acquire_slot(self) -> None:
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full", "Server busy: admission queue is full", 503)
+        if self.estimated_wait() > self.queue_timeout:
+            self._reject("deadline", "Server busy: expected wait exceeds the queue deadline", 503)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject("timeout", "Server busy: timed out waiting for a slot", 503)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the caller went away
+                self._release_slot()
+            raise
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+
+    def _release_slot(self) -> None:
+        # Hand the slot straight to the next live waiter so nobody can cut in line
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def _reserve_memory(self, nbytes: int) -> None:
+        if self._memory_used + nbytes > self.memory_budget_bytes:
+            self._reject("memory", "Server busy: memory budget exhausted", 503)
+        self._memory_used += nbytes
+
+    def _reject(self, reason: str, message: str, status_code: int) -> None:
+        ADMISSION_REJECTED.inc(reason=reason)
+        if status_code == 429:
+            retry_after = settings.BUSY_RETRY_AFTER_SECONDS
+        else:
+            retry_after = max(settings.BUSY_RETRY_AFTER_SECONDS, math.ceil(self.estimated_wait()))
+        raise AdmissionRejectedError(message, status_code=status_code, retry_after=retry_after)
@@ -0,0 +1,273 @@
+"""Registry of API keys: salted digests, hot reload and per-key rate quotas."""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket refilled at ``rate`` tokens per second, holding at most ``capacity``."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        """
+        Take one token.
+
+        Returns:
+            0 if a token was taken, otherwise seconds until one is available
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+@dataclass
+class ApiKey:
+    """One registered key: its salted digest and quotas (0 = unlimited)."""
+    name: str
+    digest: str
+    rate_per_second: float = 0.0
+    burst: int = 0
+    max_concurrent: int = 0
+    disabled: bool = False
+    bucket: Optional[TokenBucket] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.rate_per_second > 0 and self.bucket is None:
+            self.bucket = TokenBucket(self.rate_per_second, self.burst or self.rate_per_second)
+
+    def throttle(self) -> float:
+        """Seconds the caller must wait before this request is allowed (0 = allowed now)."""
+        if self.bucket is None:
+            return 0.0
+        return self.bucket.take(time.monotonic())
+
+
+def key_digest(token: str, salt: bytes) -> str:
+    """Salted digest under which a key is stored (keyed BLAKE2b)."""
+    return hashlib.blake2b(token.encode(), key=salt, digest_size=32).hexdigest()
+
+
+class ApiKeyRegistry:
+    """
+    In-memory index of API keys.
+
+    Keys are stored as keyed-BLAKE2b digests under a per-file salt, never
+    in plain text. Checking a token hashes it once and looks the digest up
+    in a dict, so the cost is a few microseconds whatever the number of
+    keys. The lookup compares digests, not tokens: without the salt a
+    caller cannot choose a token whose digest shares a prefix with a
+    stored one, so lookup timing reveals nothing about the keys. API keys
+    are long random secrets, so a fast hash is enough; a slow password
+    hash would only add latency.
+
+    With a key file (``API_KEYS_FILE``), its modification time is checked
+    every ``reload_seconds``. A changed file is parsed in a background
+    thread and swapped in whole, so requests never wait for a reload.
+    Rate-limit state carries over for keys that keep their name. Without a
+    file, the single ``settings.API_KEY`` is registered under the name
+    ``default``.
+
+    Key file format::
+
+        {"salt": "<hex>", "keys": [{"name": "acme", "digest": "<hex>",
+          "rate_per_second": 10, "burst": 20, "max_concurrent": 4}]}
+
+    ``python -m app.services.api_keys add <file> <name>`` creates a key.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        fallback_key: Optional[str] = None,
+        reload_seconds: float = 5.0,
+        defaults: Optional[Dict[str, float]] = None
+    ):
+        """
+        Args:
+            path: JSON key file; None registers ``fallback_key`` only
+            fallback_key: Key accepted when there is no key file
+            reload_seconds: How often to check the key file for changes
+            defaults: Quotas for keys that do not set their own
+                (``rate_per_second``, ``burst``, ``max_concurrent``)
+
+        Raises:
+            ValueError: If the key file cannot be loaded
+        """
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self.defaults = defaults or {}
+        # (salt, digest -> key, name -> key), replaced as one object so readers never mix old and new
+        self._keys: Tuple[bytes, Dict[str, ApiKey], Dict[str, ApiKey]] = (b"", {}, {})
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._reloading = False
+
+        if path:
+            self._mtime = os.stat(path).st_mtime
+            self._keys = _indexed(*self._load(path))
+            self._next_check = time.monotonic() + reload_seconds
+        elif fallback_key:
+            salt = secrets.token_bytes(16)
+            entry = self._entry({"name": "default"}, key_digest(fallback_key, salt))
+            self._keys = _indexed(salt, {entry.digest: entry})
+        logger.info(f"API key registry loaded with {len(self)} key(s)")
+
+    def __len__(self) -> int:
+        return len(self._keys[1])
+
+    def authenticate(self, token: str) -> Optional[ApiKey]:
+        """The registered, enabled key matching ``token``, or None."""
+        if self.path and time.monotonic() >= self._next_check:
+            self._check_reload()
+
+        salt, index, _ = self._keys
+        digest = key_digest(token, salt)
+        entry = index.get(digest)
+        if entry is None or entry.disabled:
+            return None
+        return entry
+
+    def get(self, name: str) -> Optional[ApiKey]:
+        """The registered, enabled key called ``name``, or None."""
+        entry = self._keys[2].get(name)
+        if entry is None or entry.disabled:
+            return None
+        return entry
+
+    def _check_reload(self) -> None:
+        self._next_check = time.monotonic() + self.reload_seconds
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            logger.error(f"Cannot stat API key file {self.path}, keeping current keys: {str(e)}")
+            return
+        if mtime == self._mtime or self._reloading:
+            return
+        self._reloading = True
+        threading.Thread(target=self._reload, args=(mtime,), name="api-key-reload", daemon=True).start()
+
+    def _reload(self, mtime: float) -> None:
+        try:
+            salt, index = self._load(self.path)
+            # Keep rate-limit state of keys that are still there
+            previous = self._keys[2]
+            for entry in index.values():
+                old = previous.get(entry.name)
+                if old is not None and old.bucket is not None and entry.bucket is not None:
+                    old.bucket.rate, old.bucket.capacity = entry.bucket.rate, entry.bucket.capacity
+                    entry.bucket = old.bucket
+            self._keys = _indexed(salt, index)
+            logger.info(f"Reloaded API key file {self.path} ({len(index)} keys)")
+        except ValueError as e:
+            logger.error(f"Cannot reload API key file, keeping current keys: {str(e)}")
+        finally:
+            # A broken file is not retried until it changes again
+            self._mtime = mtime
+            self._reloading = False
+
+    def _load(self, path: str) -> Tuple[bytes, Dict[str, ApiKey]]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            salt = bytes.fromhex(data["salt"])
+            index: Dict[str, ApiKey] = {}
+            names = set()
+            for item in data["keys"]:
+                entry = self._entry(item, item["digest"])
+                if entry.name in names or entry.digest in index:
+                    raise ValueError(f"duplicate key '{entry.name}'")
+                names.add(entry.name)
+                index[entry.digest] = entry
+        except (OSError, KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid API key file {path}: {str(e)}")
+        if not 8 <= len(salt) <= 64:
+            raise ValueError(f"Invalid API key file {path}: salt must be 8-64 bytes")
+        return salt, index
+
+    def _entry(self, item: dict, digest: str) -> ApiKey:
+        return ApiKey(
+            name=str(item["name"]),
+            digest=str(digest),
+            rate_per_second=float(item.get("rate_per_second", self.defaults.get("rate_per_second", 0))),
+            burst=int(item.get("burst", self.defaults.get("burst", 0))),
+            max_concurrent=int(item.get("max_concurrent", self.defaults.get("max_concurrent", 0))),
+            disabled=bool(item.get("disabled", False))
+        )
+
+
+def _indexed(salt: bytes, index: Dict[str, ApiKey]) -> Tuple[bytes, Dict[str, ApiKey], Dict[str, ApiKey]]:
+    """Registry state: the salt, keys by digest and the same keys by name."""
+    return salt, index, {entry.name: entry for entry in index.values()}
+
+
+def add_key(path: str, name: str, quotas: Dict[str, float]) -> str:
+    """
+    Create a random key, add its digest to the key file and return the key.
+
+    The key itself is not stored and cannot be recovered.
+    """
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    else:
+        data = {"salt": secrets.token_hex(16), "keys": []}
+    keys: List[dict] = data["keys"]
+    if any(item["name"] == name for item in keys):
+        raise ValueError(f"A key named '{name}' already exists")
+
+    token = secrets.token_urlsafe(32)
+    keys.append({"name": name, "digest": key_digest(token, bytes.fromhex(data["salt"])), **quotas})
+    # Write then rename, so a running server never reads a half-written file
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_path, path)
+    return token
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Manage the API key file (API_KEYS_FILE).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="Create a key and print it once")
+    add.add_argument("file", help="Key file (created if missing)")
+    add.add_argument("name", help="Unique name for the key")
+    add.add_argument("--rate", type=float, help="Requests per second")
+    add.add_argument("--burst", type=int, help="Requests allowed at once above the rate")
+    add.add_argument("--max-concurrent", type=int, help="Requests running or queued at once")
+    args = parser.parse_args()
+
+    quotas = {
+        name: value
+        for name, value in (("rate_per_second", args.rate), ("burst", args.burst), ("max_concurrent", args.max_concurrent))
+        if value is not None
+    }
+    try:
+        print(add_key(args.file, args.name, quotas))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""In-memory buffer for downloaded audio with optional spill to disk."""
+import hashlib
+import logging
+import os
+import tempfile
+from typing import List, Optional, Union
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Either raw audio bytes or the path of a spilled file
+AudioSource = Union[bytes, str]
+
+
+class AudioBuffer:
+    """
+    Holds downloaded audio bytes for decoding.
+
+    Chunks are kept in memory until the total size passes ``spool_max_bytes``,
+    after which the buffer spills to a temporary file under
+    ``settings.TEMP_DIR``. The spilled file is deleted when the buffer is
+    closed. A content hash is computed incrementally as chunks arrive.
+    """
+
+    def __init__(self, spool_max_bytes: Optional[int] = None, extension: Optional[str] = None):
+        self.spool_max_bytes = spool_max_bytes if spool_max_bytes is not None else settings.DOWNLOAD_SPOOL_MAX_BYTES
+        self.extension = extension
+        self.size = 0
+        # Set by the downloader for conditional requests
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.not_modified = False
+        # Set by the downloader when it probes the container header
+        self.declared_duration: Optional[float] = None
+        self.truncated = False
+        self._hasher = hashlib.blake2b(digest_size=16)
+        self._chunks: List[bytes] = []
+        self._data: Optional[bytes] = None
+        self._spill_file = None
+
+    @property
+    def in_memory(self) -> bool:
+        """True if the audio has not been spilled to disk."""
+        return self._spill_file is None
+
+    def write(self, chunk: bytes) -> None:
+        """Append a chunk of downloaded bytes."""
+        if self._data is not None:
+            raise ValueError("Audio buffer is already finalized")
+
+        self.size += len(chunk)
+        self._hasher.update(chunk)
+
+        if self._spill_file is not None:
+            self._spill_file.write(chunk)
+            return
+
+        self._chunks.append(chunk)
+        if self.size > self.spool_max_bytes:
+            self._spill()
+
+    def _spill(self) -> None:
+        """Move buffered chunks into a temporary file."""
+        try:
+            os.makedirs(settings.TEMP_DIR, exist_ok=True)
+        except Exception:
+            pass
+
+        self._spill_file = tempfile.NamedTemporaryFile(
+            suffix=self.extension or ".tmp",
+            dir=settings.TEMP_DIR if os.path.exists(settings.TEMP_DIR) else None
+        )
+        for chunk in self._chunks:
+            self._spill_file.write(chunk)
+        self._chunks = []
+        logger.debug(f"Spilled audio buffer to disk: {self._spill_file.name}")
+
+    def peek(self, size: int) -> bytes:
+        """Return up to ``size`` leading bytes without finalizing the buffer."""
+        if self._data is not None:
+            return self._data[:size]
+        if self._spill_file is not None:
+            self._spill_file.flush()
+            with open(self._spill_file.name, "rb") as f:
+                return f.read(size)
+
+        head = bytearray()
+        for chunk in self._chunks:
+            head += chunk[:size - len(head)]
+            if len(head) >= size:
+                break
+        return bytes(head)
+
+    @property
+    def content_hash(self) -> str:
+        """Hex digest of the bytes written so far."""
+        return self._hasher.hexdigest()
+
+    @property
+    def source(self) -> AudioSource:
+        """
+        Decodable audio source.
+
+        Returns the raw bytes when the buffer is in memory, or the path of
+        the spilled file otherwise. Both forms can be sent to worker
+        processes.
+        """
+        if self._spill_file is not None:
+            self._spill_file.flush()
+            return self._spill_file.name
+
+        if self._data is None:
+            self._data = b"".join(self._chunks)
+            self._chunks = []
+        return self._data
+
+    def close(self) -> None:
+        """Release buffered bytes and delete any spilled file."""
+        self._chunks = []
+        self._data = None
+        if self._spill_file is not None:
+            try:
+                self._spill_file.close()
+            except Exception as e:
+                logger.warning(f"Failed to cleanup spilled audio file: {str(e)}")
+            self._spill_file = None
+
+    def __enter__(self) -> "AudioBuffer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
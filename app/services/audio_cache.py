@@ -0,0 +1,242 @@
+"""Cache of preprocessed audio, so re-scoring a clip skips decoding and resampling."""
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+import numpy as np
+
+from config.settings import settings
+from app.services.result_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Bump when preprocessing changes in a way the settings in the key do not capture
+_CACHE_FORMAT = 1
+
+# Sweep the disk tier each time this fraction of its budget has been written
+_SWEEP_FRACTION = 0.1
+
+# Temporary files younger than this may still be being written; older ones were left by a crashed writer
+_TEMP_GRACE_SECONDS = 600.0
+
+
+def save_array(path: str, audio: np.ndarray) -> None:
+    """
+    Write an array as ``.npy`` atomically (temporary file, then rename).
+
+    Safe to call from any process; concurrent writers of the same key
+    simply replace each other's identical file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            np.save(f, audio, allow_pickle=False)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class DecodedAudioCache:
+    """
+    Two-tier cache of preprocessed (mono, resampled, normalized) audio.
+
+    Entries are keyed by the content hash of the encoded audio plus
+    everything preprocessing depends on: ``SAMPLE_RATE``, the decoded
+    window, ``RESAMPLER`` and the duration limit the clip was validated
+    against. Changing the model does not invalidate them, so A/B runs and
+    re-scoring after a model or threshold change only pay for inference.
+
+    The memory tier is a bounded LRU of arrays. The disk tier stores one
+    ``.npy`` file per clip under ``directory`` and returns hits as
+    read-only memory-mapped views, so they cost no copy and are shared
+    through the page cache by every process using the same directory.
+    Disk files are written atomically; their modification time is
+    refreshed on every hit, and a background sweep deletes the least
+    recently used ones once the directory exceeds ``disk_max_bytes``.
+
+    Returned arrays are read-only. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        directory: Optional[str] = None,
+        disk_max_bytes: int = 0
+    ):
+        """
+        Args:
+            max_entries: Arrays kept in memory
+            max_bytes: Memory budget for those arrays
+            directory: Disk tier location (None disables the disk tier)
+            disk_max_bytes: Approximate disk budget (0 disables the disk tier)
+        """
+        self.memory = LRUCache("audio", max_entries, max_bytes, float("inf"))
+        self.directory = directory if directory and disk_max_bytes > 0 else None
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_hits = 0
+        self._lock = threading.Lock()
+        self._written_since_sweep = 0
+        self._sweeping = False
+
+        self._params = (
+            f"{_CACHE_FORMAT}:{settings.SAMPLE_RATE}:"
+            f"{settings.SEGMENT_MAX_SECONDS if settings.SEGMENTED_INFERENCE else settings.ANALYSIS_WINDOW_SECONDS}:"
+            f"{settings.RESAMPLER}"
+        )
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, content_hash: str, max_seconds: Optional[float] = None) -> str:
+        """Cache key of a clip preprocessed with the current settings."""
+        return hashlib.blake2b(f"{content_hash}:{max_seconds}:{self._params}".encode(), digest_size=16).hexdigest()
+
+    def disk_path(self, key: str) -> Optional[str]:
+        """Where the disk tier stores ``key``, or None without a disk tier."""
+        if self.directory is None:
+            return None
+        return os.path.join(self.directory, key[:2], f"{key}.npy")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Look up preprocessed audio in memory, then on disk.
+
+        Returns:
+            The array (memory tier) or a read-only memory-mapped view of
+            it (disk tier), or None on a miss
+        """
+        audio = self.get_from_memory(key)
+        if audio is None:
+            audio = self.get_from_disk(key)
+        return audio
+
+    def get_from_memory(self, key: str) -> Optional[np.ndarray]:
+        """Look up preprocessed audio in the memory tier only; never blocks on I/O."""
+        with self._lock:
+            return self.memory.get(key)
+
+    def get_from_disk(self, key: str) -> Optional[np.ndarray]:
+        """
+        Look up preprocessed audio in the disk tier only.
+
+        Opens the file and refreshes its modification time, so call it off
+        the event loop.
+        """
+        path = self.disk_path(key)
+        if path is None:
+            return None
+        try:
+            audio = np.load(path, mmap_mode="r", allow_pickle=False)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable audio cache file {path}: {str(e)}")
+            self._remove(path)
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        return audio
+
+    def put(self, key: str, audio: np.ndarray, on_disk: bool = False) -> np.ndarray:
+        """
+        Store preprocessed audio in the memory tier.
+
+        Args:
+            key: Key from ``key``
+            audio: Preprocessed audio; it is made read-only
+            on_disk: The array was already written to ``disk_path(key)``
+                (e.g. by the worker that preprocessed it)
+
+        Returns:
+            The stored, now read-only, array
+        """
+        audio.flags.writeable = False
+        with self._lock:
+            self.memory.put(key, audio, size_bytes=audio.nbytes)
+        if on_disk and self.directory is not None:
+            self._account_written(audio.nbytes)
+        return audio
+
+    def store(self, key: str, audio: np.ndarray) -> np.ndarray:
+        """Store preprocessed audio in both tiers, writing the disk copy in this thread."""
+        path = self.disk_path(key)
+        if path is not None:
+            try:
+                save_array(path, audio)
+            except OSError as e:
+                logger.warning(f"Could not write audio cache file {path}: {str(e)}")
+                path = None
+        return self.put(key, audio, on_disk=path is not None)
+
+    def stats(self) -> Dict[str, int]:
+        """Counters and occupancy for monitoring."""
+        with self._lock:
+            return {**self.memory.stats(), "disk_hits": self.disk_hits}
+
+    def _account_written(self, size_bytes: int) -> None:
+        with self._lock:
+            self._written_since_sweep += size_bytes
+            if self._sweeping or self._written_since_sweep < self.disk_max_bytes * _SWEEP_FRACTION:
+                return
+            self._sweeping = True
+            self._written_since_sweep = 0
+        threading.Thread(target=self.sweep, name="audio-cache-sweep", daemon=True).start()
+
+    def sweep(self) -> None:
+        """
+        Delete the least recently used disk files until the tier is within budget.
+
+        Temporary files are left alone until they are ``_TEMP_GRACE_SECONDS``
+        old, so a write in progress in another process is not cut short.
+        """
+        try:
+            files = []
+            total = 0
+            now = time.time()
+            for shard in os.scandir(self.directory):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    if entry.name.endswith(".tmp") and now - stat.st_mtime < _TEMP_GRACE_SECONDS:
+                        # Another process may still be writing it
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+            if total > self.disk_max_bytes:
+                # Leave headroom so the next sweep is not triggered right away
+                target = self.disk_max_bytes * (1.0 - _SWEEP_FRACTION)
+                removed = 0
+                for _, size, path in sorted(files):
+                    if total <= target:
+                        break
+                    self._remove(path)
+                    total -= size
+                    removed += 1
+                logger.info(f"Audio cache sweep removed {removed} files ({total / 1e6:.0f}MB left)")
+        except OSError as e:
+            logger.warning(f"Audio cache sweep failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._sweeping = False
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -1,46 +1,166 @@
 """Audio downloader service with validation and timeout."""
+import asyncio
 import httpx
+import importlib.util
 import logging
-from typing import Optional
-from pathlib import Path
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
 from config.settings import settings
-import tempfile
-import os
+from app.services.admission import AdmissionRejectedError, reserve_memory
+from app.services.audio_buffer import AudioBuffer
+from app.services.audio_header import probe_header
+from app.services.metrics import DOWNLOAD_BYTES, time_stage
+from app.services.result_cache import UrlCacheEntry
 
 logger = logging.getLogger(__name__)
 
 
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create the long-lived HTTP client used for audio downloads.
+    
+    Connections are kept alive and pooled across requests. HTTP/2 is enabled
+    when ``settings.HTTP2_ENABLED`` is set and the optional ``h2`` package is
+    installed.
+    """
+    http2 = settings.HTTP2_ENABLED
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP2_ENABLED is set but the 'h2' package is not installed, using HTTP/1.1")
+        http2 = False
+    
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS
+    )
+    timeout = httpx.Timeout(
+        settings.DOWNLOAD_TIMEOUT_SECONDS,
+        connect=settings.DOWNLOAD_CONNECT_TIMEOUT_SECONDS
+    )
+    
+    logger.info(
+        f"Creating HTTP client (http2={http2}, max_connections={settings.HTTP_MAX_CONNECTIONS}, "
+        f"per_host={settings.HTTP_MAX_CONNECTIONS_PER_HOST})"
+    )
+    return httpx.AsyncClient(
+        timeout=timeout,
+        limits=limits,
+        http2=http2,
+        follow_redirects=True,
+        headers={"User-Agent": "Mozilla/5.0 (compatible; VoiceDetectionAPI/1.0)"}
+    )
+
+
 class AudioDownloader:
     """Service for downloading and validating audio files from URLs."""
     
-    def __init__(self):
-        self.timeout = 10.0  # 10-second timeout as required
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self.timeout = settings.DOWNLOAD_TIMEOUT_SECONDS
         self.max_duration = settings.MAX_AUDIO_DURATION_SECONDS
         self.supported_formats = settings.SUPPORTED_AUDIO_FORMATS
         self.max_file_size = 10 * 1024 * 1024  # 10 MB limit
+        self.max_connections_per_host = settings.HTTP_MAX_CONNECTIONS_PER_HOST
+        self.analysis_seconds = (
+            settings.SEGMENT_MAX_SECONDS if settings.SEGMENTED_INFERENCE else settings.ANALYSIS_WINDOW_SECONDS
+        )
+        self.truncate_to_window = settings.DOWNLOAD_TRUNCATE_TO_WINDOW
+        self.header_probe_max_bytes = settings.HEADER_PROBE_MAX_BYTES
+        self._client = client
+        self._owns_client = client is None
+        # Only hosts with downloads in flight or waiting have an entry
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._host_users: Dict[str, int] = {}
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared client, creating a private one if none was provided."""
+        if self._client is None:
+            self._client = create_http_client()
+        return self._client
     
-    async def download(self, url: str) -> str:
+    @asynccontextmanager
+    async def _host_slot(self, url: str) -> AsyncIterator[None]:
+        """
+        Hold one of the download slots of the URL's host.
+        
+        A host's semaphore is dropped once nothing holds or waits for it,
+        so a stream of distinct hosts does not grow the table.
+        """
+        host = httpx.URL(url).host
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = asyncio.Semaphore(self.max_connections_per_host)
+            self._host_slots[host] = slot
+        self._host_users[host] = self._host_users.get(host, 0) + 1
+        try:
+            async with slot:
+                yield
+        finally:
+            self._host_users[host] -= 1
+            if self._host_users[host] == 0:
+                del self._host_users[host]
+                del self._host_slots[host]
+    
+    async def aclose(self) -> None:
+        """Close the HTTP client if this downloader created it."""
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def download(
+        self,
+        url: str,
+        validators: Optional[UrlCacheEntry] = None,
+        max_seconds: Optional[float] = None
+    ) -> AudioBuffer:
         """
         Download audio file from URL with validation (async).
         
+        The body is kept in memory and only spills to a temporary file if it
+        exceeds ``settings.DOWNLOAD_SPOOL_MAX_BYTES``. Callers must close the
+        returned buffer.
+        
+        When ``validators`` are given the request is conditional; if the
+        server answers 304 the returned buffer is empty and has
+        ``not_modified`` set.
+        
+        The container header is probed as soon as the first bytes arrive.
+        Clips whose declared duration exceeds ``max_seconds`` are rejected
+        before the body is fetched, and for accepted clips the download
+        stops once enough bytes for the analysis window have arrived
+        (``truncated`` is then set on the buffer).
+        
         Args:
             url: URL of the audio file
+            validators: Cached ETag/Last-Modified for a conditional GET
+            max_seconds: Maximum allowed duration in seconds
             
         Returns:
-            Path to downloaded temporary file
+            AudioBuffer holding the downloaded bytes
             
         Raises:
             ValueError: If download fails or file is invalid
+            AdmissionRejectedError: If the file does not fit the memory budget
         """
         try:
             logger.info(f"Downloading audio from URL: {url}")
             
-            headers = {
-                "User-Agent": "Mozilla/5.0 (compatible; VoiceDetectionAPI/1.0)"
-            }
+            client = self._get_client()
+            
+            headers = {}
+            if validators:
+                if validators.etag:
+                    headers["If-None-Match"] = validators.etag
+                if validators.last_modified:
+                    headers["If-Modified-Since"] = validators.last_modified
             
-            async with httpx.AsyncClient(timeout=self.timeout, follow_redirects=True) as client:
+            async with self._host_slot(url):
                 async with client.stream("GET", url, headers=headers) as response:
+                    if validators and response.status_code == 304:
+                        logger.info(f"Audio not modified since last download: {url}")
+                        audio_buffer = AudioBuffer()
+                        audio_buffer.not_modified = True
+                        return audio_buffer
+                    
                     # Validate HTTP status code
                     if response.status_code < 200 or response.status_code >= 300:
                         raise ValueError(f"HTTP {response.status_code}: Invalid status code")
@@ -56,40 +176,50 @@ class AudioDownloader:
                         if size_bytes > self.max_file_size:
                             size_mb = size_bytes / (1024 * 1024)
                             raise ValueError(f"File too large: {size_mb:.2f}MB (max 10MB)")
+                        reserve_memory(size_bytes)
                     
-                    # Create temp directory if needed
-                    try:
-                        os.makedirs(settings.TEMP_DIR, exist_ok=True)
-                    except Exception:
-                        pass
+                    file_extension = self._get_file_extension(url, content_type)
+                    if file_extension not in self.supported_formats:
+                        logger.warning(f"Unsupported format detected: {file_extension}, will attempt conversion")
                     
-                    temp_file = tempfile.NamedTemporaryFile(
-                        delete=False,
-                        suffix=".tmp",
-                        dir=settings.TEMP_DIR if os.path.exists(settings.TEMP_DIR) else None
-                    )
+                    audio_buffer = AudioBuffer(extension=file_extension)
+                    audio_buffer.etag = response.headers.get("ETag")
+                    audio_buffer.last_modified = response.headers.get("Last-Modified")
                     
-                    downloaded_bytes = 0
+                    total_size = int(content_length) if content_length else None
+                    probing = True
+                    byte_budget = None
                     
                     # Stream download with size validation
-                    async for chunk in response.aiter_bytes(chunk_size=8192):
-                        if chunk:
-                            temp_file.write(chunk)
-                            downloaded_bytes += len(chunk)
-                            if downloaded_bytes > self.max_file_size:
-                                temp_file.close()
-                                os.unlink(temp_file.name)
-                                raise ValueError("File size exceeds 10MB limit")
-                    
-                    temp_file.close()
-                    
-                    file_extension = self._get_file_extension(url, content_type)
-                    if file_extension not in self.supported_formats:
-                        logger.warning(f"Unsupported format detected: {file_extension}, will attempt conversion")
+                    try:
+                        async for chunk in response.aiter_bytes(chunk_size=65536):
+                            if chunk:
+                                audio_buffer.write(chunk)
+                                if audio_buffer.size > self.max_file_size:
+                                    raise ValueError("File size exceeds 10MB limit")
+                                if total_size is None:
+                                    # No declared size; grow the reservation as the body arrives
+                                    reserve_memory(audio_buffer.size)
+                                if probing:
+                                    with time_stage("header_probe"):
+                                        probing, byte_budget = self._probe(audio_buffer, total_size, max_seconds)
+                                if byte_budget is not None and audio_buffer.size >= byte_budget:
+                                    # Enough for the analysis window; drop the rest of the body
+                                    audio_buffer.truncated = audio_buffer.size != total_size
+                                    break
+                    except BaseException:
+                        audio_buffer.close()
+                        raise
                     
-                    logger.info(f"Successfully downloaded audio file: {temp_file.name} ({downloaded_bytes / (1024*1024):.2f}MB)")
-                    return temp_file.name
+                    DOWNLOAD_BYTES.inc(audio_buffer.size)
+                    logger.info(
+                        f"Successfully downloaded audio ({audio_buffer.size / (1024*1024):.2f}MB, "
+                        f"in_memory={audio_buffer.in_memory}, truncated={audio_buffer.truncated})"
+                    )
+                    return audio_buffer
                     
+        except AdmissionRejectedError:
+            raise
         except httpx.TimeoutException:
             logger.error(f"Timeout downloading audio from {url}")
             raise ValueError(f"Download timeout after {self.timeout} seconds")
@@ -103,6 +233,51 @@ class AudioDownloader:
             logger.error(f"Unexpected error during download: {str(e)}")
             raise ValueError(f"Download failed: {str(e)}")
     
+    def _probe(
+        self,
+        audio_buffer: AudioBuffer,
+        total_size: Optional[int],
+        max_seconds: Optional[float]
+    ) -> Tuple[bool, Optional[int]]:
+        """
+        Inspect the container header of a partially downloaded file.
+        
+        A byte budget is only returned when the header declares the
+        duration, which has then been checked against ``max_seconds``.
+        Without it (streamed WAV, MP3 without a Xing/VBRI frame count) the
+        whole file is downloaded so that ``check_duration`` sees its real
+        length.
+        
+        Returns:
+            Tuple of (keep_probing, byte_budget); byte_budget is the number of
+            leading bytes needed for the analysis window, or None to download
+            the whole file
+            
+        Raises:
+            ValueError: If the declared duration exceeds max_seconds
+        """
+        header = probe_header(audio_buffer.peek(self.header_probe_max_bytes), total_size)
+        if header is None:
+            # Unknown format, or the header is not complete yet
+            return audio_buffer.size < self.header_probe_max_bytes, None
+        
+        if header.duration is None:
+            # Truncating would hide an over-long clip from the duration check
+            return False, None
+        
+        audio_buffer.declared_duration = header.duration
+        if max_seconds is not None and header.duration > max_seconds:
+            raise ValueError(f"Audio duration exceeds {max_seconds} seconds")
+        
+        if not self.truncate_to_window:
+            return False, None
+        
+        byte_budget = header.bytes_for(self.analysis_seconds)
+        if byte_budget is not None and header.format != "wav":
+            # Compressed formats are only approximately linear in size; keep a margin
+            byte_budget = int(byte_budget * 1.1) + 32 * 1024
+        return False, byte_budget
+    
     def _get_file_extension(self, url: str, content_type: str) -> str:
         """Extract file extension from URL or content type."""
         url_lower = url.lower()
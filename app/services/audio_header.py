@@ -0,0 +1,159 @@
+"""Lightweight container header parsing for partially downloaded audio."""
+import struct
+from dataclasses import dataclass
+from typing import Optional
+
+# MPEG audio bitrate tables in kbps, indexed by bitrate index
+_MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000],
+}
+
+
+@dataclass
+class HeaderInfo:
+    """Duration and byte layout read from an audio container header."""
+    format: str
+    duration: Optional[float]
+    data_offset: int
+    bytes_per_second: Optional[float]
+
+    def bytes_for(self, seconds: float) -> Optional[int]:
+        """Approximate number of leading bytes needed to decode ``seconds`` of audio."""
+        if not self.bytes_per_second:
+            return None
+        return self.data_offset + int(self.bytes_per_second * seconds)
+
+
+def probe_header(head: bytes, total_size: Optional[int] = None) -> Optional[HeaderInfo]:
+    """
+    Read duration information from the first bytes of an audio file.
+
+    Supports WAV (RIFF), FLAC (STREAMINFO) and MP3 (Xing/Info or VBRI frame
+    count; MP3s without one report no duration).
+
+    Args:
+        head: Leading bytes of the file
+        total_size: Full file size, if known (e.g. from Content-Length)
+
+    Returns:
+        HeaderInfo, or None if the format is not recognised or more bytes
+        are needed
+    """
+    try:
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            return _probe_wav(head, total_size)
+        if head[:4] == b"fLaC":
+            return _probe_flac(head, total_size)
+        return _probe_mp3(head, total_size)
+    except (struct.error, IndexError):
+        return None
+
+
+def _probe_wav(head: bytes, total_size: Optional[int]) -> Optional[HeaderInfo]:
+    byte_rate = None
+    pos = 12
+    while pos + 8 <= len(head):
+        chunk_id = head[pos:pos + 4]
+        chunk_size = struct.unpack_from("<I", head, pos + 4)[0]
+        if chunk_id == b"fmt ":
+            byte_rate = struct.unpack_from("<I", head, pos + 16)[0]
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            data_offset = pos + 8
+            if chunk_size in (0, 0xFFFFFFFF):
+                # Streamed WAV without a final size; fall back to the file size
+                if total_size is None:
+                    return HeaderInfo("wav", None, data_offset, float(byte_rate))
+                chunk_size = total_size - data_offset
+            return HeaderInfo("wav", chunk_size / byte_rate, data_offset, float(byte_rate))
+        pos += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def _probe_flac(head: bytes, total_size: Optional[int]) -> Optional[HeaderInfo]:
+    # STREAMINFO is always the first metadata block
+    info = head[8:8 + 34]
+    if len(info) < 34:
+        return None
+    packed = int.from_bytes(info[10:18], "big")
+    sample_rate = packed >> 44
+    total_samples = packed & ((1 << 36) - 1)
+    if not sample_rate or not total_samples:
+        return None
+
+    duration = total_samples / sample_rate
+    bytes_per_second = total_size / duration if total_size else None
+    return HeaderInfo("flac", duration, 0, bytes_per_second)
+
+
+def _probe_mp3(head: bytes, total_size: Optional[int]) -> Optional[HeaderInfo]:
+    pos = 0
+    if head[:3] == b"ID3":
+        tag_size = 0
+        for b in head[6:10]:
+            tag_size = (tag_size << 7) | (b & 0x7F)
+        pos = 10 + tag_size
+        if len(head) < pos + 4:
+            return None
+
+    # Skip tag padding; anything other than a frame sync means this is not MP3
+    while pos < len(head) and head[pos] == 0:
+        pos += 1
+    if pos + 4 > len(head) or not (head[pos] == 0xFF and head[pos + 1] & 0xE0 == 0xE0):
+        return None
+
+    b1, b2, b3 = head[pos + 1], head[pos + 2], head[pos + 3]
+    version = {3: 1, 2: 2, 0: 2.5}.get((b1 >> 3) & 0x03)
+    layer = {3: 1, 2: 2, 1: 3}.get((b1 >> 1) & 0x03)
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version is None or layer is None or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    bitrate = _MP3_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][sample_rate_index]
+    channels = 1 if (b3 >> 6) == 3 else 2
+
+    # A Xing/Info or VBRI header in the first frame carries the exact frame count
+    if version == 1:
+        side_info = 17 if channels == 1 else 32
+    else:
+        side_info = 9 if channels == 1 else 17
+    xing = pos + 4 + side_info
+    vbri = pos + 4 + 32
+    frames = stream_bytes = None
+    if head[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack_from(">I", head, xing + 4)[0]
+        if flags & 0x1:
+            frames = struct.unpack_from(">I", head, xing + 8)[0]
+            if flags & 0x2:
+                stream_bytes = struct.unpack_from(">I", head, xing + 12)[0]
+    elif head[vbri:vbri + 4] == b"VBRI":
+        stream_bytes, frames = struct.unpack_from(">II", head, vbri + 10)
+
+    if frames is None:
+        # The first frame's bitrate says nothing reliable about a VBR stream
+        # (it is often a low-rate silent frame), so leave the duration to
+        # the decoder rather than reject a valid clip on a bad estimate
+        return HeaderInfo("mp3", None, pos, bitrate / 8)
+
+    samples_per_frame = 384 if layer == 1 else (1152 if version == 1 or layer == 2 else 576)
+    duration = frames * samples_per_frame / sample_rate
+    if duration <= 0:
+        return None
+    if stream_bytes:
+        return HeaderInfo("mp3", duration, pos, stream_bytes / duration)
+    if total_size:
+        return HeaderInfo("mp3", duration, pos, (total_size - pos) / duration)
+    return HeaderInfo("mp3", duration, pos, bitrate / 8)
@@ -1,10 +1,15 @@
 """Audio preprocessing pipeline for model input."""
-import librosa
-import soundfile as sf
 import numpy as np
 import logging
-from pathlib import Path
+import io
+import tempfile
+import time
+import wave
+from typing import BinaryIO, Dict, Optional, Tuple, Union
 from config.settings import settings
+from app.services.audio_buffer import AudioSource
+from app.services.buffer_pool import BufferPool
+from app.services.resampler import Resampler
 import os
 
 logger = logging.getLogger(__name__)
@@ -16,20 +21,28 @@ class AudioPreprocessor:
     def __init__(self):
         self.target_sr = settings.SAMPLE_RATE
         self.max_duration = settings.MAX_AUDIO_DURATION_SECONDS
+        # Segmented inference scores the whole clip, so decode all of it
+        self.window_seconds = (
+            settings.SEGMENT_MAX_SECONDS if settings.SEGMENTED_INFERENCE else settings.ANALYSIS_WINDOW_SECONDS
+        )
+        self.resampler = Resampler(self.target_sr, settings.RESAMPLER)
+        self._buffers = BufferPool()
     
-    def check_duration(self, audio_path: str, max_seconds: float = 30.0) -> None:
+    def check_duration(self, audio_source: AudioSource, max_seconds: float = 30.0) -> None:
         """
         Quickly check audio duration using metadata (fast, no full load).
         
         Args:
-            audio_path: Path to audio file
+            audio_source: Path to audio file or raw audio bytes
             max_seconds: Maximum allowed duration in seconds
             
         Raises:
             ValueError: If duration exceeds max_seconds or file cannot be read
         """
+        import soundfile as sf
+        
         try:
-            info = sf.info(audio_path)
+            info = sf.info(self._open(audio_source))
             duration = info.duration
             
             if duration > max_seconds:
@@ -40,12 +53,22 @@ class AudioPreprocessor:
                 raise
             raise ValueError(f"Failed to read audio metadata: {str(e)}")
     
-    def preprocess(self, audio_path: str) -> np.ndarray:
+    def preprocess(
+        self,
+        audio_source: AudioSource,
+        timings: Optional[Dict[str, float]] = None,
+        info: Optional[Dict[str, object]] = None
+    ) -> np.ndarray:
         """
         Preprocess audio file: load, convert format, normalize, resample.
         
         Args:
-            audio_path: Path to audio file
+            audio_source: Path to audio file or raw audio bytes
+            timings: Optional dict that receives the seconds spent in the
+                decode, downmix, resample and normalize steps
+            info: Optional dict that receives what the decoder found:
+                ``decoder``, ``format``, ``subtype``, ``sample_rate``,
+                ``channels`` and ``duration_seconds`` (when known)
             
         Returns:
             Preprocessed audio array (mono, normalized, resampled)
@@ -54,46 +77,24 @@ class AudioPreprocessor:
             ValueError: If audio processing fails
         """
         try:
-            logger.info(f"Preprocessing audio file: {audio_path}")
-            
-            if not os.path.exists(audio_path):
-                raise ValueError(f"Audio file not found: {audio_path}")
-            
-            # Check if file is WAV format for optimized loading
-            file_ext = Path(audio_path).suffix.lower()
-            is_wav = file_ext == '.wav'
-            
-            if is_wav:
-                # Fast path: Use soundfile for WAV files
-                audio, sr = sf.read(audio_path, dtype='float32')
-                
-                # Apply 10-second limit
-                max_samples = int(10 * sr)
-                if len(audio) > max_samples:
-                    audio = audio[:max_samples]
-                
-                # Convert to mono if stereo
-                if audio.ndim > 1:
-                    audio = np.mean(audio, axis=1)
-                
-                # Resample only if sample rate != 16000
-                if sr != self.target_sr:
-                    audio = librosa.resample(audio, orig_sr=sr, target_sr=self.target_sr, res_type="kaiser_fast")
-                    sr = self.target_sr
+            if isinstance(audio_source, str):
+                logger.info(f"Preprocessing audio file: {audio_source}")
+                if not os.path.exists(audio_source):
+                    raise ValueError(f"Audio file not found: {audio_source}")
             else:
-                # Fallback: Use librosa for non-WAV formats (MP3, M4A, FLAC, etc.)
-                audio, sr = librosa.load(
-                    audio_path,
-                    sr=self.target_sr,
-                    mono=True,
-                    duration=10,
-                    res_type="kaiser_fast"
-                )
+                logger.info(f"Preprocessing in-memory audio ({len(audio_source)} bytes)")
+            
+            # Decode only the analysis window, never the whole file
+            start = time.perf_counter()
+            audio, sr = self._decode(audio_source, info)
+            if timings is not None:
+                timings["decode"] = time.perf_counter() - start
             
             if len(audio) == 0:
                 raise ValueError("Audio file is empty or corrupted")
             
-            audio = self._normalize(audio)
+            audio = self._finalize(audio, sr, timings)
+            sr = self.target_sr
             
             logger.info(f"Preprocessed audio: shape={audio.shape}, sr={sr}, duration={len(audio)/sr:.2f}s")
             return audio
@@ -102,12 +103,135 @@ class AudioPreprocessor:
             logger.error(f"Audio preprocessing failed: {str(e)}")
             raise ValueError(f"Audio preprocessing failed: {str(e)}")
     
-    def _normalize(self, audio: np.ndarray) -> np.ndarray:
-        """Normalize audio to [-1, 1] range."""
-        if np.max(np.abs(audio)) > 0:
-            audio = audio / (np.max(np.abs(audio)) + 1e-8)
+    def _open(self, audio_source: AudioSource) -> Union[str, BinaryIO]:
+        """Return something soundfile can read: a path or a file-like view of the bytes."""
+        if isinstance(audio_source, str):
+            return audio_source
+        return io.BytesIO(audio_source)
+    
+    def _decode(self, audio_source: AudioSource, info: Optional[Dict[str, object]] = None) -> Tuple[np.ndarray, int]:
+        """
+        Decode at most ``window_seconds`` of audio.
+        
+        Every format libsndfile understands (WAV, FLAC, OGG, MP3) is read
+        with a frame-bounded read, so decode time and memory depend on the
+        window rather than the file length. Other formats (e.g. M4A) are
+        streamed through audioread and decoding stops once the window is
+        filled.
+        
+        The returned array may be a pooled scratch buffer. ``info``, if
+        given, receives the container details the decoder reports.
+        
+        Returns:
+            Tuple of (float32 audio, frames x channels or 1-D, sample rate)
+        """
+        # Imported on first use so the API process does not load libsndfile
+        import soundfile as sf
+        
+        try:
+            with sf.SoundFile(self._open(audio_source)) as f:
+                if info is not None:
+                    info.update(
+                        decoder="libsndfile",
+                        format=f.format,
+                        subtype=f.subtype,
+                        sample_rate=f.samplerate,
+                        channels=f.channels,
+                        duration_seconds=round(f.frames / f.samplerate, 3) if f.frames > 0 else None
+                    )
+                max_frames = int(self.window_seconds * f.samplerate)
+                if f.frames > 0:
+                    max_frames = min(max_frames, f.frames)
+                shape = (max_frames, f.channels) if f.channels > 1 else (max_frames,)
+                # Decode straight into this worker's scratch buffer
+                audio = f.read(out=self._buffers.get("decode", shape))
+                return audio, f.samplerate
+        except sf.SoundFileRuntimeError:
+            logger.debug("libsndfile cannot decode this audio, falling back to audioread")
+        
+        if isinstance(audio_source, str):
+            return self._audioread_decode(audio_source, info)
+        
+        # audioread only reads from paths
+        with tempfile.NamedTemporaryFile(
+            suffix=".tmp",
+            dir=settings.TEMP_DIR if os.path.exists(settings.TEMP_DIR) else None
+        ) as temp_file:
+            temp_file.write(audio_source)
+            temp_file.flush()
+            return self._audioread_decode(temp_file.name, info)
+    
+    def _audioread_decode(self, audio_path: str, info: Optional[Dict[str, object]] = None) -> Tuple[np.ndarray, int]:
+        """Stream-decode with audioread, stopping after the analysis window."""
+        import audioread
+        
+        with audioread.audio_open(audio_path) as f:
+            sr, channels = f.samplerate, f.channels
+            if info is not None:
+                info.update(
+                    decoder="audioread",
+                    sample_rate=sr,
+                    channels=channels,
+                    duration_seconds=round(f.duration, 3) if f.duration else None
+                )
+            max_samples = int(self.window_seconds * sr) * channels
+            blocks = []
+            n_samples = 0
+            for block in f:
+                pcm = np.frombuffer(block, dtype='<i2')
+                blocks.append(pcm[:max_samples - n_samples])
+                n_samples += len(blocks[-1])
+                if n_samples >= max_samples:
+                    break
+        
+        if not blocks:
+            return np.zeros(0, dtype=np.float32), sr
+        
+        audio = np.concatenate(blocks).astype(np.float32) / 32768.0
+        if channels > 1:
+            audio = audio[:len(audio) - len(audio) % channels].reshape(-1, channels)
+        return audio, sr
+    
+    def _finalize(self, audio: np.ndarray, sr: int, timings: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """
+        Downmix, resample and peak-normalize decoded audio.
+        
+        Downmixing writes into a pooled scratch buffer and normalization
+        scales in place, so the only allocation is the returned array
+        (never a pooled buffer).
+        """
+        start = time.perf_counter()
+        if audio.ndim > 1:
+            mono = self._buffers.get("mono", (len(audio),))
+            np.mean(audio, axis=1, out=mono)
+            audio = mono
+        downmixed = time.perf_counter()
+        
+        if sr != self.target_sr:
+            audio = self.resampler.resample(audio, sr)
+            out = audio
+        else:
+            out = np.empty_like(audio)
+        resampled = time.perf_counter()
+        
+        audio = self._normalize(audio, out=out)
+        if timings is not None:
+            timings["downmix"] = downmixed - start
+            timings["resample"] = resampled - downmixed
+            timings["normalize"] = time.perf_counter() - resampled
         return audio
     
+    def _normalize(self, audio: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Normalize audio to [-1, 1] range, writing into ``out`` if given."""
+        # Peak from max/min avoids allocating an abs() copy
+        peak = max(float(audio.max()), -float(audio.min()))
+        if peak > 0:
+            return np.multiply(audio, 1.0 / (peak + 1e-8), out=out)
+        if out is None:
+            return audio
+        np.copyto(out, audio)
+        return out
+    
     def cleanup(self, file_path: str) -> None:
         """Clean up temporary audio file."""
         try:
@@ -117,3 +241,27 @@ class AudioPreprocessor:
         except Exception as e:
             logger.warning(f"Failed to cleanup file {file_path}: {str(e)}")
 
+
+def synthetic_clip(seconds: float = 1.0, sample_rate: int = 44100, channels: int = 2) -> bytes:
+    """
+    Build a WAV clip of low-level noise for warming up the decode path.
+    
+    The default stereo 44.1kHz format exercises downmixing and resampling.
+    
+    Args:
+        seconds: Clip length
+        sample_rate: Sample rate of the clip
+        channels: Number of channels
+        
+    Returns:
+        WAV file bytes
+    """
+    rng = np.random.default_rng(0)
+    samples = (rng.standard_normal((int(seconds * sample_rate), channels)) * 1000).astype("<i2")
+    out = io.BytesIO()
+    with wave.open(out, "wb") as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+    return out.getvalue()
@@ -0,0 +1,186 @@
+"""Dynamic micro-batching scheduler for model inference."""
+import asyncio
+import logging
+import math
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from app.services.inference_service import InferenceService
+from app.services.metrics import BATCH_SIZE, time_stage
+from app.services.stage_executor import StageSaturatedError
+
+logger = logging.getLogger(__name__)
+
+
+class BatchScheduler:
+    """
+    Gathers concurrent inference calls into batched forward passes.
+
+    Requests are queued and collected for up to ``max_wait_ms`` or until
+    ``max_batch_size`` clips are waiting. Collected clips are bucketed by
+    length so that padding stays small, and each bucket is run through
+    ``InferenceService.predict_batch`` in one forward pass on ``executor``.
+    Up to ``max_concurrent_batches`` forward passes may run at once while
+    the next batch is being collected.
+    """
+
+    def __init__(
+        self,
+        inference_service: InferenceService,
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        bucket_seconds: Optional[float] = None,
+        executor: Optional[Executor] = None,
+        max_concurrent_batches: int = 1,
+        max_queue_size: int = 0
+    ):
+        self.inference_service = inference_service
+        self.max_batch_size = max_batch_size or settings.BATCH_MAX_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.BATCH_MAX_WAIT_MS) / 1000.0
+        bucket_seconds = bucket_seconds or settings.BATCH_BUCKET_SECONDS
+        self.bucket_samples = max(1, int(bucket_seconds * settings.SAMPLE_RATE))
+        self.executor = executor
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self.max_queue_size = max(0, max_queue_size)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._batch_slots: Optional[asyncio.Semaphore] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+        # Every caller still waiting, wherever its clip is (queued, being collected or in a batch)
+        self._waiting: Set[asyncio.Future] = set()
+
+    async def start(self) -> None:
+        """Start the background batching loop."""
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._batch_slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._worker = asyncio.create_task(self._run())
+        logger.info(
+            f"Batch scheduler started (max_batch_size={self.max_batch_size}, "
+            f"max_wait={self.max_wait * 1000:.1f}ms)"
+        )
+
+    async def stop(self) -> None:
+        """Stop the batching loop and fail every request still waiting for a result."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        tasks = list(self._batch_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Batch tasks cancelled before they started, and clips collected but
+        # not yet dispatched, never resolve their callers on their own
+        for future in list(self._waiting):
+            if not future.done():
+                future.set_exception(ValueError("Inference scheduler is shutting down"))
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        logger.info("Batch scheduler stopped")
+
+    @property
+    def queue_depth(self) -> int:
+        """Clips waiting to be collected into a batch."""
+        return self._queue.qsize() if self._queue else 0
+
+    async def predict(self, audio: np.ndarray) -> Tuple[str, float]:
+        """
+        Queue a preprocessed clip for batched inference.
+
+        Args:
+            audio: Preprocessed audio array (mono, normalized, resampled)
+
+        Returns:
+            Tuple of (prediction, confidence)
+
+        Raises:
+            ValueError: If inference fails
+            StageSaturatedError: If the inference queue is full
+        """
+        if self._worker is None:
+            raise ValueError("Inference scheduler is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((audio, future))
+        except asyncio.QueueFull:
+            raise StageSaturatedError("Server busy: inference queue is full")
+        self._waiting.add(future)
+        future.add_done_callback(self._waiting.discard)
+        return await future
+
+    async def _run(self) -> None:
+        """Collect queued clips into batches and dispatch them."""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            pending = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(pending) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            for bucket in self._bucket_by_length(pending).values():
+                await self._batch_slots.acquire()
+                task = asyncio.create_task(self._dispatch(bucket))
+                self._batch_tasks.add(task)
+                task.add_done_callback(self._batch_done)
+
+    def _batch_done(self, task: asyncio.Task) -> None:
+        self._batch_tasks.discard(task)
+        self._batch_slots.release()
+
+    def _bucket_by_length(self, pending: List[tuple]) -> Dict[int, List[tuple]]:
+        """Group queued clips whose lengths round up to the same bucket."""
+        buckets: Dict[int, List[tuple]] = {}
+        for item in pending:
+            bucket = math.ceil(len(item[0]) / self.bucket_samples)
+            buckets.setdefault(bucket, []).append(item)
+        return buckets
+
+    async def _dispatch(self, batch: List[tuple]) -> None:
+        """Run one forward pass for a bucket and resolve its futures."""
+        # Drop requests whose callers have already gone away
+        batch = [(audio, future) for audio, future in batch if not future.done()]
+        if not batch:
+            return
+
+        audios = [audio for audio, _ in batch]
+        loop = asyncio.get_running_loop()
+
+        BATCH_SIZE.observe(len(batch))
+        try:
+            with time_stage("inference_batch"):
+                results = await loop.run_in_executor(self.executor, self.inference_service.predict_batch, audios)
+        except asyncio.CancelledError:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(ValueError("Inference scheduler is shutting down"))
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        logger.debug(f"Dispatched inference batch of {len(batch)} clips")
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,43 @@
+"""Reusable scratch buffers for per-request array work."""
+import threading
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+class BufferPool:
+    """
+    Per-thread pool of preallocated float32 scratch arrays.
+
+    Each worker thread (and therefore each worker process) gets its own set
+    of named buffers, which grow to the largest size requested and are then
+    reused, so steady-state requests do not allocate scratch memory.
+    Returned arrays are views into pooled memory: they are only valid until
+    the same name is requested again on that thread, and must never be
+    handed to a caller that outlives the request.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def get(self, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Return a float32 scratch array of exactly ``shape``.
+
+        Args:
+            name: Buffer name; different names never share memory
+            shape: Required shape
+
+        Returns:
+            C-contiguous float32 view of pooled memory (contents undefined)
+        """
+        buffers: Dict[str, np.ndarray] = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+
+        size = int(np.prod(shape))
+        buffer = buffers.get(name)
+        if buffer is None or buffer.size < size:
+            buffer = np.empty(size, dtype=np.float32)
+            buffers[name] = buffer
+        return buffer[:size].reshape(shape)
@@ -0,0 +1,262 @@
+"""End-to-end detection pipeline shared by the API endpoints."""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from config.settings import settings
+from app.services.audio_buffer import AudioBuffer, AudioSource
+from app.services.audio_cache import DecodedAudioCache
+from app.services.audio_downloader import AudioDownloader
+from app.services.batch_scheduler import BatchScheduler
+from app.services.inference_service import InferenceService
+from app.services.metrics import ERRORS_TOTAL, annotate_request, time_stage
+from app.services.result_cache import ResultCache
+from app.services.single_flight import SingleFlight
+from app.services.stage_executor import ExecutionBackend, StageSaturatedError
+
+logger = logging.getLogger(__name__)
+
+# Longest clip the API accepts; decoded-audio cache entries are keyed by it
+MAX_DURATION_SECONDS = 30.0
+
+
+@dataclass
+class DetectionResult:
+    """Outcome of running one clip through the pipeline."""
+    prediction: str
+    confidence: float
+    model_version: str
+    processing_time_ms: int
+    segments: Optional[List[Dict[str, float]]] = None
+
+
+class DetectionPipeline:
+    """
+    Download, cache lookup, preprocessing and inference for one clip.
+
+    With ``coalesce``, concurrent requests for the same URL (after
+    normalization) share one download and analysis, and requests whose
+    downloads turn out to hold the same bytes share one analysis.
+
+    Errors propagate unchanged: ``ValueError`` for bad input or failed
+    downloads, ``StageSaturatedError`` when a worker pool is full or the
+    model has not finished loading.
+    """
+
+    def __init__(
+        self,
+        audio_downloader: AudioDownloader,
+        execution_backend: ExecutionBackend,
+        inference_service: InferenceService,
+        batch_scheduler: Optional[BatchScheduler] = None,
+        result_cache: Optional[ResultCache] = None,
+        audio_cache: Optional[DecodedAudioCache] = None,
+        max_duration_seconds: float = MAX_DURATION_SECONDS,
+        coalesce: bool = True
+    ):
+        self.audio_downloader = audio_downloader
+        self.execution_backend = execution_backend
+        self.inference_service = inference_service
+        self.batch_scheduler = batch_scheduler
+        self.result_cache = result_cache
+        self.audio_cache = audio_cache
+        self.max_duration_seconds = max_duration_seconds
+        self.url_flights = SingleFlight("url") if coalesce else None
+        self.content_flights = SingleFlight("content") if coalesce else None
+
+    async def detect_url(self, audio_url: str, include_segments: bool = False) -> DetectionResult:
+        """
+        Run detection on audio hosted at a URL.
+
+        Args:
+            audio_url: URL of the audio file
+            include_segments: Return per-window scores (segmented inference only)
+
+        Returns:
+            DetectionResult for the clip
+        """
+        try:
+            if self.url_flights is None:
+                return await self._detect_url(audio_url, include_segments)
+            return await self.url_flights.run(
+                (_normalize_url(audio_url), include_segments),
+                lambda: self._detect_url(audio_url, include_segments)
+            )
+        except Exception as e:
+            ERRORS_TOTAL.inc(type=type(e).__name__)
+            raise
+
+    async def _detect_url(self, audio_url: str, include_segments: bool) -> DetectionResult:
+        model_version = self.inference_service.model_version
+        include_segments = settings.SEGMENTED_INFERENCE and include_segments
+        # Cached results carry no per-segment scores
+        cache = None if include_segments else self.result_cache
+        annotate_request(url=audio_url)
+
+        with time_stage("cache_lookup"):
+            validators = cache.get_validators(audio_url, model_version) if cache else None
+        with time_stage("download"):
+            audio_buffer = await self.audio_downloader.download(
+                audio_url, validators=validators, max_seconds=self.max_duration_seconds
+            )
+
+        try:
+            processing_start_time = time.time()
+            if audio_buffer.not_modified:
+                with time_stage("cache_lookup"):
+                    cached = cache.get_result(validators.content_hash, model_version)
+                if cached:
+                    logger.info("Serving cached detection result")
+                    annotate_request(result_cache="hit")
+                    return DetectionResult(
+                        prediction=cached.prediction,
+                        confidence=cached.confidence,
+                        model_version=model_version,
+                        processing_time_ms=int((time.time() - processing_start_time) * 1000)
+                    )
+                # Result was evicted since the validators were sent; fetch the body again
+                audio_buffer.close()
+                with time_stage("download"):
+                    audio_buffer = await self.audio_downloader.download(
+                        audio_url, max_seconds=self.max_duration_seconds
+                    )
+                processing_start_time = time.time()
+
+            if cache:
+                cache.store_url(audio_url, audio_buffer.etag, audio_buffer.last_modified, audio_buffer.content_hash)
+
+            return await self._detect(audio_buffer, include_segments, cache, processing_start_time)
+        finally:
+            with time_stage("cleanup"):
+                audio_buffer.close()
+
+    async def detect_buffer(self, audio_buffer: AudioBuffer, include_segments: bool = False) -> DetectionResult:
+        """
+        Run detection on audio that is already in memory.
+
+        Args:
+            audio_buffer: Buffer holding the encoded audio (not closed here)
+            include_segments: Return per-window scores (segmented inference only)
+
+        Returns:
+            DetectionResult for the clip
+        """
+        include_segments = settings.SEGMENTED_INFERENCE and include_segments
+        cache = None if include_segments else self.result_cache
+        try:
+            return await self._detect(audio_buffer, include_segments, cache, time.time())
+        except Exception as e:
+            ERRORS_TOTAL.inc(type=type(e).__name__)
+            raise
+
+    async def _detect(
+        self,
+        audio_buffer: AudioBuffer,
+        include_segments: bool,
+        cache: Optional[ResultCache],
+        processing_start_time: float
+    ) -> DetectionResult:
+        model_version = self.inference_service.model_version
+        content_hash = audio_buffer.content_hash
+        annotate_request(
+            bytes=audio_buffer.size,
+            extension=audio_buffer.extension,
+            truncated=audio_buffer.truncated,
+            content_hash=content_hash
+        )
+
+        with time_stage("cache_lookup"):
+            cached = cache.get_result(content_hash, model_version) if cache else None
+        if cached:
+            logger.info("Serving cached detection result")
+            annotate_request(result_cache="hit")
+            prediction, confidence, segments = cached.prediction, cached.confidence, None
+        else:
+            # Spilled buffers are files their owner deletes on close, so only bytes are shared
+            if self.content_flights is not None and audio_buffer.in_memory:
+                source = audio_buffer.source
+                prediction, confidence, segments = await self.content_flights.run(
+                    content_hash, lambda: self._analyze(source, content_hash)
+                )
+            else:
+                prediction, confidence, segments = await self._analyze(audio_buffer.source, content_hash)
+            if cache:
+                cache.put_result(content_hash, model_version, prediction, confidence)
+
+        return DetectionResult(
+            prediction=prediction,
+            confidence=confidence,
+            model_version=model_version,
+            processing_time_ms=int((time.time() - processing_start_time) * 1000),
+            segments=segments if include_segments else None
+        )
+
+    async def _analyze(
+        self,
+        audio_source: AudioSource,
+        content_hash: str
+    ) -> Tuple[str, float, Optional[List[Dict[str, float]]]]:
+        """Preprocess (or fetch from the decoded-audio cache) and score a clip on the worker pools."""
+        if not self.inference_service.ready:
+            raise StageSaturatedError("Server is starting: model is still loading")
+
+        audio = await self._preprocess(audio_source, content_hash)
+
+        if settings.SEGMENTED_INFERENCE:
+            # Windows of one clip are already scored as a batch
+            with time_stage("inference"):
+                return await self.execution_backend.inference.run(self.inference_service.predict_segments, audio)
+
+        prediction, confidence = await self.score_window(audio)
+        return prediction, confidence, None
+
+    async def _preprocess(self, audio_source: AudioSource, content_hash: str):
+        cache = self.audio_cache
+        if cache is None:
+            return await self.execution_backend.run_preprocess(audio_source, self.max_duration_seconds)
+
+        key = cache.key(content_hash, self.max_duration_seconds)
+        with time_stage("audio_cache"):
+            audio = cache.get_from_memory(key)
+            if audio is None and cache.directory is not None:
+                # Opening the file and touching its mtime block, so keep them off the event loop
+                audio = await asyncio.to_thread(cache.get_from_disk, key)
+        if audio is not None:
+            annotate_request(audio_cache="hit")
+            return audio
+        cache_path = cache.disk_path(key)
+        audio = await self.execution_backend.run_preprocess(audio_source, self.max_duration_seconds, cache_path)
+        return cache.put(key, audio, on_disk=cache_path is not None)
+
+    async def score_window(self, audio) -> Tuple[str, float]:
+        """
+        Score preprocessed audio through the batch scheduler or the inference pool.
+
+        Args:
+            audio: Mono float32 samples at ``settings.SAMPLE_RATE``, normalized
+
+        Returns:
+            Tuple of (prediction, confidence)
+        """
+        if not self.inference_service.ready:
+            raise StageSaturatedError("Server is starting: model is still loading")
+
+        # Includes time spent queued for a worker or a batch
+        with time_stage("inference"):
+            if self.batch_scheduler:
+                return await self.batch_scheduler.predict(audio)
+            return await self.execution_backend.inference.run(self.inference_service.predict, audio)
+
+
+def _normalize_url(url: str) -> str:
+    """URL identity for coalescing: case-insensitive scheme and host, no default port or fragment."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    default_port = {"http": ":80", "https": ":443"}.get(scheme)
+    if default_port and netloc.endswith(default_port):
+        netloc = netloc[:-len(default_port)]
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
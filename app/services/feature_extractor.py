@@ -0,0 +1,204 @@
+"""Spectral feature extraction (log-mel, LFCC) for models that take features instead of waveforms."""
+import logging
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from app.services.buffer_pool import BufferPool
+
+logger = logging.getLogger(__name__)
+
+FEATURE_KINDS = ("waveform", "log_mel", "lfcc")
+
+# Added before the log so silent frames stay finite
+_LOG_EPS = 1e-6
+
+
+def _hz_to_mel(hz: np.ndarray) -> np.ndarray:
+    """Slaney mel scale: linear below 1kHz, logarithmic above (librosa's default)."""
+    hz = np.atleast_1d(np.asarray(hz, dtype=np.float64))
+    mel = hz * 3.0 / 200.0
+    log_region = hz >= 1000.0
+    mel[log_region] = 15.0 + np.log(hz[log_region] / 1000.0) / (np.log(6.4) / 27.0)
+    return mel
+
+
+def _mel_to_hz(mel: np.ndarray) -> np.ndarray:
+    mel = np.atleast_1d(np.asarray(mel, dtype=np.float64))
+    hz = mel * 200.0 / 3.0
+    log_region = mel >= 15.0
+    hz[log_region] = 1000.0 * np.exp((np.log(6.4) / 27.0) * (mel[log_region] - 15.0))
+    return hz
+
+
+def _triangular_filters(edges_hz: np.ndarray, sample_rate: int, n_fft: int) -> np.ndarray:
+    """Triangular filters over the rFFT bins, one per consecutive triple of edges."""
+    fft_freqs = np.linspace(0.0, sample_rate / 2.0, n_fft // 2 + 1)
+    widths = np.diff(edges_hz)
+    ramps = edges_hz[:, None] - fft_freqs[None, :]
+    lower = -ramps[:-2] / widths[:-1, None]
+    upper = ramps[2:] / widths[1:, None]
+    return np.maximum(0.0, np.minimum(lower, upper))
+
+
+@lru_cache(maxsize=16)
+def _mel_filterbank(sample_rate: int, n_fft: int, n_mels: int, fmin: float, fmax: float) -> np.ndarray:
+    """Area-normalized mel filterbank of shape (n_mels, n_fft // 2 + 1), computed once per configuration."""
+    edges = _mel_to_hz(np.linspace(_hz_to_mel(fmin)[0], _hz_to_mel(fmax)[0], n_mels + 2))
+    filters = _triangular_filters(edges, sample_rate, n_fft)
+    filters *= (2.0 / (edges[2:] - edges[:-2]))[:, None]
+    logger.debug(f"Built mel filterbank ({n_mels} bands, n_fft={n_fft}, sr={sample_rate})")
+    return np.ascontiguousarray(filters, dtype=np.float32)
+
+
+@lru_cache(maxsize=16)
+def _linear_filterbank(sample_rate: int, n_fft: int, n_filters: int, fmin: float, fmax: float) -> np.ndarray:
+    """Linearly spaced triangular filterbank of shape (n_filters, n_fft // 2 + 1), as used by LFCC."""
+    edges = np.linspace(fmin, fmax, n_filters + 2)
+    filters = _triangular_filters(edges, sample_rate, n_fft)
+    logger.debug(f"Built linear filterbank ({n_filters} bands, n_fft={n_fft}, sr={sample_rate})")
+    return np.ascontiguousarray(filters, dtype=np.float32)
+
+
+@lru_cache(maxsize=16)
+def _dct_matrix(n_coeffs: int, n_filters: int) -> np.ndarray:
+    """Orthonormal DCT-II matrix of shape (n_coeffs, n_filters)."""
+    n = np.arange(n_filters)
+    k = np.arange(n_coeffs)[:, None]
+    dct = np.cos(np.pi / n_filters * (n + 0.5) * k) * np.sqrt(2.0 / n_filters)
+    dct[0] /= np.sqrt(2.0)
+    return np.ascontiguousarray(dct, dtype=np.float32)
+
+
+@lru_cache(maxsize=16)
+def _window(win_length: int, n_fft: int) -> np.ndarray:
+    """Periodic Hann window of ``win_length`` zero-padded to ``n_fft`` around the center."""
+    window = np.zeros(n_fft, dtype=np.float32)
+    hann = 0.5 - 0.5 * np.cos(2.0 * np.pi * np.arange(win_length) / win_length)
+    offset = (n_fft - win_length) // 2
+    window[offset:offset + win_length] = hann
+    return window
+
+
+class FeatureExtractor:
+    """
+    Turns batches of waveforms into spectral features in one vectorized pass.
+
+    ``log_mel`` yields log mel-band energies and ``lfcc`` linear-frequency
+    cepstral coefficients, both shaped (clips, features, frames) with
+    ``1 + samples // hop_length`` frames per clip (frames are centered, with
+    zero padding at the edges). ``waveform`` passes the batch through.
+
+    Filterbanks, windows and DCT matrices are built once per configuration
+    and shared by every extractor with that configuration; the FFT length
+    is fixed, so scipy's cached FFT plan is reused too. Apart from the FFT
+    output, intermediate and output arrays come from a per-thread
+    ``BufferPool``: the returned features are only
+    valid until the next call on the same thread, which is how the
+    inference service uses them (extract, then run the model).
+    """
+
+    def __init__(
+        self,
+        kind: str = "log_mel",
+        sample_rate: int = 16000,
+        n_fft: int = 512,
+        hop_length: int = 160,
+        win_length: int = 400,
+        n_filters: int = 80,
+        n_coeffs: int = 60,
+        fmin: float = 0.0,
+        fmax: Optional[float] = None
+    ):
+        """
+        Args:
+            kind: "waveform", "log_mel" or "lfcc"
+            sample_rate: Sample rate of the input audio
+            n_fft: FFT size
+            hop_length: Samples between frames
+            win_length: Hann window length, at most ``n_fft``
+            n_filters: Mel bands (log_mel) or linear filters (lfcc)
+            n_coeffs: Cepstral coefficients kept (lfcc only)
+            fmin: Lowest filter edge in Hz
+            fmax: Highest filter edge in Hz (default: Nyquist)
+
+        Raises:
+            ValueError: If the configuration is invalid
+        """
+        if kind not in FEATURE_KINDS:
+            raise ValueError(f"Unknown feature kind: {kind} (expected one of {', '.join(FEATURE_KINDS)})")
+        if win_length > n_fft:
+            raise ValueError(f"win_length ({win_length}) must not exceed n_fft ({n_fft})")
+        fmax = fmax if fmax is not None else sample_rate / 2.0
+        if not 0.0 <= fmin < fmax <= sample_rate / 2.0:
+            raise ValueError(f"Invalid filter range {fmin}-{fmax} Hz for sample rate {sample_rate}")
+        if kind == "lfcc" and n_coeffs > n_filters:
+            raise ValueError(f"n_coeffs ({n_coeffs}) must not exceed n_filters ({n_filters})")
+
+        self.kind = kind
+        self.sample_rate = sample_rate
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.window = _window(win_length, n_fft)
+        self.dct: Optional[np.ndarray] = None
+        if kind == "log_mel":
+            self.filters = _mel_filterbank(sample_rate, n_fft, n_filters, float(fmin), float(fmax))
+        elif kind == "lfcc":
+            self.filters = _linear_filterbank(sample_rate, n_fft, n_filters, float(fmin), float(fmax))
+            self.dct = _dct_matrix(n_coeffs, n_filters)
+        self._buffers = BufferPool()
+
+    def extract(self, audio: np.ndarray) -> np.ndarray:
+        """Features of one clip, shaped (features, frames); see ``extract_batch``."""
+        return self.extract_batch(audio[np.newaxis, :])[0]
+
+    def extract_batch(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Compute features for a batch of equal-length clips.
+
+        Args:
+            batch: float32 waveforms of shape (clips, samples)
+
+        Returns:
+            float32 features of shape (clips, features, frames), in pooled
+            memory for ``log_mel``/``lfcc``; the batch itself for ``waveform``
+        """
+        if self.kind == "waveform":
+            return batch
+
+        clips, samples = batch.shape
+        pad = self.n_fft // 2
+        n_frames = 1 + samples // self.hop_length
+        n_bins = self.n_fft // 2 + 1
+
+        # Centered frames: zero-pad both edges, then view overlapping windows without copying
+        padded = self._buffers.get("padded", (clips, samples + 2 * pad))
+        padded[:, :pad] = 0.0
+        padded[:, pad + samples:] = 0.0
+        padded[:, pad:pad + samples] = batch
+        framed = np.lib.stride_tricks.sliding_window_view(padded, self.n_fft, axis=-1)[:, ::self.hop_length]
+        frames = self._buffers.get("frames", (clips, n_frames, self.n_fft))
+        np.multiply(framed[:, :n_frames], self.window, out=frames)
+
+        # scipy's FFT is several times faster than numpy's here and stays in float32
+        from scipy import fft as sp_fft
+        spectrum = sp_fft.rfft(frames, axis=-1, overwrite_x=True)
+
+        # Power spectrum, computed in place on the (real, imag) pairs of the FFT output
+        pairs = spectrum.view(np.float32).reshape(clips, n_frames, n_bins, 2)
+        np.square(pairs, out=pairs)
+        power = self._buffers.get("power", (clips, n_frames, n_bins))
+        np.add(pairs[..., 0], pairs[..., 1], out=power)
+
+        # Filterbank energies straight into (clips, filters, frames) layout
+        energies = self._buffers.get("energies", (clips, len(self.filters), n_frames))
+        np.matmul(self.filters, power.transpose(0, 2, 1), out=energies)
+        np.add(energies, _LOG_EPS, out=energies)
+        np.log(energies, out=energies)
+        if self.dct is None:
+            return energies
+
+        coeffs = self._buffers.get("coeffs", (clips, len(self.dct), n_frames))
+        np.matmul(self.dct, energies, out=coeffs)
+        return coeffs
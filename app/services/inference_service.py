@@ -1,44 +1,139 @@
 """ML inference service wrapper for voice detection."""
 import numpy as np
 import logging
-from typing import Tuple
+from typing import Dict, List, Optional, Tuple
 from config.settings import settings
+from app.services.feature_extractor import FeatureExtractor
+from app.services.model_backend import ModelBackend, load_backend
 
 logger = logging.getLogger(__name__)
 
-# Lazy import torch to handle DLL errors gracefully
-try:
-    import torch
-    TORCH_AVAILABLE = True
-except (ImportError, OSError) as e:
-    logger.warning(f"PyTorch not available: {e}. Using placeholder mode.")
-    TORCH_AVAILABLE = False
-    torch = None
+# Backend loaded by ``preload_model`` in a parent process and inherited by forked workers
+_preloaded_backend: Optional[ModelBackend] = None
+
+
+def preload_model() -> None:
+    """
+    Load the configured model before forking worker processes.
+    
+    Forked workers inherit the loaded weights copy-on-write, so the model
+    occupies memory once rather than once per worker. The model is loaded
+    single-threaded because a process that has started runtime thread pools
+    cannot fork safely; each worker sets its own thread count and warms the
+    model up after the fork.
+    
+    ONNX Runtime sessions start their thread pools on creation, so ONNX
+    models are not preloaded and each worker loads its own session.
+    
+    Raises:
+        ValueError: If the model cannot be loaded
+    """
+    global _preloaded_backend
+    
+    if not settings.MODEL_PATH:
+        return
+    if settings.MODEL_BACKEND == "onnx" or settings.MODEL_PATH.lower().endswith(".onnx"):
+        logger.info("ONNX Runtime sessions are not fork-safe; each worker loads its own")
+        return
+    
+    _preloaded_backend = _load_configured_backend(intra_op_threads=1, inter_op_threads=0)
+    logger.info(f"Preloaded {_preloaded_backend.name} model for worker processes")
+
+
+def _load_configured_backend(intra_op_threads: int, inter_op_threads: int) -> ModelBackend:
+    return load_backend(
+        settings.MODEL_PATH,
+        backend=settings.MODEL_BACKEND,
+        quantize=settings.MODEL_QUANTIZE_INT8,
+        intra_op_threads=intra_op_threads,
+        inter_op_threads=inter_op_threads,
+        mmap_weights=settings.MODEL_MMAP_WEIGHTS
+    )
 
 
 class InferenceService:
-    """Service for performing AI voice detection inference."""
+    """
+    Service for performing AI voice detection inference.
+    
+    The model runs behind a ``ModelBackend`` (eager PyTorch, frozen
+    TorchScript or ONNX Runtime) chosen from ``MODEL_PATH`` and
+    ``MODEL_BACKEND``. Without a model path the service runs in placeholder
+    mode.
+    
+    Models that take spectral features rather than waveforms get them from
+    a ``FeatureExtractor`` (``MODEL_INPUT_FEATURES``), computed for the
+    whole batch right before the forward pass.
+    
+    Construction is cheap; call ``load`` (typically in the background) to
+    load and warm up the model. ``ready`` turns True once that has finished.
+    """
     
     def __init__(self):
         self.model_version = settings.MODEL_VERSION
-        self.model = None
-        if TORCH_AVAILABLE:
-            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-            logger.info(f"Initialized inference service on device: {self.device}")
-        else:
-            self.device = None
-            logger.warning("PyTorch not available - running in placeholder mode")
+        self.backend: Optional[ModelBackend] = None
+        self.features = FeatureExtractor(
+            kind=settings.MODEL_INPUT_FEATURES,
+            sample_rate=settings.SAMPLE_RATE,
+            n_fft=settings.FEATURE_N_FFT,
+            hop_length=settings.FEATURE_HOP_LENGTH,
+            win_length=settings.FEATURE_WIN_LENGTH,
+            n_filters=settings.FEATURE_N_FILTERS,
+            n_coeffs=settings.FEATURE_N_LFCC,
+            fmin=settings.FEATURE_FMIN,
+            fmax=settings.FEATURE_FMAX
+        )
+        self.ready = False
+    
+    def load(self) -> None:
+        """
+        Load and warm up the model. Blocking; safe to run in a worker thread.
+        
+        Raises:
+            ValueError: If MODEL_PATH is set but the model cannot be loaded
+        """
         self._load_model()
+        self.ready = True
+        logger.info(f"Inference service ready ({self.backend_name} backend)")
     
     def _load_model(self) -> None:
         """
-        Load pretrained model.
+        Load the model into the configured runtime and warm it up.
         
-        NOTE: This is a placeholder. Replace with actual model loading logic
-        based on the chosen pretrained model.
+        Raises:
+            ValueError: If MODEL_PATH is set but the model cannot be loaded
         """
-        logger.warning("Using placeholder model. Please implement actual model loading.")
-        self.model = None
+        if not settings.MODEL_PATH:
+            logger.warning("MODEL_PATH not set - running in placeholder mode")
+            return
+        
+        if _preloaded_backend is not None:
+            # Shared with the parent process; thread counts were set after the fork
+            self.backend = _preloaded_backend
+        else:
+            self.backend = _load_configured_backend(
+                settings.INFERENCE_INTRA_OP_THREADS,
+                settings.INFERENCE_INTER_OP_THREADS
+            )
+        if settings.MODEL_WARMUP_RUNS > 0:
+            self._warmup()
+    
+    def _warmup(self) -> None:
+        """Run the backend on silent clips of the production shapes."""
+        window_seconds = settings.SEGMENT_SECONDS if settings.SEGMENTED_INFERENCE else settings.ANALYSIS_WINDOW_SECONDS
+        batch_sizes = [1]
+        if settings.BATCH_INFERENCE_ENABLED and settings.BATCH_MAX_SIZE > 1:
+            batch_sizes.append(settings.BATCH_MAX_SIZE)
+        self.backend.warmup(
+            int(window_seconds * settings.SAMPLE_RATE),
+            batch_sizes=batch_sizes,
+            runs=settings.MODEL_WARMUP_RUNS,
+            transform=self.features.extract_batch
+        )
+    
+    @property
+    def backend_name(self) -> str:
+        """Name of the active model runtime."""
+        return self.backend.name if self.backend else "placeholder"
     
     def predict(self, audio: np.ndarray) -> Tuple[str, float]:
         """
@@ -55,14 +150,12 @@ class InferenceService:
         try:
             logger.info(f"Running inference on audio shape: {audio.shape}")
             
-            if not TORCH_AVAILABLE or self.model is None:
-                logger.warning("PyTorch not available or model not loaded, using placeholder prediction")
+            if self.backend is None:
+                logger.warning("Model not loaded, using placeholder prediction")
                 return self._placeholder_predict(audio)
             
-            with torch.no_grad():
-                audio_tensor = self._prepare_input(audio)
-                output = self.model(audio_tensor)
-                prediction, confidence = self._process_output(output)
+            output = self.backend.run(self.features.extract_batch(audio[np.newaxis, :]))
+            prediction, confidence = self._process_batch_output(output)[0]
             
             logger.info(f"Prediction: {prediction}, Confidence: {confidence:.4f}")
             return prediction, confidence
@@ -71,38 +164,149 @@ class InferenceService:
             logger.error(f"Inference failed: {str(e)}")
             raise ValueError(f"Inference failed: {str(e)}")
     
-    def _prepare_input(self, audio: np.ndarray):
-        """Prepare audio array for model input."""
-        if not TORCH_AVAILABLE:
-            return None
-        audio_tensor = torch.from_numpy(audio).float().unsqueeze(0)
-        if self.device and self.device.type == "cuda":
-            audio_tensor = audio_tensor.cuda()
-        return audio_tensor
-    
-    def _process_output(self, output) -> Tuple[str, float]:
-        """Process model output to get prediction and confidence."""
-        if not TORCH_AVAILABLE or output is None:
-            return "HUMAN", 0.5
-        
-        if isinstance(output, (list, tuple)):
-            output = output[0]
-        
-        if output.dim() > 1:
-            output = output.squeeze()
-        
-        if output.shape[0] == 2:
-            probs = torch.softmax(output, dim=0)
-            ai_prob = probs[1].item()
-            human_prob = probs[0].item()
+    def predict_batch(self, audios: List[np.ndarray]) -> List[Tuple[str, float]]:
+        """
+        Perform inference on several preprocessed clips in one forward pass.
+        
+        Clips are zero-padded to the longest clip in the batch, so callers
+        should group clips of similar length together.
+        
+        Args:
+            audios: List of preprocessed audio arrays (mono, normalized, resampled)
+            
+        Returns:
+            List of (prediction, confidence) tuples in input order
+        """
+        try:
+            logger.info(f"Running batched inference on {len(audios)} clips")
+            
+            if self.backend is None:
+                logger.warning("Model not loaded, using placeholder prediction")
+                return [self._placeholder_predict(audio) for audio in audios]
+            
+            output = self.backend.run(self.features.extract_batch(self._prepare_batch(audios)))
+            return self._process_batch_output(output)
+            
+        except Exception as e:
+            logger.error(f"Batched inference failed: {str(e)}")
+            raise ValueError(f"Inference failed: {str(e)}")
+    
+    def predict_segments(self, audio: np.ndarray) -> Tuple[str, float, List[Dict[str, float]]]:
+        """
+        Score overlapping windows of a longer clip and aggregate the verdict.
+        
+        The clip is split into ``SEGMENT_SECONDS`` windows every
+        ``SEGMENT_HOP_SECONDS``. Windows are scored ``SEGMENT_BATCH_SIZE`` at
+        a time in batched forward passes, and scoring stops early once the
+        aggregated confidence after a pass reaches
+        ``SEGMENT_EARLY_STOP_CONFIDENCE`` and, for ``max`` and ``vote``, the
+        remaining windows can no longer change the verdict. A batch size of
+        0 scores every window in one pass, which leaves no point to stop
+        early.
+        
+        Args:
+            audio: Preprocessed audio array (mono, normalized, resampled)
+            
+        Returns:
+            Tuple of (prediction, confidence, segments), where segments lists
+            start_seconds, end_seconds and ai_probability for each scored window
+        """
+        windows = self._split_windows(audio)
+        batch_size = settings.SEGMENT_BATCH_SIZE or len(windows)
+        ai_probs: List[float] = []
+        
+        for i in range(0, len(windows), batch_size):
+            chunk = windows[i:i + batch_size]
+            for prediction, confidence in self.predict_batch([audio[start:end] for start, end in chunk]):
+                ai_probs.append(confidence if prediction == "AI_GENERATED" else 1.0 - confidence)
+            
+            prediction, confidence = self._aggregate(ai_probs)
+            if len(ai_probs) < len(windows) and self._can_stop_early(ai_probs, len(windows), confidence):
+                logger.info(f"Stopping segment scoring early after {len(ai_probs)}/{len(windows)} windows")
+                break
+        
+        segments = [
+            {
+                "start_seconds": start / settings.SAMPLE_RATE,
+                "end_seconds": end / settings.SAMPLE_RATE,
+                "ai_probability": ai_prob
+            }
+            for (start, end), ai_prob in zip(windows, ai_probs)
+        ]
+        logger.info(f"Segmented prediction: {prediction}, Confidence: {confidence:.4f} ({len(segments)} windows)")
+        return prediction, confidence, segments
+    
+    def _can_stop_early(self, ai_probs: List[float], total: int, confidence: float) -> bool:
+        """
+        Whether the windows not scored yet can be skipped.
+        
+        Under ``max`` the verdict is settled once a window crosses the AI
+        threshold, since later windows can only raise the maximum; under
+        ``vote`` once one side holds a majority of all ``total`` windows.
+        ``mean`` has no such bound and stops on confidence alone, as a
+        heuristic.
+        """
+        if confidence < settings.SEGMENT_EARLY_STOP_CONFIDENCE:
+            return False
+        if settings.SEGMENT_AGGREGATION == "max":
+            return max(ai_probs) > 0.5
+        if settings.SEGMENT_AGGREGATION == "vote":
+            ai_votes = sum(p > 0.5 for p in ai_probs)
+            return max(ai_votes, len(ai_probs) - ai_votes) > total / 2
+        return True
+    
+    def _split_windows(self, audio: np.ndarray) -> List[Tuple[int, int]]:
+        """Sample ranges of overlapping windows; the last window is aligned to the end of the clip."""
+        window = int(settings.SEGMENT_SECONDS * settings.SAMPLE_RATE)
+        hop = max(1, int(settings.SEGMENT_HOP_SECONDS * settings.SAMPLE_RATE))
+        if len(audio) <= window:
+            return [(0, len(audio))]
+        
+        windows = [(start, start + window) for start in range(0, len(audio) - window + 1, hop)]
+        if windows[-1][1] < len(audio):
+            windows.append((len(audio) - window, len(audio)))
+        return windows
+    
+    def _aggregate(self, ai_probs: List[float]) -> Tuple[str, float]:
+        """Combine per-window AI probabilities using ``SEGMENT_AGGREGATION``."""
+        if settings.SEGMENT_AGGREGATION == "max":
+            ai_prob = max(ai_probs)
+        elif settings.SEGMENT_AGGREGATION == "vote":
+            ai_prob = sum(p > 0.5 for p in ai_probs) / len(ai_probs)
         else:
-            ai_prob = torch.sigmoid(output).item()
-            human_prob = 1.0 - ai_prob
+            ai_prob = sum(ai_probs) / len(ai_probs)
         
         prediction = "AI_GENERATED" if ai_prob > 0.5 else "HUMAN"
-        confidence = max(ai_prob, human_prob)
+        return prediction, max(ai_prob, 1.0 - ai_prob)
+    
+    def _prepare_batch(self, audios: List[np.ndarray]) -> np.ndarray:
+        """Pad audio arrays to a common length and stack them into one batch."""
+        max_len = max(len(audio) for audio in audios)
+        batch = np.zeros((len(audios), max_len), dtype=np.float32)
+        for i, audio in enumerate(audios):
+            batch[i, :len(audio)] = audio
+        return batch
+    
+    def _process_batch_output(self, output: np.ndarray) -> List[Tuple[str, float]]:
+        """
+        Turn raw model output into per-clip predictions.
+        
+        Two logits per clip are treated as (human, AI) class scores; a single
+        logit is treated as the AI score.
+        """
+        logits = np.asarray(output, dtype=np.float32).reshape(len(output), -1)
+        
+        if logits.shape[1] == 2:
+            shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+            ai_probs = shifted[:, 1] / shifted.sum(axis=1)
+        else:
+            ai_probs = 1.0 / (1.0 + np.exp(-logits[:, 0]))
         
-        return prediction, confidence
+        results = []
+        for ai_prob in ai_probs.tolist():
+            prediction = "AI_GENERATED" if ai_prob > 0.5 else "HUMAN"
+            results.append((prediction, max(ai_prob, 1.0 - ai_prob)))
+        return results
     
     def _placeholder_predict(self, audio: np.ndarray) -> Tuple[str, float]:
         """
@@ -0,0 +1,280 @@
+"""Background work queue for asynchronous detection jobs."""
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import httpx
+
+from config.settings import settings
+from app.services.admission import AdmissionRejectedError
+from app.services.job_store import JOB_FAILED, JOB_RUNNING, JOB_SUCCEEDED, Job, JobStore
+from app.services.metrics import ADMISSION_REJECTED
+from app.services.stage_executor import StageSaturatedError
+
+logger = logging.getLogger(__name__)
+
+# Seconds between sweeps for expired finished jobs
+_PURGE_INTERVAL_SECONDS = 300.0
+# Background jobs wait out saturated pools instead of failing straight away
+_BUSY_RETRIES = 5
+
+
+class JobQueue:
+    """
+    Runs submitted jobs on a fixed number of worker tasks.
+
+    Submitting only stores the job and enqueues its ID, so ingress is
+    decoupled from compute: ``workers`` bounds how many jobs run at once
+    regardless of how many clients are submitting. When a job finishes its
+    result is stored and, if the job has a ``webhook_url``, POSTed there.
+
+    Each owner may have at most ``max_pending_per_key`` jobs queued or
+    running, so one API key cannot fill the whole queue.
+
+    Jobs are stamped with the ``worker`` slot that queues them. Queues live
+    in memory, so when a pre-fork worker dies the jobs it held are only
+    picked up again by the worker restarted in its slot.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        run_job: Callable[[Job], Awaitable[Dict[str, Any]]],
+        workers: int = 8,
+        max_pending: int = 10000,
+        max_pending_per_key: int = 0,
+        http_client: Optional[httpx.AsyncClient] = None,
+        worker: Optional[int] = None
+    ):
+        """
+        Args:
+            store: Where jobs and results are kept
+            run_job: Coroutine that processes a job and returns its result
+            workers: Jobs processed concurrently
+            max_pending: Jobs allowed to wait before submissions are rejected
+            max_pending_per_key: Jobs one owner may have queued or running (0 = no limit)
+            http_client: Client used for webhook deliveries
+            worker: Pre-fork worker slot of this process (None = single process)
+        """
+        self.store = store
+        self.run_job = run_job
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.max_pending_per_key = max_pending_per_key
+        self.http_client = http_client
+        self.worker = worker
+        self._queue: Optional[asyncio.Queue] = None
+        # Owner of each queued or running job, and how many each owner has
+        self._owners: Dict[str, str] = {}
+        self._per_owner: Dict[str, int] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._webhook_tasks: Set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        """Jobs waiting for a worker."""
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(
+        self,
+        recover: bool = True,
+        only_own: bool = False,
+        created_before: Optional[float] = None
+    ) -> None:
+        """
+        Start the workers.
+
+        Args:
+            recover: Requeue jobs left unfinished by a previous run. Only one
+                process sharing a store should recover, or jobs run twice.
+            only_own: Recover only jobs queued by this worker slot, as when
+                the slot's previous worker died
+            created_before: Recover other slots' jobs only if they were
+                created before this (wall-clock) time, such as the server's
+                start, leaving jobs that live workers have queued since
+        """
+        self._queue = asyncio.Queue()
+        if recover:
+            for job in await self.store.list_unfinished():
+                if only_own and job.worker != self.worker:
+                    continue
+                if job.worker != self.worker and created_before is not None and job.created_at >= created_before:
+                    continue
+                if job.worker != self.worker:
+                    # Take the job over, so it is resumed if this worker dies in turn
+                    job.worker = self.worker
+                    await self.store.save(job)
+                self._track(job)
+                self._queue.put_nowait(job.job_id)
+            if self._queue.qsize():
+                logger.info(f"Requeued {self._queue.qsize()} unfinished job(s)")
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._purge_loop()))
+        logger.info(f"Job queue started (workers={self.workers}, max_pending={self.max_pending})")
+
+    async def stop(self) -> None:
+        """Stop the workers. Interrupted jobs stay queued/running in the store."""
+        tasks = self._tasks + list(self._webhook_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self.store.close()
+        logger.info("Job queue stopped")
+
+    async def submit(self, job: Job) -> Job:
+        """
+        Store a job and queue it for processing.
+
+        Raises:
+            StageSaturatedError: If too many jobs are already pending
+            AdmissionRejectedError: (429) If the job's owner already has
+                ``max_pending_per_key`` jobs queued or running
+        """
+        if self._queue.qsize() >= self.max_pending:
+            raise StageSaturatedError("Server busy: job queue is full")
+        if 0 < self.max_pending_per_key <= self._per_owner.get(job.owner, 0):
+            ADMISSION_REJECTED.inc(reason="job_key_limit")
+            raise AdmissionRejectedError(
+                f"Too many pending jobs for this API key (limit {self.max_pending_per_key})",
+                status_code=429,
+                retry_after=settings.BUSY_RETRY_AFTER_SECONDS
+            )
+        job.worker = self.worker
+        # Counted before the store write, so concurrent submissions cannot overshoot
+        self._track(job)
+        try:
+            await self.store.save(job)
+        except BaseException:
+            self._untrack(job.job_id)
+            raise
+        self._queue.put_nowait(job.job_id)
+        logger.info(f"Queued job {job.job_id} ({self._queue.qsize()} pending)")
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await self.store.get(job_id)
+                if job is None or job.finished:
+                    continue
+                await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker failed on {job_id}: {str(e)}", exc_info=True)
+            finally:
+                self._untrack(job_id)
+                self._queue.task_done()
+
+    def _track(self, job: Job) -> None:
+        self._owners[job.job_id] = job.owner
+        self._per_owner[job.owner] = self._per_owner.get(job.owner, 0) + 1
+
+    def _untrack(self, job_id: str) -> None:
+        owner = self._owners.pop(job_id, None)
+        if owner is None:
+            return
+        self._per_owner[owner] -= 1
+        if not self._per_owner[owner]:
+            del self._per_owner[owner]
+
+    async def _process(self, job: Job) -> None:
+        job.status = JOB_RUNNING
+        await self.store.save(job)
+
+        try:
+            job.result = await self._run_with_retry(job)
+            job.status = JOB_SUCCEEDED
+        except ValueError as e:
+            job.status, job.error, job.error_status = JOB_FAILED, str(e), 400
+        except StageSaturatedError as e:
+            job.status, job.error, job.error_status = JOB_FAILED, str(e), getattr(e, "status_code", 503)
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed: {str(e)}", exc_info=True)
+            job.status, job.error, job.error_status = JOB_FAILED, f"Internal server error: {str(e)}", 500
+
+        await self.store.save(job)
+        logger.info(f"Job {job.job_id} {job.status}")
+
+        if job.webhook_url:
+            # Deliver in the background so retries do not hold a worker
+            task = asyncio.create_task(self._deliver_webhook(job))
+            self._webhook_tasks.add(task)
+            task.add_done_callback(self._webhook_tasks.discard)
+
+    async def _run_with_retry(self, job: Job) -> Dict[str, Any]:
+        """Run a job, waiting and retrying while the worker pools are saturated."""
+        for _ in range(_BUSY_RETRIES):
+            try:
+                return await self.run_job(job)
+            except StageSaturatedError as e:
+                delay = getattr(e, "retry_after", settings.BUSY_RETRY_AFTER_SECONDS)
+                logger.info(f"Job {job.job_id} deferred for {delay}s: {str(e)}")
+                await asyncio.sleep(delay)
+        return await self.run_job(job)
+
+    async def _deliver_webhook(self, job: Job) -> None:
+        """POST the finished job to its webhook, retrying with backoff."""
+        body = json.dumps(job_payload(job)).encode()
+        headers = {"Content-Type": "application/json"}
+        if settings.JOBS_WEBHOOK_SECRET:
+            signature = hmac.new(settings.JOBS_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+            headers["X-Signature-SHA256"] = signature
+
+        client = self.http_client or httpx.AsyncClient()
+        try:
+            for attempt in range(settings.JOBS_WEBHOOK_RETRIES + 1):
+                try:
+                    response = await client.post(
+                        job.webhook_url,
+                        content=body,
+                        headers=headers,
+                        timeout=settings.JOBS_WEBHOOK_TIMEOUT_SECONDS
+                    )
+                    if response.status_code < 500:
+                        if response.status_code >= 400:
+                            logger.warning(f"Webhook for job {job.job_id} rejected: HTTP {response.status_code}")
+                        return
+                    logger.warning(f"Webhook for job {job.job_id} failed: HTTP {response.status_code}")
+                except httpx.HTTPError as e:
+                    logger.warning(f"Webhook for job {job.job_id} failed: {str(e)}")
+                if attempt < settings.JOBS_WEBHOOK_RETRIES:
+                    await asyncio.sleep(2 ** attempt)
+            logger.error(f"Giving up on webhook for job {job.job_id}")
+        finally:
+            if client is not self.http_client:
+                await client.aclose()
+
+    async def _purge_loop(self) -> None:
+        while True:
+            await asyncio.sleep(_PURGE_INTERVAL_SECONDS)
+            try:
+                purged = await self.store.purge(time.time() - settings.JOBS_RESULT_TTL_SECONDS)
+                if purged:
+                    logger.info(f"Purged {purged} expired job(s)")
+            except Exception as e:
+                logger.warning(f"Job purge failed: {str(e)}")
+
+
+def job_payload(job: Job) -> Dict[str, Any]:
+    """Public view of a job, as returned by the API and sent to webhooks."""
+    payload: Dict[str, Any] = {
+        "job_id": job.job_id,
+        "status": job.status,
+        "audio_url": job.audio_url,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+    if job.result is not None:
+        payload["result"] = job.result
+    if job.error is not None:
+        payload["error"] = job.error
+        payload["error_status"] = job.error_status
+    return payload
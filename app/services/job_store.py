@@ -0,0 +1,183 @@
+"""Storage backends for asynchronous detection jobs."""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """A detection request accepted for background processing."""
+    audio_url: str
+    owner: str
+    # Registry name of the submitting key, for its quotas when the job runs
+    key_name: Optional[str] = None
+    # Pre-fork worker slot whose queue holds the job, so a restarted worker can resume it
+    worker: Optional[int] = None
+    language: Optional[str] = None
+    include_segments: bool = False
+    webhook_url: Optional[str] = None
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = JOB_QUEUED
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    # HTTP-style status of a failed job (400, 503, 500), for clients and webhooks
+    error_status: Optional[int] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_SUCCEEDED, JOB_FAILED)
+
+
+class JobStore(ABC):
+    """
+    Interface for job storage.
+
+    ``owner`` is a digest of the submitting API key; lookups from other
+    keys behave as if the job does not exist.
+    """
+
+    @abstractmethod
+    async def save(self, job: Job) -> None:
+        """Insert or replace a job, stamping its ``updated_at``."""
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Job]:
+        """The job with this id, or None."""
+
+    @abstractmethod
+    async def list_unfinished(self) -> List[Job]:
+        """Jobs that were queued or running, for recovery after a restart."""
+
+    @abstractmethod
+    async def purge(self, older_than: float) -> int:
+        """Delete finished jobs last updated before ``older_than`` (epoch seconds)."""
+
+    def close(self) -> None:
+        pass
+
+
+class InMemoryJobStore(JobStore):
+    """Jobs kept in this process only; lost on restart."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+
+    async def save(self, job: Job) -> None:
+        job.updated_at = time.time()
+        self._jobs[job.job_id] = job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def list_unfinished(self) -> List[Job]:
+        return [job for job in self._jobs.values() if not job.finished]
+
+    async def purge(self, older_than: float) -> int:
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.updated_at < older_than]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return len(expired)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Jobs persisted in a SQLite database, so queued work survives restarts.
+
+    Queries run in a worker thread to keep disk I/O off the event loop.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, updated_at REAL NOT NULL, data TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at)")
+            self._conn.commit()
+        logger.info(f"Job store using SQLite database: {path}")
+
+    async def save(self, job: Job) -> None:
+        job.updated_at = time.time()
+        await asyncio.to_thread(self._save, job)
+
+    def _save(self, job: Job) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, status, updated_at, data) VALUES (?, ?, ?, ?)",
+                (job.job_id, job.status, job.updated_at, json.dumps(asdict(job)))
+            )
+            self._conn.commit()
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        rows = await asyncio.to_thread(self._query, "SELECT data FROM jobs WHERE job_id = ?", (job_id,))
+        return Job(**json.loads(rows[0][0])) if rows else None
+
+    async def list_unfinished(self) -> List[Job]:
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT data FROM jobs WHERE status IN (?, ?) ORDER BY updated_at",
+            (JOB_QUEUED, JOB_RUNNING)
+        )
+        return [Job(**json.loads(row[0])) for row in rows]
+
+    async def purge(self, older_than: float) -> int:
+        return await asyncio.to_thread(self._purge, older_than)
+
+    def _purge(self, older_than: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (JOB_SUCCEEDED, JOB_FAILED, older_than)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def _query(self, sql: str, params: tuple) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_job_store(kind: str, sqlite_path: str) -> JobStore:
+    """
+    Build the configured job store.
+
+    Args:
+        kind: "memory" or "sqlite"
+        sqlite_path: Database file for the SQLite store
+
+    Raises:
+        ValueError: If the store kind is unknown
+    """
+    if kind == "memory":
+        return InMemoryJobStore()
+    if kind == "sqlite":
+        return SQLiteJobStore(sqlite_path)
+    raise ValueError(f"Unknown job store: {kind}")
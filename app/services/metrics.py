@@ -0,0 +1,312 @@
+"""In-process metrics with Prometheus text exposition."""
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow downloads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric(ABC):
+    """Base class for labelled metrics; values are keyed by label values."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"] + self._samples()
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines for every labelled value, without HELP/TYPE."""
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label set: [per-bucket counts..., sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 1)
+            state[bisect.bisect_left(self.buckets, value)] += 1
+            state[-1] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+
+        lines = []
+        for key, state in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together for a scrape."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Register a callback that refreshes gauges right before each scrape."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format (0.0.4)."""
+        for collector in self._collectors:
+            collector()
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "voice_api_stage_duration_seconds",
+    "Time spent in each pipeline stage.",
+    ["stage"]
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "voice_api_request_duration_seconds",
+    "End-to-end HTTP request latency.",
+    ["endpoint"]
+))
+REQUESTS_TOTAL = REGISTRY.register(Counter(
+    "voice_api_requests_total",
+    "HTTP requests by endpoint and status code.",
+    ["endpoint", "status"]
+))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "voice_api_requests_in_flight",
+    "HTTP requests currently being handled."
+))
+ERRORS_TOTAL = REGISTRY.register(Counter(
+    "voice_api_errors_total",
+    "Failed detections by error class.",
+    ["type"]
+))
+DOWNLOAD_BYTES = REGISTRY.register(Counter(
+    "voice_api_download_bytes_total",
+    "Audio bytes downloaded from source URLs."
+))
+BATCH_SIZE = REGISTRY.register(Histogram(
+    "voice_api_inference_batch_size",
+    "Clips per batched forward pass.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+))
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "voice_api_admission_rejected_total",
+    "Requests shed by admission control, by reason.",
+    ["reason"]
+))
+ADMISSION_STATE = REGISTRY.register(Gauge(
+    "voice_api_admission",
+    "Admission controller state: active and queued requests, reserved bytes.",
+    ["state"]
+))
+COALESCED_TOTAL = REGISTRY.register(Counter(
+    "voice_api_coalesced_total",
+    "Detections that joined an identical one already in flight, by key (url or content).",
+    ["level"]
+))
+STAGE_IN_FLIGHT = REGISTRY.register(Gauge(
+    "voice_api_stage_in_flight",
+    "Calls running or queued on each worker pool.",
+    ["stage"]
+))
+
+# Stages of a request kept as spans; the rest only count towards its timings
+_MAX_SPANS = 64
+
+
+class RequestTrace:
+    """
+    Stage timings, spans and input metadata collected while handling one request.
+
+    ``timings`` sums the seconds per stage (for ``Server-Timing``);
+    ``spans`` keeps each stage occurrence as (stage, start offset, seconds)
+    relative to ``start``; ``info`` describes the input (format, sample
+    rate, channels, size) for the slow-request log.
+    """
+
+    __slots__ = ("start", "timings", "spans", "info")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.spans: List[Tuple[str, float, float]] = []
+        self.info: Dict[str, object] = {}
+
+
+# Trace of the current request, for the Server-Timing and X-Trace headers
+_request_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+def start_request_trace() -> RequestTrace:
+    """Begin collecting stage timings and spans for the current request context."""
+    trace = RequestTrace()
+    _request_trace.set(trace)
+    return trace
+
+
+def observe_stage(stage: str, seconds: float, start: Optional[float] = None) -> None:
+    """
+    Record a stage duration in the histogram and the current request's trace.
+
+    Args:
+        stage: Stage name
+        seconds: Duration
+        start: ``time.perf_counter()`` when the stage began; defaults to
+            ``seconds`` before now
+    """
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    trace = _request_trace.get()
+    if trace is not None:
+        trace.timings[stage] = trace.timings.get(stage, 0.0) + seconds
+        if len(trace.spans) < _MAX_SPANS:
+            if start is None:
+                start = time.perf_counter() - seconds
+            trace.spans.append((stage, start - trace.start, seconds))
+
+
+def annotate_request(**info) -> None:
+    """Attach input metadata (e.g. ``sample_rate=8000``) to the current request's trace."""
+    trace = _request_trace.get()
+    if trace is not None:
+        trace.info.update(info)
+
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    """Time the enclosed block as ``stage``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start, start)
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Format stage timings as a ``Server-Timing`` header value (milliseconds)."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def trace_header(trace: RequestTrace) -> str:
+    """Format a request's stage spans as an ``X-Trace`` header value (milliseconds since the request began)."""
+    return ", ".join(
+        f"{stage};start={offset * 1000:.1f};dur={seconds * 1000:.1f}" for stage, offset, seconds in trace.spans
+    )
@@ -0,0 +1,257 @@
+"""Model runtimes used by the inference service."""
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ModelBackend(ABC):
+    """
+    A loaded model behind a numpy-in, numpy-out interface.
+
+    ``run`` takes a float32 batch of shape (clips, samples) and returns the
+    raw model output (logits) as a float32 array with one row per clip.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def run(self, batch: np.ndarray) -> np.ndarray:
+        """Run the model on one batch and return its raw output."""
+
+    def warmup(
+        self,
+        num_samples: int,
+        batch_sizes=(1,),
+        runs: int = 2,
+        transform: Optional[Callable[[np.ndarray], np.ndarray]] = None
+    ) -> None:
+        """
+        Run dummy batches so one-time costs are paid before real traffic.
+
+        Graph optimizers specialize on the shapes they see (the TorchScript
+        profiling executor needs two runs per shape), so each batch size
+        expected in production is run ``runs`` times.
+
+        Args:
+            num_samples: Samples per dummy clip
+            batch_sizes: Batch sizes to warm up
+            runs: Passes per batch size
+            transform: Applied to each dummy waveform batch before the model,
+                e.g. feature extraction
+        """
+        for batch_size in batch_sizes:
+            batch = np.zeros((batch_size, num_samples), dtype=np.float32)
+            for _ in range(runs):
+                self.run(transform(batch) if transform else batch)
+        logger.info(f"Warmed up {self.name} backend (batch sizes {list(batch_sizes)}, {runs} runs each)")
+
+
+class TorchBackend(ModelBackend):
+    """Eager PyTorch or TorchScript module."""
+
+    def __init__(self, model, device, name: str):
+        import torch
+        self._torch = torch
+        self.model = model
+        self.device = device
+        self.name = name
+
+    def run(self, batch: np.ndarray) -> np.ndarray:
+        torch = self._torch
+        with torch.inference_mode():
+            tensor = torch.from_numpy(np.ascontiguousarray(batch, dtype=np.float32)).to(self.device)
+            output = self.model(tensor)
+            if isinstance(output, (list, tuple)):
+                output = output[0]
+            return output.float().cpu().numpy()
+
+
+class OnnxBackend(ModelBackend):
+    """ONNX Runtime session on CPU."""
+
+    name = "onnx"
+
+    def __init__(self, session):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+
+    def run(self, batch: np.ndarray) -> np.ndarray:
+        feed = {self.input_name: np.ascontiguousarray(batch, dtype=np.float32)}
+        return np.asarray(self.session.run(None, feed)[0], dtype=np.float32)
+
+
+def load_backend(
+    model_path: str,
+    backend: str = "auto",
+    quantize: bool = False,
+    intra_op_threads: int = 0,
+    inter_op_threads: int = 0,
+    mmap_weights: bool = False
+) -> ModelBackend:
+    """
+    Load a model file into the requested runtime.
+
+    With ``backend="auto"``, ``.onnx`` files use ONNX Runtime and anything
+    else is tried as TorchScript first, falling back to a pickled eager
+    ``torch.nn.Module``.
+
+    Args:
+        model_path: Path of the model file
+        backend: "auto", "eager", "torchscript" or "onnx"
+        quantize: Apply dynamic int8 quantization to the weights
+        intra_op_threads: Threads used inside one operator (0 = runtime default)
+        inter_op_threads: Threads used across operators (0 = runtime default)
+        mmap_weights: Memory-map eager model weights from the file instead
+            of reading them, so processes loading the same file share pages
+
+    Returns:
+        Loaded ModelBackend
+
+    Raises:
+        ValueError: If the model file is missing or cannot be loaded
+    """
+    if not os.path.exists(model_path):
+        raise ValueError(f"Model file not found: {model_path}")
+
+    if backend == "auto":
+        backend = "onnx" if model_path.lower().endswith(".onnx") else "torchscript"
+        fallback_to_eager = backend == "torchscript"
+    else:
+        fallback_to_eager = False
+
+    try:
+        if backend == "onnx":
+            return _load_onnx(model_path, quantize, intra_op_threads, inter_op_threads)
+
+        device = _configure_torch(intra_op_threads, inter_op_threads)
+        if backend == "torchscript":
+            try:
+                return _load_torchscript(model_path, device, quantize)
+            except RuntimeError as e:
+                if not fallback_to_eager:
+                    raise
+                logger.info(f"Not a TorchScript archive ({str(e).splitlines()[0]}), loading as eager module")
+        return _load_eager(model_path, device, quantize, mmap_weights)
+
+    except ImportError as e:
+        raise ValueError(f"Model backend '{backend}' is not installed: {str(e)}")
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Failed to load model from {model_path}: {str(e)}")
+
+
+def _configure_torch(intra_op_threads: int, inter_op_threads: int):
+    """Apply thread settings and pick the device for the PyTorch backends."""
+    import torch
+
+    if intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError as e:
+            # Can only be set once, before any inter-op parallel work
+            logger.warning(f"Could not set inter-op threads: {str(e)}")
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    logger.info(f"PyTorch backend on device: {device} ({torch.get_num_threads()} threads)")
+    return device
+
+
+def _load_eager(model_path: str, device, quantize: bool, mmap_weights: bool = False) -> ModelBackend:
+    import torch
+
+    model = None
+    if mmap_weights and device.type == "cpu":
+        try:
+            model = torch.load(model_path, map_location=device, weights_only=False, mmap=True)
+        except (RuntimeError, TypeError) as e:
+            # Legacy (non-zipfile) archives and old torch versions cannot be mapped
+            logger.info(f"Cannot memory-map model weights, reading them instead: {str(e).splitlines()[0]}")
+    if model is None:
+        model = torch.load(model_path, map_location=device, weights_only=False)
+    if not isinstance(model, torch.nn.Module):
+        raise ValueError("Eager backend expects a pickled torch.nn.Module, not a state dict")
+    model.eval()
+
+    if quantize:
+        if device.type != "cpu":
+            logger.warning("Dynamic int8 quantization is CPU-only; skipping on GPU")
+        else:
+            model = torch.ao.quantization.quantize_dynamic(
+                model, {torch.nn.Linear, torch.nn.LSTM, torch.nn.GRU}, dtype=torch.qint8
+            )
+            logger.info("Applied dynamic int8 quantization")
+
+    logger.info(f"Loaded eager PyTorch model from {model_path}")
+    return TorchBackend(model, device, "eager")
+
+
+def _load_torchscript(model_path: str, device, quantize: bool) -> ModelBackend:
+    import torch
+
+    model = torch.jit.load(model_path, map_location=device)
+    model.eval()
+
+    if quantize:
+        if device.type != "cpu":
+            logger.warning("Dynamic int8 quantization is CPU-only; skipping on GPU")
+        else:
+            from torch.ao.quantization import default_dynamic_qconfig, quantize_dynamic_jit
+            model = quantize_dynamic_jit(model, {"": default_dynamic_qconfig})
+            logger.info("Applied dynamic int8 quantization")
+
+    # Inline parameters as constants and fold them into the graph
+    model = torch.jit.freeze(model)
+    try:
+        model = torch.jit.optimize_for_inference(model)
+    except Exception as e:
+        logger.warning(f"optimize_for_inference failed, using frozen module: {str(e)}")
+
+    logger.info(f"Loaded frozen TorchScript model from {model_path}")
+    return TorchBackend(model, device, "torchscript")
+
+
+def _load_onnx(model_path: str, quantize: bool, intra_op_threads: int, inter_op_threads: int) -> ModelBackend:
+    import onnxruntime as ort
+
+    if quantize:
+        model_path = _quantize_onnx(model_path)
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    if intra_op_threads:
+        options.intra_op_num_threads = intra_op_threads
+    if inter_op_threads:
+        options.inter_op_num_threads = inter_op_threads
+
+    session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+    logger.info(f"Loaded ONNX Runtime model from {model_path}")
+    return OnnxBackend(session)
+
+
+def _quantize_onnx(model_path: str) -> str:
+    """
+    Write a dynamically int8-quantized copy of an ONNX model next to it.
+
+    The copy is reused until the source model changes.
+
+    Returns:
+        Path of the quantized model
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    root, ext = os.path.splitext(model_path)
+    quantized_path = f"{root}.int8{ext}"
+    if not os.path.exists(quantized_path) or os.path.getmtime(quantized_path) < os.path.getmtime(model_path):
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        logger.info(f"Wrote int8-quantized model to {quantized_path}")
+    return quantized_path
+
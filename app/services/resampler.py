@@ -0,0 +1,58 @@
+"""Sample-rate conversion with filters cached per rate pair."""
+import logging
+from functools import lru_cache
+from math import gcd
+from typing import Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RESAMPLERS = ("soxr_hq", "polyphase")
+
+
+@lru_cache(maxsize=32)
+def _polyphase_filter(orig_sr: int, target_sr: int) -> Tuple[int, int, np.ndarray]:
+    """Design the anti-aliasing FIR filter for a rate pair (computed once per pair)."""
+    from scipy.signal import firwin
+
+    g = gcd(orig_sr, target_sr)
+    up, down = target_sr // g, orig_sr // g
+    max_rate = max(up, down)
+    taps = firwin(2 * 10 * max_rate + 1, 1.0 / max_rate, window=("kaiser", 5.0)) * up
+    logger.debug(f"Designed polyphase filter for {orig_sr}->{target_sr} Hz ({len(taps)} taps)")
+    return up, down, taps.astype(np.float32)
+
+
+class Resampler:
+    """
+    Converts mono float32 audio to the target sample rate.
+
+    ``soxr_hq`` uses libsoxr; ``polyphase`` uses scipy's polyphase filter
+    with the filter designed once per source rate and reused across
+    requests.
+    """
+
+    def __init__(self, target_sr: int, method: str = "soxr_hq"):
+        if method not in RESAMPLERS:
+            raise ValueError(f"Unknown resampler: {method} (expected one of {', '.join(RESAMPLERS)})")
+        self.target_sr = target_sr
+        self.method = method
+
+    def resample(self, audio: np.ndarray, orig_sr: int) -> np.ndarray:
+        """
+        Resample mono audio to ``target_sr``.
+
+        Returns a new float32 array; the input is left untouched, so it may
+        be a pooled scratch buffer.
+        """
+        if orig_sr == self.target_sr:
+            return audio.copy()
+
+        if self.method == "soxr_hq":
+            import soxr
+            return soxr.resample(audio, orig_sr, self.target_sr, quality="HQ")
+
+        from scipy.signal import resample_poly
+        up, down, taps = _polyphase_filter(orig_sr, self.target_sr)
+        return resample_poly(audio, up, down, window=taps).astype(np.float32, copy=False)
@@ -0,0 +1,180 @@
+"""Two-level cache for detection results of repeated audio."""
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Rough per-entry bookkeeping overhead (dict slot, tuple, small objects)
+_ENTRY_OVERHEAD_BYTES = 200
+
+
+class LRUCache:
+    """
+    LRU cache with per-entry TTL and a memory budget.
+
+    Entries are evicted least-recently-used first whenever the entry count
+    or the estimated memory use exceeds its limit. Expired entries are
+    dropped when they are looked up. Not thread-safe; use it from the event
+    loop only.
+    """
+
+    def __init__(self, name: str, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, count: bool = True) -> Optional[Any]:
+        """
+        Look up a value, refreshing its LRU position.
+
+        Args:
+            key: Cache key
+            count: Whether to record the lookup in the hit/miss counters
+
+        Returns:
+            The cached value, or None if missing or expired
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] < time.monotonic():
+            self._remove(key)
+            entry = None
+
+        if entry is None:
+            if count:
+                self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        if count:
+            self.hits += 1
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any, size_bytes: int = 0) -> None:
+        """Store a value, evicting older entries if over budget."""
+        if key in self._entries:
+            self._remove(key)
+
+        size_bytes += _ENTRY_OVERHEAD_BYTES
+        if size_bytes > self.max_bytes:
+            return
+
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds, size_bytes)
+        self._bytes += size_bytes
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size_bytes = self._entries.pop(key)
+        self._bytes -= size_bytes
+
+    def stats(self) -> Dict[str, int]:
+        """Counters and occupancy for monitoring."""
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+@dataclass
+class UrlCacheEntry:
+    """HTTP validators and content hash last seen for a URL."""
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: str
+
+
+@dataclass
+class CachedResult:
+    """A stored detection result."""
+    prediction: str
+    confidence: float
+    model_version: str
+
+
+class ResultCache:
+    """
+    Caches detection results by URL and by audio content.
+
+    The URL level remembers the ETag/Last-Modified validators and content
+    hash of each URL, so a repeat request can be answered after a
+    conditional GET returns 304. The content level maps
+    ``(content_hash, model_version)`` to the result, which also catches
+    identical files served under different (e.g. signed) URLs. Including
+    the model version in the key means a model rollout never serves stale
+    results.
+    """
+
+    def __init__(self):
+        self.urls = LRUCache(
+            "url",
+            settings.RESULT_CACHE_MAX_ENTRIES,
+            settings.RESULT_CACHE_MAX_BYTES // 2,
+            settings.URL_CACHE_TTL_SECONDS
+        )
+        self.results = LRUCache(
+            "result",
+            settings.RESULT_CACHE_MAX_ENTRIES,
+            settings.RESULT_CACHE_MAX_BYTES // 2,
+            settings.RESULT_CACHE_TTL_SECONDS
+        )
+
+    def get_validators(self, url: str, model_version: str) -> Optional[UrlCacheEntry]:
+        """
+        Return the URL's validators if its result is still cached.
+
+        Validators are only worth sending when a 304 response could be
+        answered from the content level.
+        """
+        entry = self.urls.get(url)
+        if entry is None:
+            return None
+        if self.results.get((entry.content_hash, model_version), count=False) is None:
+            return None
+        return entry
+
+    def store_url(
+        self,
+        url: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        content_hash: str
+    ) -> None:
+        """Remember a URL's validators; skipped if the server sent none."""
+        if not etag and not last_modified:
+            return
+        entry = UrlCacheEntry(etag=etag, last_modified=last_modified, content_hash=content_hash)
+        size_bytes = len(url) + len(etag or "") + len(last_modified or "") + len(content_hash)
+        self.urls.put(url, entry, size_bytes)
+
+    def get_result(self, content_hash: str, model_version: str) -> Optional[CachedResult]:
+        """Look up the result for a content hash under a model version."""
+        return self.results.get((content_hash, model_version))
+
+    def put_result(self, content_hash: str, model_version: str, prediction: str, confidence: float) -> None:
+        """Store the result for a content hash under a model version."""
+        result = CachedResult(prediction=prediction, confidence=confidence, model_version=model_version)
+        self.results.put((content_hash, model_version), result, len(content_hash) + len(model_version))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Counters for both cache levels."""
+        return {"url": self.urls.stats(), "result": self.results.stats()}
@@ -0,0 +1,88 @@
+"""Single-flight execution: concurrent identical calls share one run."""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from app.services.metrics import COALESCED_TOTAL, time_stage
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key starts the work as its own task; callers
+    that arrive while it runs attach to that task and receive the same
+    result or exception. The key is forgotten as soon as the work finishes,
+    so nothing is cached beyond the calls that overlapped.
+
+    The work does not belong to any one caller. A caller that is cancelled
+    (e.g. its client disconnected) only detaches; the others keep waiting,
+    even if it was the caller that started the work. The work itself is
+    cancelled once no caller is left waiting for it.
+
+    The task runs in the first caller's context, so its stage timings go to
+    that request; later callers record their wait as ``coalesced``. Use
+    from the event loop only.
+    """
+
+    def __init__(self, level: str):
+        """
+        Args:
+            level: Metrics label for calls that were coalesced
+        """
+        self.level = level
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await ``fn()``, sharing one execution with concurrent calls for ``key``.
+
+        Args:
+            key: Identity of the work
+            fn: Starts the work; only called if none is in flight for ``key``
+
+        Returns:
+            The work's result
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            return await self._wait(key, flight)
+
+        COALESCED_TOTAL.inc(level=self.level)
+        logger.info(f"Joining in-flight {self.level} detection ({flight.waiters} waiting)")
+        with time_stage("coalesced"):
+            return await self._wait(key, flight)
+
+    async def _wait(self, key: Hashable, flight: _Flight) -> T:
+        flight.waiters += 1
+        try:
+            # Shielded: cancelling one caller must not cancel the shared work
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Last caller gone; new callers must not attach to work being cancelled
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
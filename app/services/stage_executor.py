@@ -0,0 +1,223 @@
+"""Worker pools for running CPU-bound pipeline stages off the event loop."""
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from app.services.audio_buffer import AudioSource
+from app.services.audio_cache import save_array
+from app.services.audio_preprocessor import AudioPreprocessor, synthetic_clip
+from app.services.metrics import annotate_request, observe_stage
+
+logger = logging.getLogger(__name__)
+
+
+class StageSaturatedError(Exception):
+    """Raised when a stage already has as much queued work as it accepts."""
+
+
+# Per-worker preprocessor, created lazily in each pool thread/process
+_worker_preprocessor: Optional[AudioPreprocessor] = None
+
+
+def _get_worker_preprocessor() -> AudioPreprocessor:
+    global _worker_preprocessor
+    if _worker_preprocessor is None:
+        _worker_preprocessor = AudioPreprocessor()
+    return _worker_preprocessor
+
+
+def run_preprocess(
+    audio_source: AudioSource,
+    max_seconds: float,
+    cache_path: Optional[str] = None
+) -> Tuple[np.ndarray, Dict[str, float], Dict[str, object]]:
+    """
+    Validate duration and preprocess audio inside a worker.
+
+    Module-level so that it can be pickled into a process pool.
+
+    Args:
+        audio_source: Path to audio file or raw audio bytes
+        max_seconds: Maximum allowed duration in seconds
+        cache_path: Also write the result here for the decoded-audio
+            cache's disk tier, off the event loop
+
+    Returns:
+        Tuple of (preprocessed audio array, seconds spent per step in the
+        order they ran, input metadata from the decoder); timings and
+        metadata travel back with the result because worker processes
+        cannot update the API process's metrics or request trace
+    """
+    preprocessor = _get_worker_preprocessor()
+    start = time.perf_counter()
+    preprocessor.check_duration(audio_source, max_seconds=max_seconds)
+    timings = {"duration_check": time.perf_counter() - start}
+    info: Dict[str, object] = {}
+    audio = preprocessor.preprocess(audio_source, timings=timings, info=info)
+    if cache_path:
+        start = time.perf_counter()
+        try:
+            save_array(cache_path, audio)
+        except OSError as e:
+            logger.warning(f"Could not write audio cache file {cache_path}: {str(e)}")
+        timings["cache_write"] = time.perf_counter() - start
+    return audio, timings, info
+
+
+class StageExecutor:
+    """
+    Runs blocking work for one pipeline stage on a dedicated pool.
+
+    Concurrency is bounded by the pool size, and at most ``max_queue``
+    further calls may wait for a free worker. Calls beyond that are
+    rejected immediately with ``StageSaturatedError`` instead of queueing
+    without bound.
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int, max_queue: int):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind for stage '{name}': {kind}")
+
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers if max_workers > 0 else (os.cpu_count() or 1)
+        self.capacity = self.max_workers + max(0, max_queue)
+        self._in_flight = 0
+        self._pool = self._create_pool()
+
+        logger.info(
+            f"Stage '{name}' using {kind} pool (workers={self.max_workers}, capacity={self.capacity})"
+        )
+
+    def _create_pool(self) -> Executor:
+        if self.kind == "process":
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=f"stage-{self.name}"
+        )
+
+    @property
+    def executor(self) -> Executor:
+        """Underlying concurrent.futures executor."""
+        return self._pool
+
+    @property
+    def in_flight(self) -> int:
+        """Number of calls currently running or waiting for a worker."""
+        return self._in_flight
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a callable on the stage pool.
+
+        Args:
+            fn: Callable to run (must be picklable for process pools)
+            *args: Positional arguments for the callable
+
+        Returns:
+            The callable's return value
+
+        Raises:
+            StageSaturatedError: If the stage has no free capacity
+        """
+        if self._in_flight >= self.capacity:
+            raise StageSaturatedError(f"Server busy: {self.name} stage is saturated")
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. a decoder crash); replace the pool so later requests still work
+            logger.error(f"Stage '{self.name}' worker pool broke, restarting it")
+            broken_pool, self._pool = self._pool, self._create_pool()
+            broken_pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            self._in_flight -= 1
+
+    def shutdown(self) -> None:
+        """Shut down the pool, cancelling work that has not started."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        logger.info(f"Stage '{self.name}' shut down")
+
+
+class ExecutionBackend:
+    """Holds the worker pools used by the detection pipeline."""
+
+    def __init__(self):
+        self.preprocess = StageExecutor(
+            "preprocess",
+            settings.PREPROCESS_EXECUTOR,
+            settings.PREPROCESS_WORKERS,
+            settings.PREPROCESS_QUEUE_SIZE
+        )
+        self.inference = StageExecutor(
+            "inference",
+            "thread",
+            settings.INFERENCE_WORKERS,
+            settings.INFERENCE_QUEUE_SIZE
+        )
+
+    async def run_preprocess(
+        self,
+        audio_source: AudioSource,
+        max_seconds: float,
+        cache_path: Optional[str] = None
+    ) -> np.ndarray:
+        """
+        Validate and preprocess audio on the preprocess stage.
+
+        With ``cache_path``, the worker also writes the result there for the
+        decoded-audio cache's disk tier.
+
+        Records the worker's per-step timings, plus the time spent waiting
+        for and transferring to a worker as ``preprocess_wait``, and
+        attaches the decoder's input metadata to the request trace.
+        """
+        start = time.perf_counter()
+        audio, timings, info = await self.preprocess.run(run_preprocess, audio_source, max_seconds, cache_path)
+        elapsed = time.perf_counter() - start
+
+        # Worker clocks are not comparable with ours, so lay the steps out after the wait
+        wait = max(0.0, elapsed - sum(timings.values()))
+        observe_stage("preprocess_wait", wait, start)
+        step_start = start + wait
+        for stage, seconds in timings.items():
+            observe_stage(stage, seconds, step_start)
+            step_start += seconds
+        annotate_request(**info)
+        return audio
+
+    async def warmup(self) -> None:
+        """
+        Start every preprocess worker and pay its one-time costs.
+
+        Each worker decodes and resamples a synthetic clip, which spawns the
+        process (for process pools), imports the codec and resampler
+        libraries and designs the resampling filter before real traffic
+        arrives.
+        """
+        clip = synthetic_clip()
+        # Concurrent calls make the pool start all of its workers
+        await asyncio.gather(*(
+            self.preprocess.run(run_preprocess, clip, 60.0) for _ in range(self.preprocess.max_workers)
+        ))
+        logger.info(f"Warmed up {self.preprocess.max_workers} preprocess worker(s)")
+
+    def shutdown(self) -> None:
+        """Shut down all stage pools."""
+        self.preprocess.shutdown()
+        self.inference.shutdown()
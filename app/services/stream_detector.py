@@ -0,0 +1,202 @@
+"""Incremental audio buffering and verdict tracking for streaming detection."""
+import io
+import logging
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STREAM_FORMATS = ("pcm_s16le", "pcm_f32le", "encoded")
+
+
+class StreamSession:
+    """
+    Turns a stream of audio chunks into a rolling analysis window.
+
+    Chunks are raw little-endian PCM (``pcm_s16le`` / ``pcm_f32le``,
+    interleaved channels) or, with ``encoded``, self-contained encoded
+    segments (e.g. WAV or MP3 chunks) that libsndfile can decode on their
+    own. Each chunk is downmixed and fed through a streaming resampler
+    whose filter state carries across chunks, so the resampled stream is
+    the same as if the whole recording had been resampled at once.
+
+    The last ``window_seconds`` of resampled audio are kept. ``due`` says
+    when a new verdict should be computed: first once ``min_seconds`` have
+    arrived (for a fast first verdict), then every ``hop_seconds``.
+    ``record`` tracks the verdicts and reports when they have stabilized.
+    """
+
+    def __init__(
+        self,
+        input_format: str,
+        sample_rate: Optional[int],
+        channels: int,
+        target_sr: int,
+        window_seconds: float,
+        hop_seconds: float,
+        min_seconds: float,
+        stable_updates: int,
+        early_stop_confidence: float
+    ):
+        """
+        Args:
+            input_format: "pcm_s16le", "pcm_f32le" or "encoded"
+            sample_rate: Input sample rate (PCM only; encoded chunks carry their own)
+            channels: Interleaved channels per PCM frame
+            target_sr: Sample rate the model expects
+            window_seconds: Length of the rolling analysis window
+            hop_seconds: New audio between verdicts
+            min_seconds: Audio needed for the first verdict
+            stable_updates: Consecutive agreeing verdicts needed to stop early
+            early_stop_confidence: Minimum confidence of those verdicts
+
+        Raises:
+            ValueError: If the format or PCM parameters are invalid
+        """
+        if input_format not in STREAM_FORMATS:
+            raise ValueError(f"Unknown stream format: {input_format} (expected one of {', '.join(STREAM_FORMATS)})")
+        if input_format != "encoded" and (not sample_rate or sample_rate <= 0):
+            raise ValueError("sample_rate is required for PCM streams")
+        if channels < 1:
+            raise ValueError("channels must be at least 1")
+
+        self.input_format = input_format
+        self.channels = channels
+        self.target_sr = target_sr
+        self.window = int(window_seconds * target_sr)
+        self.hop = max(1, int(hop_seconds * target_sr))
+        self.min_samples = min(self.window, int(min_seconds * target_sr))
+        self.early_stop_confidence = early_stop_confidence
+
+        # Holds two windows so appends only compact occasionally
+        self._buffer = np.zeros(2 * self.window, dtype=np.float32)
+        self._end = 0
+        self.total_samples = 0
+        self._scored_at: Optional[int] = None
+        self._resampler = None
+        self._input_sr: Optional[int] = None
+        if sample_rate:
+            self._open_resampler(sample_rate)
+        self._recent: Deque[Tuple[str, float]] = deque(maxlen=max(1, stable_updates))
+
+    @property
+    def audio_seconds(self) -> float:
+        """Seconds of audio received so far."""
+        return self.total_samples / self.target_sr
+
+    def push(self, data: bytes) -> int:
+        """
+        Decode, downmix and resample a chunk into the window.
+
+        Returns:
+            Resampled samples added
+
+        Raises:
+            ValueError: If the chunk cannot be decoded
+        """
+        audio = self._decode(data)
+        if self._resampler is not None:
+            audio = self._resampler.resample_chunk(audio)
+        self._append(audio)
+        return len(audio)
+
+    def flush(self) -> int:
+        """Drain the samples still held back by the resampler at the end of the stream."""
+        if self._resampler is None:
+            return 0
+        audio = self._resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+        self._append(audio)
+        return len(audio)
+
+    def due(self, final: bool = False) -> bool:
+        """Whether enough new audio has arrived for another verdict."""
+        if self.total_samples == 0 or self.total_samples == self._scored_at:
+            return False
+        if final:
+            return True
+        if self._scored_at is None:
+            return self.total_samples >= self.min_samples
+        return self.total_samples - self._scored_at >= self.hop
+
+    def take_window(self) -> np.ndarray:
+        """
+        Copy out the current window, peak-normalized like ``AudioPreprocessor``.
+
+        The copy is safe to hand to another thread or a batch.
+        """
+        self._scored_at = self.total_samples
+        window = self._buffer[max(0, self._end - self.window):self._end].copy()
+        peak = max(float(window.max()), -float(window.min()))
+        if peak > 0:
+            window *= 1.0 / (peak + 1e-8)
+        return window
+
+    def record(self, prediction: str, confidence: float) -> bool:
+        """
+        Record a verdict.
+
+        Returns:
+            True once the last ``stable_updates`` verdicts agree with at
+            least ``early_stop_confidence``, i.e. the verdict has stabilized
+        """
+        self._recent.append((prediction, confidence))
+        return (
+            len(self._recent) == self._recent.maxlen
+            and len({p for p, _ in self._recent}) == 1
+            and min(c for _, c in self._recent) >= self.early_stop_confidence
+        )
+
+    def _decode(self, data: bytes) -> np.ndarray:
+        if self.input_format == "pcm_s16le":
+            usable = len(data) - len(data) % (2 * self.channels)
+            audio = np.frombuffer(data, dtype="<i2", count=usable // 2).astype(np.float32) / 32768.0
+        elif self.input_format == "pcm_f32le":
+            usable = len(data) - len(data) % (4 * self.channels)
+            audio = np.frombuffer(data, dtype="<f4", count=usable // 4).astype(np.float32)
+        else:
+            return self._decode_encoded(data)
+
+        if usable != len(data):
+            raise ValueError("PCM chunk is not a whole number of frames")
+        if self.channels > 1:
+            audio = audio.reshape(-1, self.channels).mean(axis=1, dtype=np.float32)
+        return audio
+
+    def _decode_encoded(self, data: bytes) -> np.ndarray:
+        import soundfile as sf
+
+        try:
+            audio, sr = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+        except Exception as e:
+            raise ValueError(f"Cannot decode audio chunk: {str(e)}")
+
+        if self._input_sr is None:
+            self._open_resampler(sr)
+        elif sr != self._input_sr:
+            raise ValueError(f"Chunk sample rate changed from {self._input_sr} to {sr} Hz")
+        return audio.mean(axis=1, dtype=np.float32) if audio.shape[1] > 1 else audio[:, 0]
+
+    def _open_resampler(self, sample_rate: int) -> None:
+        self._input_sr = sample_rate
+        if sample_rate != self.target_sr:
+            import soxr
+            self._resampler = soxr.ResampleStream(sample_rate, self.target_sr, 1, dtype="float32", quality="HQ")
+
+    def _append(self, audio: np.ndarray) -> None:
+        n = len(audio)
+        if n == 0:
+            return
+        if n >= self.window:
+            self._buffer[:self.window] = audio[-self.window:]
+            self._end = self.window
+        else:
+            if self._end + n > len(self._buffer):
+                # Keep only the newest window-minus-chunk samples at the front
+                keep = self.window - n
+                self._buffer[:keep] = self._buffer[self._end - keep:self._end]
+                self._end = keep
+            self._buffer[self._end:self._end + n] = audio
+            self._end += n
+        self.total_samples += n
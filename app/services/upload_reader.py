@@ -0,0 +1,243 @@
+"""Readers for audio uploaded directly in the request body."""
+import binascii
+import logging
+from typing import AsyncIterator, Callable
+
+from app.services.audio_buffer import AudioBuffer
+
+logger = logging.getLogger(__name__)
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+
+def decode_base64_audio(data: str, max_bytes: int) -> AudioBuffer:
+    """
+    Decode base64 audio into an AudioBuffer.
+
+    The size limit is checked from the encoded length before decoding, and
+    the ASCII string is decoded directly without an intermediate bytes copy.
+
+    Args:
+        data: Base64-encoded audio
+        max_bytes: Maximum decoded size in bytes
+
+    Returns:
+        AudioBuffer holding the decoded audio
+
+    Raises:
+        ValueError: If the data is too large or not valid base64
+    """
+    if len(data) // 4 * 3 > max_bytes + 2:
+        raise ValueError(f"Audio exceeds {max_bytes // (1024 * 1024)}MB limit")
+
+    try:
+        decoded = binascii.a2b_base64(data)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Invalid base64 audio: {str(e)}")
+
+    if not decoded:
+        raise ValueError("Audio data is empty")
+    if len(decoded) > max_bytes:
+        raise ValueError(f"Audio exceeds {max_bytes // (1024 * 1024)}MB limit")
+
+    audio_buffer = AudioBuffer()
+    audio_buffer.write(decoded)
+    return audio_buffer
+
+
+async def read_body(chunks: AsyncIterator[bytes], max_bytes: int) -> bytes:
+    """
+    Read a whole request body, enforcing the size limit while streaming.
+
+    Args:
+        chunks: Request body chunks
+        max_bytes: Maximum body size in bytes
+
+    Returns:
+        The body
+
+    Raises:
+        ValueError: If the body is too large
+    """
+    parts = []
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            raise ValueError(f"Request body exceeds {max_bytes // (1024 * 1024)}MB limit")
+        parts.append(chunk)
+    return b"".join(parts)
+
+
+async def read_body_audio(chunks: AsyncIterator[bytes], max_bytes: int) -> AudioBuffer:
+    """
+    Read a raw audio request body, enforcing the size limit while streaming.
+
+    Args:
+        chunks: Request body chunks
+        max_bytes: Maximum body size in bytes
+
+    Returns:
+        AudioBuffer holding the uploaded audio
+
+    Raises:
+        ValueError: If the body is empty or too large
+    """
+    audio_buffer = AudioBuffer()
+    try:
+        async for chunk in chunks:
+            if chunk:
+                audio_buffer.write(chunk)
+                if audio_buffer.size > max_bytes:
+                    raise ValueError(f"Audio exceeds {max_bytes // (1024 * 1024)}MB limit")
+        if audio_buffer.size == 0:
+            raise ValueError("Audio data is empty")
+    except BaseException:
+        audio_buffer.close()
+        raise
+    return audio_buffer
+
+
+async def read_multipart_audio(
+    chunks: AsyncIterator[bytes],
+    content_type: str,
+    max_bytes: int,
+    field_name: str = "file"
+) -> AudioBuffer:
+    """
+    Stream one file field out of a multipart/form-data body.
+
+    Parts are parsed incrementally and only the ``field_name`` part is
+    kept, written straight into an AudioBuffer, so nothing is spooled to
+    disk and oversize uploads are rejected as soon as they cross the limit.
+
+    Args:
+        chunks: Request body chunks
+        content_type: The request's Content-Type header (with boundary)
+        max_bytes: Maximum file size in bytes
+        field_name: Name of the form field holding the audio
+
+    Returns:
+        AudioBuffer holding the uploaded audio
+
+    Raises:
+        ValueError: If the field is missing, empty or too large
+    """
+    audio_buffer = AudioBuffer()
+
+    def write(data: bytes) -> None:
+        audio_buffer.write(data)
+        if audio_buffer.size > max_bytes:
+            raise ValueError(f"Audio exceeds {max_bytes // (1024 * 1024)}MB limit")
+
+    try:
+        await _read_multipart_field(chunks, content_type, field_name, write)
+        if audio_buffer.size == 0:
+            raise ValueError("Audio data is empty")
+    except BaseException:
+        audio_buffer.close()
+        raise
+    return audio_buffer
+
+
+async def read_multipart_field(
+    chunks: AsyncIterator[bytes],
+    content_type: str,
+    max_bytes: int,
+    field_name: str = "file"
+) -> bytes:
+    """
+    Read one field of a multipart/form-data body into memory, with a size cap.
+
+    Args:
+        chunks: Request body chunks
+        content_type: The request's Content-Type header (with boundary)
+        max_bytes: Maximum field size in bytes
+        field_name: Name of the form field to read
+
+    Returns:
+        The field's contents
+
+    Raises:
+        ValueError: If the field is missing or too large
+    """
+    parts = []
+    size = 0
+
+    def append(data: bytes) -> None:
+        nonlocal size
+        size += len(data)
+        if size > max_bytes:
+            raise ValueError(f"'{field_name}' exceeds {max_bytes // (1024 * 1024)}MB limit")
+        parts.append(data)
+
+    await _read_multipart_field(chunks, content_type, field_name, append)
+    return b"".join(parts)
+
+
+async def _read_multipart_field(
+    chunks: AsyncIterator[bytes],
+    content_type: str,
+    field_name: str,
+    sink: Callable[[bytes], None]
+) -> None:
+    """
+    Parse a multipart body incrementally, passing the ``field_name`` part's data to ``sink``.
+
+    A ValueError raised by ``sink`` stops parsing and is re-raised.
+
+    Raises:
+        ValueError: If the boundary or the field is missing, or from ``sink``
+    """
+    _, params = parse_options_header(content_type)
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise ValueError("Multipart request is missing a boundary")
+
+    state = {"header_field": b"", "header_value": b"", "in_field": False, "found": False}
+    errors = []
+
+    def on_part_begin() -> None:
+        state["in_field"] = False
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        state["header_value"] += data[start:end]
+
+    def on_header_end() -> None:
+        if state["header_field"].lower() == b"content-disposition":
+            _, disposition = parse_options_header(state["header_value"])
+            if disposition.get(b"name", b"").decode() == field_name:
+                state["in_field"] = state["found"] = True
+        state["header_field"] = b""
+        state["header_value"] = b""
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        if not state["in_field"] or errors:
+            return
+        try:
+            sink(data[start:end])
+        except ValueError as e:
+            errors.append(e)
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_part_data": on_part_data,
+    })
+
+    async for chunk in chunks:
+        parser.write(chunk)
+        if errors:
+            raise errors[0]
+    parser.finalize()
+
+    if not state["found"]:
+        raise ValueError(f"Multipart request has no '{field_name}' field")
@@ -0,0 +1,146 @@
+"""Shared helpers for the benchmark scripts: clip generation, timing and result files."""
+import io
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# soundfile format and subtype used for each benchmark clip format
+CLIP_FORMATS = {
+    "wav": ("WAV", "PCM_16"),
+    "flac": ("FLAC", "PCM_16"),
+    "mp3": ("MP3", "MPEG_LAYER_III"),
+}
+
+
+def clip_formats() -> List[str]:
+    """Clip formats the installed libsndfile can encode."""
+    import soundfile as sf
+
+    available = sf.available_formats()
+    return [fmt for fmt, (major, _) in CLIP_FORMATS.items() if major in available]
+
+
+def encode_clip(
+    fmt: str = "wav",
+    seconds: float = 5.0,
+    sample_rate: int = 44100,
+    channels: int = 2,
+    seed: int = 0
+) -> bytes:
+    """
+    Encode a deterministic speech-like test clip.
+
+    A few harmonics of a wobbling fundamental plus low-level noise, so
+    lossy encoders do real work and runs with the same seed see identical
+    input.
+
+    Args:
+        fmt: "wav", "flac" or "mp3"
+        seconds: Clip length
+        sample_rate: Sample rate of the clip
+        channels: Number of channels
+        seed: Noise seed; different seeds give byte-different clips
+
+    Returns:
+        Encoded audio file bytes
+    """
+    import soundfile as sf
+
+    major, subtype = CLIP_FORMATS[fmt]
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    f0 = 140.0 + 30.0 * np.sin(2 * np.pi * 3.0 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    rng = np.random.default_rng(seed)
+    mono = 0.3 * voice / 2.5 + 0.01 * rng.standard_normal(len(t))
+    samples = np.repeat(mono[:, None], channels, axis=1).astype(np.float32)
+
+    out = io.BytesIO()
+    sf.write(out, samples, sample_rate, format=major, subtype=subtype)
+    return out.getvalue()
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(seconds: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    values = sorted(s * 1000 for s in seconds)
+    return {
+        "runs": len(values),
+        "mean_ms": round(sum(values) / len(values), 4) if values else 0.0,
+        "min_ms": round(values[0], 4) if values else 0.0,
+        "p50_ms": round(percentile(values, 50), 4),
+        "p95_ms": round(percentile(values, 95), 4),
+        "p99_ms": round(percentile(values, 99), 4),
+        "max_ms": round(values[-1], 4) if values else 0.0,
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int = 20, warmup: int = 2, min_seconds: float = 0.0) -> Dict[str, float]:
+    """
+    Time ``fn`` over ``repeat`` calls after ``warmup`` untimed calls.
+
+    Args:
+        fn: Zero-argument callable to time
+        repeat: Minimum number of timed calls
+        warmup: Untimed calls first, to fill caches and buffer pools
+        min_seconds: Keep timing beyond ``repeat`` until this much time has passed
+
+    Returns:
+        Latency summary from ``summarize``
+    """
+    for _ in range(warmup):
+        fn()
+    samples: List[float] = []
+    started = time.perf_counter()
+    while len(samples) < repeat or time.perf_counter() - started < min_seconds:
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def environment() -> Dict[str, Any]:
+    """Machine and code version the results were produced on."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(path: Optional[str], results: Dict[str, Any]) -> None:
+    """Write results as JSON to ``path``, or to stdout when it is None or "-"."""
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if not path or path == "-":
+        print(text)
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text + "\n")
+    print(f"Results written to {path}")
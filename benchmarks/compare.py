@@ -0,0 +1,91 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+Usage:
+    python -m benchmarks.compare baseline.json current.json --tolerance 0.2
+
+Works on the output of both ``benchmarks.micro`` and ``benchmarks.load``.
+A case regresses when its latency metric grew by more than ``tolerance``
+(relative) and ``min_delta_ms`` (absolute); documented claims that failed
+in the current run count as regressions too. Exits with status 1 on any
+regression so it can gate CI.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    metric: str = "p50_ms",
+    tolerance: float = 0.2,
+    min_delta_ms: float = 0.05
+) -> List[str]:
+    """
+    Print a comparison table and return the names of regressed cases.
+
+    Args:
+        baseline: Earlier result file contents
+        current: New result file contents
+        metric: Latency field compared per case
+        tolerance: Allowed relative slowdown, e.g. 0.2 for 20%
+        min_delta_ms: Slowdowns smaller than this are treated as noise
+
+    Returns:
+        Names of regressed cases and failed claims
+    """
+    regressions = []
+    base_cases = baseline.get("cases", {})
+    current_cases = current.get("cases", {})
+
+    print(f"{'case':<52} {'baseline':>11} {'current':>11} {'change':>8}")
+    for name in sorted(set(base_cases) | set(current_cases)):
+        before = base_cases.get(name, {}).get(metric)
+        after = current_cases.get(name, {}).get(metric)
+        if before is None or after is None:
+            print(f"{name:<52} {_ms(before):>11} {_ms(after):>11} {'n/a':>8}")
+            continue
+        change = (after - before) / before if before else 0.0
+        regressed = change > tolerance and after - before > min_delta_ms
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<52} {_ms(before):>11} {_ms(after):>11} {change:>+7.1%}{flag}")
+        if regressed:
+            regressions.append(name)
+
+    for name, claim in current.get("claims", {}).items():
+        if claim.get("status") == "failed":
+            print(f"claim {name} failed: {claim.get('claim')} (ratio={claim.get('ratio')})")
+            regressions.append(f"claim:{name}")
+    return regressions
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.3f}ms"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", help="Earlier result file")
+    parser.add_argument("current", help="New result file")
+    parser.add_argument("--metric", default="p50_ms", help="Latency field to compare (default: p50_ms)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown (default: 0.2)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="Ignore smaller slowdowns (default: 0.05)")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = compare(baseline, current, args.metric, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+"""
+End-to-end load driver.
+
+Usage:
+    python -m benchmarks.load --spawn --requests 500 --concurrency 32 -o bench/load.json
+    python -m benchmarks.load --api-url http://127.0.0.1:8000 --api-key KEY
+
+Replays a JSONL request file (default: benchmarks/requests.jsonl) against
+the API. Each line is a request body; an optional ``endpoint`` field picks
+the route (default ``/detect-voice``). Every ``audio_url`` is rewritten to
+a local stand-in audio server, which synthesizes the clip named by the URL
+path, e.g. ``speech_5s_44100hz_2ch.mp3`` (defaults: 5s, 44.1kHz, stereo),
+so the run needs no network and is repeatable.
+
+Reports throughput, p50/p95/p99 latency overall and per endpoint, status
+counts and mean Server-Timing stage durations as JSON.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+
+from benchmarks.common import CLIP_FORMATS, encode_clip, environment, summarize, write_results
+from config.settings import settings
+
+DEFAULT_REQUESTS_FILE = os.path.join(os.path.dirname(__file__), "requests.jsonl")
+_CLIP_NAME = re.compile(r"(?:(?P<seconds>\d+(?:\.\d+)?)s)|(?:(?P<rate>\d+)hz)|(?:(?P<channels>\d+)ch)")
+
+
+class AudioServer:
+    """
+    Local HTTP server that synthesizes audio clips from their URL path.
+
+    ``/speech_30s_16000hz_1ch.flac`` is a 30 second 16kHz mono FLAC clip.
+    A ``seed`` query parameter varies the clip's noise so repeated
+    requests are not served from the API's result cache.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self._clips: Dict[Tuple, bytes] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def prepare(self, urls: List[str]) -> None:
+        """Encode the clips for ``urls`` up front so encoding is not timed."""
+        for url in urls:
+            parts = urlsplit(url)
+            self.clip(parts.path, int(parse_qs(parts.query).get("seed", ["0"])[0]))
+
+    def clip(self, path: str, seed: int) -> Optional[bytes]:
+        """Encoded clip for a URL path, or None if the extension is unknown."""
+        name = path.rsplit("/", 1)[-1].lower()
+        fmt = name.rsplit(".", 1)[-1] if "." in name else ""
+        if fmt not in CLIP_FORMATS:
+            return None
+        params = {"seconds": 5.0, "rate": 44100, "channels": 2}
+        for match in _CLIP_NAME.finditer(name.rsplit(".", 1)[0]):
+            for group, value in match.groupdict().items():
+                if value is not None:
+                    params[group] = float(value) if group == "seconds" else int(value)
+
+        key = (fmt, params["seconds"], params["rate"], params["channels"], seed)
+        with self._lock:
+            data = self._clips.get(key)
+        if data is None:
+            data = encode_clip(fmt, params["seconds"], params["rate"], params["channels"], seed=seed)
+            with self._lock:
+                self._clips[key] = data
+        return data
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                seed = int(parse_qs(url.query).get("seed", ["0"])[0])
+                data = server.clip(url.path, seed)
+                if server.latency_ms:
+                    time.sleep(server.latency_ms / 1000)
+                if data is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("ETag", '"' + hashlib.blake2b(data, digest_size=8).hexdigest() + '"')
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def load_requests(path: str, audio_base_url: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Read a JSONL request file, pointing every audio URL at the local server.
+
+    Returns:
+        List of (endpoint, request body) pairs
+    """
+    requests = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            body = json.loads(line)
+            endpoint = body.pop("endpoint", "/detect-voice")
+            if "audio_url" not in body:
+                raise ValueError(f"{path}:{line_number}: missing audio_url")
+            body["audio_url"] = audio_base_url + "/" + urlsplit(body["audio_url"]).path.rsplit("/", 1)[-1]
+            requests.append((endpoint, body))
+    if not requests:
+        raise ValueError(f"{path} has no requests")
+    return requests
+
+
+def build_plan(
+    requests: List[Tuple[str, Dict[str, Any]]],
+    total: int,
+    unique: bool
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Cycle through ``requests`` for ``total`` sends, optionally giving each its own audio."""
+    plan = []
+    for i in range(total):
+        endpoint, body = requests[i % len(requests)]
+        if unique:
+            body = {**body, "audio_url": f"{body['audio_url']}?seed={i}"}
+        plan.append((endpoint, body))
+    return plan
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_api(api_key: str, workers: int, env: Dict[str, str]) -> Tuple[subprocess.Popen, str]:
+    """Start the API with uvicorn on a free local port."""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env={**os.environ, "API_KEY": api_key, **env},
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(client: httpx.AsyncClient, api_url: str, timeout: float) -> None:
+    """Poll ``/ready`` until the API has loaded its model."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(f"{api_url}/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"API at {api_url} not ready after {timeout:g}s")
+
+
+def _parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    timings = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        match = re.search(r"dur=([\d.]+)", params)
+        if name and match:
+            timings[name] = float(match.group(1))
+    return timings
+
+
+async def run_load(
+    api_url: str,
+    api_key: str,
+    plan: List[Tuple[str, Dict[str, Any]]],
+    concurrency: int,
+    warmup: int
+) -> Dict[str, Any]:
+    """
+    Send the requests in ``plan``, ``concurrency`` at a time.
+
+    The first ``warmup`` requests are sent but not recorded.
+
+    Returns:
+        Results with per-endpoint latency summaries, throughput and status counts
+    """
+    headers = {"Authorization": f"Bearer {api_key}"}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Counter = Counter()
+    stage_totals: Dict[str, float] = defaultdict(float)
+    stage_counts: Counter = Counter()
+    counter = iter(range(len(plan)))
+
+    async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+        async def send(i: int) -> None:
+            endpoint, body = plan[i]
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"{api_url}{endpoint}", json=body, headers=headers)
+                status = str(response.status_code)
+                timing = _parse_server_timing(response.headers.get("server-timing"))
+            except httpx.HTTPError as e:
+                status, timing = type(e).__name__, {}
+            elapsed = time.perf_counter() - start
+            if i < warmup:
+                return
+            latencies[endpoint].append(elapsed)
+            statuses[status] += 1
+            for stage, ms in timing.items():
+                stage_totals[stage] += ms
+                stage_counts[stage] += 1
+
+        async def worker() -> None:
+            for i in counter:
+                await send(i)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    cases = {f"load{endpoint}": summarize(values) for endpoint, values in latencies.items()}
+    cases["load/all"] = summarize(all_latencies)
+    cases["load/all"]["throughput_rps"] = round(len(all_latencies) / wall, 3) if wall else 0.0
+    return {
+        "cases": cases,
+        "wall_seconds": round(wall, 3),
+        "status_counts": dict(statuses),
+        "server_timing_mean_ms": {
+            stage: round(stage_totals[stage] / stage_counts[stage], 3) for stage in sorted(stage_totals)
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", default=DEFAULT_REQUESTS_FILE, help="JSONL request file to replay")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--api-url", help="Base URL of a running API")
+    target.add_argument("--spawn", action="store_true", help="Start the API locally with uvicorn for the run")
+    parser.add_argument("--api-key", default=settings.API_KEY, help="Bearer token (default: settings.API_KEY)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --spawn (default: 1)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the result cache with --spawn")
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests to send (default: 200)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight (default: 16)")
+    parser.add_argument("--warmup", type=int, default=10, help="Untimed requests first (default: 10)")
+    parser.add_argument("--unique", action="store_true", help="Give every request distinct audio (bypasses the result cache)")
+    parser.add_argument("--audio-latency-ms", type=float, default=0.0, help="Delay added by the audio server")
+    parser.add_argument("--ready-timeout", type=float, default=120.0, help="Seconds to wait for /ready")
+    parser.add_argument("--output", "-o", help="Write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    audio_server = AudioServer(latency_ms=args.audio_latency_ms)
+    audio_server.start()
+    requests = load_requests(args.file, audio_server.base_url)
+    plan = build_plan(requests, args.warmup + args.requests, args.unique)
+    audio_server.prepare([body["audio_url"] for _, body in plan])
+
+    process = None
+    api_url = args.api_url
+    if args.spawn:
+        env = {"RESULT_CACHE_ENABLED": "false"} if args.no_cache else {}
+        process, api_url = spawn_api(args.api_key, args.workers, env)
+
+    async def run() -> Dict[str, Any]:
+        async with httpx.AsyncClient() as client:
+            await wait_ready(client, api_url, args.ready_timeout)
+        return await run_load(api_url, args.api_key, plan, args.concurrency, args.warmup)
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        audio_server.stop()
+        if process:
+            process.terminate()
+            process.wait(timeout=30)
+
+    overall = results["cases"]["load/all"]
+    print(
+        f"{overall['runs']} requests in {results['wall_seconds']}s: "
+        f"{overall['throughput_rps']} req/s, p50={overall['p50_ms']:.1f}ms "
+        f"p95={overall['p95_ms']:.1f}ms p99={overall['p99_ms']:.1f}ms, statuses={results['status_counts']}",
+        file=sys.stderr
+    )
+    write_results(args.output, {
+        "kind": "load",
+        "environment": environment(),
+        "config": {
+            "file": os.path.relpath(args.file),
+            "spawned": args.spawn,
+            "workers": args.workers if args.spawn else None,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "unique": args.unique,
+            "audio_latency_ms": args.audio_latency_ms,
+        },
+        **results,
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
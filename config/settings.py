@@ -1,6 +1,6 @@
 """Application configuration and settings."""
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -8,6 +8,13 @@ class Settings(BaseSettings):
     
     # API Configuration
     API_KEY: str = "your-secret-api-key-change-in-production"
+    # JSON registry of salted key digests and per-key quotas; replaces API_KEY when set
+    API_KEYS_FILE: Optional[str] = None
+    API_KEYS_RELOAD_SECONDS: float = 5.0
+    # Quotas for registry keys that do not set their own (0 = unlimited)
+    API_KEY_DEFAULT_RATE_PER_SECOND: float = 0.0
+    API_KEY_DEFAULT_BURST: int = 0
+    API_KEY_DEFAULT_MAX_CONCURRENT: int = 0
     API_TITLE: str = "AI Voice Detection API"
     API_VERSION: str = "1.0.0"
     API_DESCRIPTION: str = "Production-grade API for AI-generated voice detection"
@@ -16,19 +23,169 @@ class Settings(BaseSettings):
     HOST: str = "0.0.0.0"
     PORT: int = 8000
     DEBUG: bool = False
+    # Worker processes for `python main.py`; above 1 runs the pre-fork server (0 = one per CPU core)
+    SERVER_WORKERS: int = 1
+    # Load the model in the pre-fork master so workers share its weights copy-on-write
+    SERVER_PRELOAD_MODEL: bool = True
     
     # Audio Processing Configuration
     AUDIO_DOWNLOAD_TIMEOUT: int = 30
     MAX_AUDIO_DURATION_SECONDS: int = 60
     SUPPORTED_AUDIO_FORMATS: list[str] = [".mp3", ".wav", ".m4a", ".flac"]
     SAMPLE_RATE: int = 16000
+    # Resampling method: "soxr_hq" or "polyphase" (scipy, filters cached per source rate)
+    RESAMPLER: Literal["soxr_hq", "polyphase"] = "soxr_hq"
+    # Seconds of audio analysed per clip
+    ANALYSIS_WINDOW_SECONDS: float = 10.0
+    # Stop downloading once the header shows enough bytes for the analysis window
+    DOWNLOAD_TRUNCATE_TO_WINDOW: bool = True
+    HEADER_PROBE_MAX_BYTES: int = 256 * 1024
+    
+    # HTTP Client Configuration (shared, pooled client for audio downloads)
+    DOWNLOAD_TIMEOUT_SECONDS: float = 10.0
+    DOWNLOAD_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    HTTP2_ENABLED: bool = False
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 32
     
     # Model Configuration
     MODEL_VERSION: str = "1.0.0"
     MODEL_PATH: Optional[str] = None
+    # Runtime: "auto" uses ONNX Runtime for .onnx files, otherwise frozen TorchScript or eager PyTorch
+    MODEL_BACKEND: Literal["auto", "eager", "torchscript", "onnx"] = "auto"
+    # Dynamic int8 weight quantization (CPU only)
+    MODEL_QUANTIZE_INT8: bool = False
+    # Threads per forward pass; 0 keeps the runtime default
+    INFERENCE_INTRA_OP_THREADS: int = 0
+    INFERENCE_INTER_OP_THREADS: int = 0
+    # Dummy passes per batch shape at startup
+    MODEL_WARMUP_RUNS: int = 2
+    # Memory-map eager PyTorch weights so processes loading the same file share them
+    MODEL_MMAP_WEIGHTS: bool = True
+    # Model input: raw "waveform", or "log_mel" / "lfcc" features computed per batch
+    MODEL_INPUT_FEATURES: Literal["waveform", "log_mel", "lfcc"] = "waveform"
+    FEATURE_N_FFT: int = 512
+    FEATURE_HOP_LENGTH: int = 160
+    FEATURE_WIN_LENGTH: int = 400
+    # Mel bands (log_mel) or linear filters (lfcc)
+    FEATURE_N_FILTERS: int = 80
+    FEATURE_N_LFCC: int = 60
+    FEATURE_FMIN: float = 0.0
+    # Upper filter edge in Hz; None = Nyquist
+    FEATURE_FMAX: Optional[float] = None
+    
+    # Segmented Inference Configuration (score the whole clip in overlapping windows)
+    SEGMENTED_INFERENCE: bool = False
+    SEGMENT_MAX_SECONDS: float = 30.0
+    SEGMENT_SECONDS: float = 10.0
+    SEGMENT_HOP_SECONDS: float = 5.0
+    SEGMENT_AGGREGATION: Literal["mean", "max", "vote"] = "mean"
+    # Windows per forward pass; early stop is checked between passes, so 0 (all in one pass) disables it
+    SEGMENT_BATCH_SIZE: int = 4
+    SEGMENT_EARLY_STOP_CONFIDENCE: float = 0.95
+    
+    # Inference Batching Configuration
+    BATCH_INFERENCE_ENABLED: bool = True
+    BATCH_MAX_SIZE: int = 16
+    BATCH_MAX_WAIT_MS: float = 10.0
+    BATCH_BUCKET_SECONDS: float = 1.0
+    
+    # Direct Upload Configuration
+    UPLOAD_MAX_BYTES: int = 10 * 1024 * 1024
+    
+    # Batch Endpoint Configuration
+    BATCH_REQUEST_MAX_ITEMS: int = 1000
+    # Largest batch body (or multipart JSONL file) read into memory
+    BATCH_REQUEST_MAX_BYTES: int = 4 * 1024 * 1024
+    BATCH_REQUEST_CONCURRENCY: int = 16
+    
+    # Worker Pool Configuration (0 workers = one per CPU core)
+    PREPROCESS_EXECUTOR: Literal["thread", "process"] = "process"
+    PREPROCESS_WORKERS: int = 0
+    PREPROCESS_QUEUE_SIZE: int = 32
+    INFERENCE_WORKERS: int = 1
+    INFERENCE_QUEUE_SIZE: int = 64
+    BUSY_RETRY_AFTER_SECONDS: int = 1
+    
+    # Background Jobs Configuration (POST /jobs, GET /jobs/{job_id})
+    JOBS_ENABLED: bool = True
+    # "memory" (lost on restart) or "sqlite" (persisted at JOBS_SQLITE_PATH)
+    JOBS_STORE: Literal["memory", "sqlite"] = "memory"
+    JOBS_SQLITE_PATH: str = "data/jobs.db"
+    JOBS_WORKERS: int = 8
+    JOBS_MAX_PENDING: int = 10000
+    # Jobs one API key may have queued or running at once (0 = no limit)
+    JOBS_MAX_PENDING_PER_KEY: int = 1000
+    JOBS_RESULT_TTL_SECONDS: float = 24 * 3600
+    JOBS_WEBHOOK_TIMEOUT_SECONDS: float = 5.0
+    JOBS_WEBHOOK_RETRIES: int = 3
+    # Signs webhook bodies (HMAC-SHA256 in X-Signature-SHA256) when set
+    JOBS_WEBHOOK_SECRET: Optional[str] = None
+    
+    # Admission Control (bounds concurrent detections; excess is shed with 429/503)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_CONCURRENT: int = 64
+    ADMISSION_MAX_QUEUE: int = 256
+    # Requests that cannot start within this many seconds are rejected
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 5.0
+    # Total audio bytes (by declared Content-Length) held by admitted requests
+    ADMISSION_MEMORY_BUDGET_BYTES: int = 512 * 1024 * 1024
+    # Running + queued requests per API key; 0 = fair share while saturated
+    ADMISSION_PER_KEY_MAX_CONCURRENT: int = 0
+    
+    # Streaming Detection (WebSocket /detect-voice/stream)
+    STREAM_MAX_SESSIONS: int = 100
+    # Rolling window scored on each update
+    STREAM_WINDOW_SECONDS: float = 10.0
+    # Audio needed before the first verdict
+    STREAM_MIN_SECONDS: float = 1.0
+    # New audio between verdicts
+    STREAM_HOP_SECONDS: float = 1.0
+    STREAM_MAX_SECONDS: float = 300.0
+    # Stop once this many consecutive verdicts agree at or above the confidence
+    STREAM_STABLE_UPDATES: int = 3
+    STREAM_EARLY_STOP_CONFIDENCE: float = 0.9
+    STREAM_IDLE_TIMEOUT_SECONDS: float = 30.0
+    STREAM_MAX_CHUNK_BYTES: int = 1024 * 1024
+    
+    # Share one download and analysis among concurrent requests for the same URL or audio
+    COALESCE_REQUESTS: bool = True
+    
+    # Result Cache Configuration
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 50000
+    RESULT_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    RESULT_CACHE_TTL_SECONDS: float = 24 * 3600
+    URL_CACHE_TTL_SECONDS: float = 3600
+    
+    # Decoded-Audio Cache (preprocessed audio by content hash; skips decoding when clips are re-scored)
+    AUDIO_CACHE_ENABLED: bool = False
+    AUDIO_CACHE_MAX_ENTRIES: int = 1000
+    AUDIO_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    # Disk tier of memory-mapped .npy files, shared by all processes using it; 0 bytes disables it
+    AUDIO_CACHE_DIR: str = "data/audio_cache"
+    AUDIO_CACHE_DISK_MAX_BYTES: int = 10 * 1024 * 1024 * 1024
+    
+    # Observability
+    METRICS_ENABLED: bool = True
+    # Attach per-stage timings to responses as a Server-Timing header
+    SERVER_TIMING_ENABLED: bool = True
+    # Answer requests sent with `X-Trace: 1` with an X-Trace header of stage spans
+    REQUEST_TRACE_ENABLED: bool = True
+    # Requests slower than this are logged with their input metadata and kept for /admin/slow-requests (0 disables)
+    SLOW_REQUEST_THRESHOLD_MS: float = 5000.0
+    SLOW_REQUEST_LOG_SIZE: int = 100
+    # Bearer key for the /admin endpoints (sampling profiler, slow requests); None disables them
+    ADMIN_API_KEY: Optional[str] = None
+    PROFILER_INTERVAL_MS: float = 10.0
+    PROFILER_MAX_SECONDS: float = 300.0
     
     # Temporary file storage
     TEMP_DIR: str = "/tmp/audio_processing"
+    # Downloads larger than this spill from memory to TEMP_DIR
+    DOWNLOAD_SPOOL_MAX_BYTES: int = 10 * 1024 * 1024
     
     class Config:
         env_file = ".env"
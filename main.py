@@ -3,10 +3,14 @@ import uvicorn
 from config.settings import settings
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host=settings.HOST,
-        port=settings.PORT,
-        reload=settings.DEBUG
-    )
-
+    if settings.SERVER_WORKERS != 1 and not settings.DEBUG:
+        # Pre-fork workers share the model loaded once in this process
+        from app.prefork import serve
+        serve(settings.HOST, settings.PORT, settings.SERVER_WORKERS)
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            reload=settings.DEBUG
+        )
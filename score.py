@@ -0,0 +1,60 @@
+"""Entry point for scoring local audio files offline (no API server)."""
+import argparse
+import logging
+import os
+import sys
+
+from config.settings import settings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Score a directory or manifest of audio files and write one result per file."
+    )
+    parser.add_argument("input", help="Directory to scan for audio files, or a manifest (one path or JSON object per line)")
+    parser.add_argument(
+        "-o", "--output", required=True,
+        help="Results file: .jsonl, or a .parquet dataset directory (requires pyarrow)"
+    )
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (0 = one per CPU core)")
+    parser.add_argument("--shard-size", type=int, default=256, help="Files per unit of work handed to a worker")
+    parser.add_argument("--batch-size", type=int, default=settings.BATCH_MAX_SIZE, help="Clips per forward pass")
+    parser.add_argument("--prefetch", type=int, default=32, help="Files each worker reads and decodes ahead")
+    parser.add_argument("--io-threads", type=int, default=2, help="Threads per worker reading and decoding files")
+    parser.add_argument("--overwrite", action="store_true", help="Replace existing results instead of resuming")
+    parser.add_argument("--retry-errors", action="store_true", help="When resuming, score failed files again")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every file")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    logging.getLogger("app.bulk_scorer").setLevel(logging.INFO)
+
+    from app.bulk_scorer import find_audio_files, read_manifest, score_files
+
+    try:
+        paths = find_audio_files(args.input) if os.path.isdir(args.input) else read_manifest(args.input)
+        counts = score_files(
+            paths,
+            args.output,
+            workers=args.workers,
+            shard_size=args.shard_size,
+            batch_size=args.batch_size,
+            prefetch=args.prefetch,
+            io_threads=args.io_threads,
+            resume=not args.overwrite,
+            retry_errors=args.retry_errors
+        )
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume", file=sys.stderr)
+        return 130
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
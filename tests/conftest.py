@@ -0,0 +1,41 @@
+"""Shared fixtures: an API client running the app in-process."""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from config.settings import settings
+
+API_HEADERS = {"Authorization": f"Bearer {settings.API_KEY}"}
+
+
+@pytest.fixture
+def api_settings(monkeypatch):
+    """
+    Settings for an in-process API: thread pools (no worker processes),
+    the placeholder model and no result cache, so every request runs the
+    whole pipeline. Tests adjust them further before starting the client.
+    """
+    monkeypatch.setattr(settings, "PREPROCESS_EXECUTOR", "thread")
+    monkeypatch.setattr(settings, "PREPROCESS_WORKERS", 2)
+    monkeypatch.setattr(settings, "MODEL_PATH", None)
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "JOBS_STORE", "memory")
+    monkeypatch.setattr(settings, "API_KEYS_FILE", None)
+    return settings
+
+
+@pytest.fixture
+def client(api_settings, monkeypatch):
+    """TestClient for the app, started and ready to serve."""
+    from app.main import app
+    from app.middleware import auth
+
+    # The key registry is built from settings on first use
+    monkeypatch.setattr(auth, "_registry", None)
+    with TestClient(app) as test_client:
+        deadline = time.monotonic() + 30
+        while test_client.get("/ready").status_code != 200:
+            assert time.monotonic() < deadline, "API did not become ready"
+            time.sleep(0.02)
+        yield test_client
@@ -0,0 +1,192 @@
+"""Tests for admission control: slots, queueing, deadlines, memory budget and per-key limits."""
+import asyncio
+
+import pytest
+
+from app.middleware import auth
+from app.services.admission import AdmissionController, AdmissionRejectedError, reserve_memory
+from app.services.api_keys import ApiKeyRegistry
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    """Every test key is registered, without quotas of its own."""
+    registry = ApiKeyRegistry(fallback_key="unused")
+    monkeypatch.setattr(auth, "_registry", registry)
+    monkeypatch.setattr(registry, "authenticate", lambda token: None)
+    return registry
+
+
+def make_controller(**overrides) -> AdmissionController:
+    options = dict(max_concurrent=2, max_queue=2, queue_timeout=1.0, memory_budget_bytes=1000)
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+async def hold(controller: AdmissionController, key: str, release: asyncio.Event, reserve_bytes: int = 0) -> None:
+    async with controller.admit(key, reserve_bytes):
+        await release.wait()
+
+
+async def settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_requests_beyond_the_slots_queue_in_order():
+    async def run():
+        controller = make_controller()
+        release = asyncio.Event()
+        holders = [asyncio.create_task(hold(controller, f"key-{i}", release)) for i in range(2)]
+        await settle()
+        assert (controller.active, controller.queued) == (2, 0)
+
+        order = []
+
+        async def queued(name):
+            async with controller.admit(name):
+                order.append(name)
+
+        waiters = [asyncio.create_task(queued(name)) for name in ("first", "second")]
+        await settle()
+        assert controller.queued == 2
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            async with controller.admit("third"):
+                pass
+        assert rejected.value.status_code == 503
+
+        release.set()
+        await asyncio.gather(*holders, *waiters)
+        assert order == ["first", "second"]
+        assert (controller.active, controller.queued) == (0, 0)
+
+    asyncio.run(run())
+
+
+def test_expected_wait_beyond_the_deadline_is_shed_up_front():
+    async def run():
+        controller = make_controller(max_concurrent=1, max_queue=10, queue_timeout=1.0)
+        controller._avg_service_seconds = 0.6
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, "a", release))
+        await settle()
+        waiter = asyncio.create_task(hold(controller, "b", release))
+        await settle()
+        # Second in line: 2 x 0.6s > 1s
+        with pytest.raises(AdmissionRejectedError, match="expected wait"):
+            async with controller.admit("c"):
+                pass
+        release.set()
+        await asyncio.gather(holder, waiter)
+
+    asyncio.run(run())
+
+
+def test_queued_request_times_out():
+    async def run():
+        controller = make_controller(max_concurrent=1, queue_timeout=0.05)
+        controller._avg_service_seconds = 0.01
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, "a", release))
+        await settle()
+        with pytest.raises(AdmissionRejectedError, match="timed out"):
+            async with controller.admit("b"):
+                pass
+        assert controller.queued == 0
+        release.set()
+        await holder
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_gives_its_place_to_the_next():
+    async def run():
+        controller = make_controller(max_concurrent=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, "a", release))
+        await settle()
+        cancelled = asyncio.create_task(hold(controller, "b", release))
+        after = asyncio.create_task(hold(controller, "c", release))
+        await settle()
+        cancelled.cancel()
+        release.set()
+        await asyncio.gather(holder, after)
+        assert (controller.active, controller.queued) == (0, 0)
+
+    asyncio.run(run())
+
+
+def test_memory_budget_is_reserved_and_released():
+    async def run():
+        controller = make_controller(memory_budget_bytes=1000)
+        async with controller.admit("a", reserve_bytes=600) as ticket:
+            assert controller.memory_reserved == 600
+            with pytest.raises(AdmissionRejectedError, match="memory"):
+                async with controller.admit("b", reserve_bytes=500):
+                    pass
+            # Growing the current request's reservation through the context
+            reserve_memory(900)
+            assert ticket.reserved_bytes == 900
+            with pytest.raises(AdmissionRejectedError):
+                reserve_memory(1100)
+        assert controller.memory_reserved == 0
+        # Outside an admitted request, reserving does nothing
+        reserve_memory(10**9)
+
+    asyncio.run(run())
+
+
+def test_fixed_per_key_limit():
+    async def run():
+        controller = make_controller(max_concurrent=4, per_key_max_concurrent=2)
+        release = asyncio.Event()
+        holders = [asyncio.create_task(hold(controller, "greedy", release)) for _ in range(2)]
+        await settle()
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            async with controller.admit("greedy"):
+                pass
+        assert rejected.value.status_code == 429
+        async with controller.admit("polite"):
+            pass
+        release.set()
+        await asyncio.gather(*holders)
+
+    asyncio.run(run())
+
+
+def test_fair_share_applies_only_when_saturated_and_shared():
+    async def run():
+        controller = make_controller(max_concurrent=2, max_queue=2)
+        release = asyncio.Event()
+        # One key alone may use every slot and queue place
+        tasks = [asyncio.create_task(hold(controller, "greedy", release)) for _ in range(3)]
+        await settle()
+        assert (controller.active, controller.queued) == (2, 1)
+
+        # A second key arrives: each key's share is ceil((2 + 2) / 2) = 2, and greedy has 3
+        tasks.append(asyncio.create_task(hold(controller, "polite", release)))
+        await settle()
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            async with controller.admit("greedy"):
+                pass
+        assert rejected.value.status_code == 429
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+
+def test_key_quota_from_the_registry(registry, monkeypatch):
+    quota = ApiKeyRegistry(fallback_key="limited").authenticate("limited")
+    quota.max_concurrent = 1
+    monkeypatch.setattr(registry, "authenticate", lambda token: quota if token == "limited" else None)
+
+    async def run():
+        controller = make_controller(max_concurrent=4)
+        async with controller.admit("limited"):
+            with pytest.raises(AdmissionRejectedError, match="quota 1"):
+                async with controller.admit("limited"):
+                    pass
+
+    asyncio.run(run())
@@ -0,0 +1,94 @@
+"""Tests for the API key registry: lookup, hot reload and token-bucket rate quotas."""
+import json
+import os
+import time
+
+import pytest
+
+from app.services.api_keys import ApiKeyRegistry, TokenBucket, add_key, key_digest
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met"
+        time.sleep(0.01)
+
+
+def test_token_bucket_allows_a_burst_then_refills_at_its_rate():
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    now = bucket.updated
+    assert [bucket.take(now) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take(now) == pytest.approx(0.5)
+    assert bucket.take(now + 0.5) == 0.0
+    # Never refills beyond its capacity
+    assert bucket.take(now + 100) == 0.0
+    assert bucket.tokens == pytest.approx(2.0)
+
+
+def test_fallback_key_is_registered_as_default():
+    registry = ApiKeyRegistry(fallback_key="secret")
+    assert registry.authenticate("secret").name == "default"
+    assert registry.authenticate("wrong") is None
+    assert registry.get("default") is not None
+
+
+def test_key_file_quotas_and_disabled_keys(tmp_path):
+    path = str(tmp_path / "keys.json")
+    token = add_key(path, "acme", {"rate_per_second": 1, "burst": 2, "max_concurrent": 4})
+    disabled = add_key(path, "old", {})
+    with open(path) as f:
+        data = json.load(f)
+    assert token not in json.dumps(data)
+    data["keys"][1]["disabled"] = True
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+    registry = ApiKeyRegistry(path, defaults={"max_concurrent": 8})
+    key = registry.authenticate(token)
+    assert (key.name, key.max_concurrent) == ("acme", 4)
+    assert [key.throttle() for _ in range(2)] == [0.0, 0.0]
+    assert key.throttle() > 0
+    assert registry.authenticate(disabled) is None
+    assert registry.get("old") is None
+
+
+def test_stored_digest_depends_on_the_salt():
+    assert key_digest("token", b"a" * 16) != key_digest("token", b"b" * 16)
+
+
+def test_changed_key_file_is_reloaded_keeping_rate_state(tmp_path):
+    path = str(tmp_path / "keys.json")
+    token = add_key(path, "acme", {"rate_per_second": 0.001, "burst": 1})
+    registry = ApiKeyRegistry(path, reload_seconds=0)
+    assert registry.authenticate(token).throttle() == 0.0
+
+    later = add_key(path, "beta", {})
+    os.utime(path, (time.time() + 10, time.time() + 10))
+    wait_for(lambda: registry.authenticate(later) is not None)
+    # The old key's bucket carried over, so its burst is still spent
+    assert registry.authenticate(token).throttle() > 0
+    # Lookups by name see the reloaded keys too
+    assert registry.get("beta") is registry.authenticate(later)
+    assert registry.get("acme") is registry.authenticate(token)
+    assert registry.get("missing") is None
+
+
+def test_broken_key_file_keeps_the_current_keys(tmp_path):
+    path = str(tmp_path / "keys.json")
+    token = add_key(path, "acme", {})
+    registry = ApiKeyRegistry(path, reload_seconds=0)
+
+    with open(path, "w") as f:
+        f.write("{not json")
+    os.utime(path, (time.time() + 10, time.time() + 10))
+    registry.authenticate(token)
+    wait_for(lambda: not registry._reloading)
+    assert registry.authenticate(token).name == "acme"
+
+
+def test_invalid_key_file_is_rejected_at_startup(tmp_path):
+    path = tmp_path / "keys.json"
+    path.write_text(json.dumps({"salt": "00", "keys": []}))
+    with pytest.raises(ValueError, match="salt"):
+        ApiKeyRegistry(str(path))
@@ -0,0 +1,53 @@
+"""Tests for the download buffer: in-memory decoding, spill to disk and hashing."""
+import hashlib
+import os
+
+import pytest
+
+from benchmarks.common import encode_clip
+from app.services.audio_buffer import AudioBuffer
+from app.services.audio_preprocessor import AudioPreprocessor
+
+
+def test_small_downloads_stay_in_memory():
+    with AudioBuffer(spool_max_bytes=100) as buffer:
+        buffer.write(b"abc")
+        buffer.write(b"def")
+        assert buffer.in_memory
+        assert buffer.peek(4) == b"abcd"
+        assert buffer.source == b"abcdef"
+        assert buffer.size == 6
+        assert buffer.content_hash == hashlib.blake2b(b"abcdef", digest_size=16).hexdigest()
+        with pytest.raises(ValueError, match="finalized"):
+            buffer.write(b"more")
+
+
+def test_large_downloads_spill_to_a_file_that_close_deletes(tmp_path, monkeypatch):
+    from config.settings import settings
+    monkeypatch.setattr(settings, "TEMP_DIR", str(tmp_path))
+
+    buffer = AudioBuffer(spool_max_bytes=4, extension=".wav")
+    for chunk in (b"ab", b"cd", b"ef", b"gh"):
+        buffer.write(chunk)
+    assert not buffer.in_memory
+    assert buffer.peek(3) == b"abc"
+    path = buffer.source
+    assert path.startswith(str(tmp_path)) and path.endswith(".wav")
+    with open(path, "rb") as f:
+        assert f.read() == b"abcdefgh"
+    assert buffer.content_hash == hashlib.blake2b(b"abcdefgh", digest_size=16).hexdigest()
+
+    buffer.close()
+    buffer.close()
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize("spool_max_bytes", [10**8, 1024])
+def test_memory_and_spilled_sources_decode_the_same(spool_max_bytes):
+    data = encode_clip("flac", 1, 16000, 1)
+    with AudioBuffer(spool_max_bytes=spool_max_bytes, extension=".flac") as buffer:
+        for start in range(0, len(data), 4096):
+            buffer.write(data[start:start + 4096])
+        audio = AudioPreprocessor().preprocess(buffer.source)
+    reference = AudioPreprocessor().preprocess(data)
+    assert (audio == reference).all()
@@ -0,0 +1,132 @@
+"""Tests for the decoded-audio cache and its use by the API pipeline and the bulk scorer."""
+import asyncio
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from benchmarks.common import encode_clip
+from app.bulk_scorer import ShardScorer
+from app.services import audio_cache
+from app.services.audio_buffer import AudioBuffer
+from app.services.audio_cache import DecodedAudioCache, save_array
+from app.services.audio_preprocessor import AudioPreprocessor
+from app.services.detection_pipeline import MAX_DURATION_SECONDS
+from tests.test_detection_pipeline import FakeBackend, FakeDownloader, make_pipeline
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DecodedAudioCache(16, 10**7, directory=str(tmp_path), disk_max_bytes=10**7)
+
+
+def test_keys_depend_on_the_duration_limit(cache):
+    assert cache.key("hash", 30.0) == cache.key("hash", 30.0)
+    assert cache.key("hash", 30.0) != cache.key("hash", 60.0)
+    assert cache.key("hash", 30.0) != cache.key("other", 30.0)
+
+
+def test_disk_hits_are_read_only_memory_maps(tmp_path, cache):
+    audio = np.linspace(-1, 1, 1000, dtype=np.float32)
+    cache.store("a" * 32, audio.copy())
+
+    # A second process sharing the directory only finds the disk copy
+    other = DecodedAudioCache(16, 10**7, directory=str(tmp_path), disk_max_bytes=10**7)
+    assert other.get_from_memory("a" * 32) is None
+    hit = other.get("a" * 32)
+    np.testing.assert_array_equal(hit, audio)
+    assert isinstance(hit, np.memmap)
+    assert not hit.flags.writeable
+    assert other.stats()["disk_hits"] == 1
+
+
+def test_unreadable_disk_files_are_dropped(cache):
+    path = cache.disk_path("b" * 32)
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as f:
+        f.write(b"not an array")
+    assert cache.get("b" * 32) is None
+    assert not os.path.exists(path)
+
+
+def age(path: str, seconds: float) -> None:
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_sweep_removes_least_recently_used_files_and_only_stale_temp_files(tmp_path):
+    cache = DecodedAudioCache(16, 10**7, directory=str(tmp_path), disk_max_bytes=10_000)
+    paths = []
+    for i, key in enumerate(("c" * 32, "d" * 32, "e" * 32)):
+        path = cache.disk_path(key)
+        save_array(path, np.zeros(1000, dtype=np.float32))
+        age(path, 100 - i)
+        paths.append(path)
+    in_flight = paths[0] + ".1.tmp"
+    abandoned = paths[0] + ".2.tmp"
+    for path in (in_flight, abandoned):
+        with open(path, "wb") as f:
+            f.write(bytes(8000))
+    age(abandoned, audio_cache._TEMP_GRACE_SECONDS + 1)
+
+    cache.sweep()
+    assert os.path.exists(in_flight)
+    assert not os.path.exists(abandoned)
+    # Oldest first (the abandoned temp file, then the first clip) until within 90% of the budget
+    assert [os.path.exists(path) for path in paths] == [False, True, True]
+
+
+def test_bulk_scorer_shares_entries_with_the_api(cache):
+    scorer = ShardScorer.__new__(ShardScorer)
+    scorer.preprocessor = AudioPreprocessor()
+    scorer.audio_cache = cache
+
+    data = encode_clip("wav", 2, 16000, 1)
+    content_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+    path = cache.directory + "/clip.wav"
+    with open(path, "wb") as f:
+        f.write(data)
+    scorer._load(path)
+    assert cache.get(cache.key(content_hash, MAX_DURATION_SECONDS)) is not None
+
+    # Longer than the API accepts: cached, but not under the API's key
+    long_data = encode_clip("wav", MAX_DURATION_SECONDS + 5, 16000, 1)
+    long_hash = hashlib.blake2b(long_data, digest_size=16).hexdigest()
+    with open(path, "wb") as f:
+        f.write(long_data)
+    scorer._load(path)
+    assert cache.get(cache.key(long_hash, MAX_DURATION_SECONDS)) is None
+    assert cache.get(cache.key(long_hash)) is not None
+
+
+def test_pipeline_reads_the_disk_tier_off_the_event_loop(tmp_path, cache):
+    data = b"\x01\x02\x03\x04"
+    buffer = AudioBuffer()
+    buffer.write(data)
+    content_hash = buffer.content_hash
+    buffer.close()
+    cache.store(cache.key(content_hash, MAX_DURATION_SECONDS), np.ones(4, dtype=np.float32))
+    # Only the disk copy is left, as in another worker
+    cache = DecodedAudioCache(16, 10**7, directory=str(tmp_path), disk_max_bytes=10**7)
+
+    threads = []
+    get_from_disk = cache.get_from_disk
+
+    def recording_get_from_disk(key):
+        threads.append(threading.current_thread())
+        return get_from_disk(key)
+
+    cache.get_from_disk = recording_get_from_disk
+
+    async def run():
+        backend = FakeBackend()
+        pipeline = make_pipeline(FakeDownloader([data]), backend=backend)
+        pipeline.audio_cache = cache
+        await pipeline.detect_url("https://example.com/a.wav")
+        assert backend.preprocessed == 0
+
+    asyncio.run(run())
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,146 @@
+"""Tests for the audio downloader: per-host limits, header probing and early truncation."""
+import asyncio
+
+import httpx
+import pytest
+
+from benchmarks.common import encode_clip
+from app.services.audio_downloader import AudioDownloader
+from tests.test_audio_header import streamed_wav, vbr_mp3
+
+
+def make_downloader(handler, **attributes) -> AudioDownloader:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    downloader = AudioDownloader(client=client)
+    for name, value in attributes.items():
+        setattr(downloader, name, value)
+    return downloader
+
+
+def test_per_host_limit_and_slots_are_released():
+    clip = encode_clip("wav", 0.5, 16000, 1)
+    active = {}
+    peak = {}
+
+    async def handler(request):
+        host = request.url.host
+        active[host] = active.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), active[host])
+        await asyncio.sleep(0.02)
+        active[host] -= 1
+        return httpx.Response(200, content=clip, headers={"Content-Type": "audio/wav"})
+
+    async def run():
+        downloader = make_downloader(handler, max_connections_per_host=2)
+        urls = [f"https://host-{i % 3}.example/clip.wav" for i in range(12)]
+        buffers = await asyncio.gather(*(downloader.download(url) for url in urls))
+        for buffer in buffers:
+            assert buffer.size == len(clip)
+            buffer.close()
+        assert peak == {"host-0.example": 2, "host-1.example": 2, "host-2.example": 2}
+        assert downloader._host_slots == {}
+        assert downloader._host_users == {}
+
+    asyncio.run(run())
+
+
+def test_failed_download_releases_its_host_slot():
+    async def run():
+        downloader = make_downloader(lambda request: httpx.Response(404))
+        with pytest.raises(ValueError):
+            await downloader.download("https://missing.example/clip.wav")
+        assert downloader._host_slots == {}
+
+    asyncio.run(run())
+
+
+def serve(data: bytes, declare_length: bool = True, chunk_size: int = 16384):
+    """Handler serving ``data``, optionally without Content-Length, and counting the bytes sent."""
+    sent = {"bytes": 0}
+
+    async def body():
+        for start in range(0, len(data), chunk_size):
+            sent["bytes"] += len(data[start:start + chunk_size])
+            yield data[start:start + chunk_size]
+
+    def handler(request):
+        headers = {"Content-Type": "audio/wav"}
+        if declare_length:
+            headers["Content-Length"] = str(len(data))
+        return httpx.Response(200, headers=headers, content=body())
+
+    return handler, sent
+
+
+def test_download_stops_after_the_analysis_window():
+    data = encode_clip("wav", 25, 16000, 1)
+    handler, sent = serve(data)
+
+    async def run():
+        downloader = make_downloader(handler, analysis_seconds=10.0, truncate_to_window=True)
+        buffer = await downloader.download("https://example.com/a.wav", max_seconds=30)
+        assert buffer.truncated
+        assert buffer.declared_duration == pytest.approx(25)
+        assert 44 + 10 * 32000 <= buffer.size < len(data)
+        assert sent["bytes"] < len(data)
+        buffer.close()
+
+    asyncio.run(run())
+
+
+def test_declared_duration_over_the_limit_is_rejected_early():
+    data = encode_clip("wav", 40, 16000, 1)
+    handler, sent = serve(data)
+
+    async def run():
+        downloader = make_downloader(handler)
+        with pytest.raises(ValueError, match="exceeds 30"):
+            await downloader.download("https://example.com/a.wav", max_seconds=30)
+        assert sent["bytes"] < len(data)
+
+    asyncio.run(run())
+
+
+def test_unknown_duration_downloads_the_whole_file():
+    # Streamed WAV without Content-Length: only decoding the full file reveals its length
+    data = streamed_wav(40)
+    handler, _ = serve(data, declare_length=False)
+
+    async def run():
+        downloader = make_downloader(handler, analysis_seconds=10.0, truncate_to_window=True)
+        buffer = await downloader.download("https://example.com/a.wav", max_seconds=30)
+        assert not buffer.truncated
+        assert buffer.size == len(data)
+        assert buffer.declared_duration is None
+        buffer.close()
+
+    asyncio.run(run())
+
+
+def test_truncation_can_be_disabled():
+    data = encode_clip("wav", 25, 16000, 1)
+    handler, _ = serve(data)
+
+    async def run():
+        downloader = make_downloader(handler, truncate_to_window=False)
+        buffer = await downloader.download("https://example.com/a.wav", max_seconds=30)
+        assert buffer.size == len(data)
+        assert not buffer.truncated
+        buffer.close()
+
+    asyncio.run(run())
+
+
+def test_mp3_without_frame_count_is_not_rejected_on_its_first_frame():
+    data = vbr_mp3(10)
+    handler, sent = serve(data)
+
+    async def run():
+        downloader = make_downloader(handler, analysis_seconds=5.0, truncate_to_window=True)
+        buffer = await downloader.download("https://example.com/a.mp3", max_seconds=30)
+        assert buffer.size == len(data)
+        assert buffer.declared_duration is None
+        assert not buffer.truncated
+        buffer.close()
+
+    asyncio.run(run())
@@ -0,0 +1,87 @@
+"""Tests for container header probing."""
+import struct
+
+import pytest
+
+from benchmarks.common import encode_clip
+from app.services.audio_header import probe_header
+
+
+def streamed_wav(seconds: float, sample_rate: int = 16000) -> bytes:
+    """A WAV whose data chunk size was never filled in, as written by a live recorder."""
+    data = bytearray(encode_clip("wav", seconds, sample_rate, 1))
+    data_chunk = data.index(b"data")
+    struct.pack_into("<I", data, data_chunk + 4, 0xFFFFFFFF)
+    return bytes(data)
+
+
+def mp3_frame(kbps: int) -> bytes:
+    """One silent MPEG-1 Layer III frame at 44.1 kHz, joint stereo."""
+    bitrate_index = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320].index(kbps)
+    return bytes([0xFF, 0xFB, bitrate_index << 4, 0x64]) + bytes(144 * kbps * 1000 // 44100 - 4)
+
+
+def vbr_mp3(seconds: float) -> bytes:
+    """A VBR stream without Xing/Info or VBRI header, starting with a 32 kbps frame then 128 kbps ones."""
+    frames = int(seconds * 44100 / 1152)
+    return mp3_frame(32) + mp3_frame(128) * (frames - 1)
+
+
+@pytest.mark.parametrize("fmt", ["wav", "flac", "mp3"])
+def test_declared_duration(fmt):
+    data = encode_clip(fmt, 12, 16000, 1)
+    header = probe_header(data[:4096], len(data))
+    assert header.format == fmt
+    assert header.duration == pytest.approx(12, abs=0.15)
+    assert header.bytes_for(5) < len(data)
+
+
+def test_wav_byte_layout_is_exact():
+    header = probe_header(encode_clip("wav", 2, 16000, 2)[:4096])
+    assert header.data_offset == 44
+    assert header.bytes_per_second == 16000 * 2 * 2
+    assert header.bytes_for(1.0) == 44 + 64000
+
+
+def test_streamed_wav_has_no_duration_without_total_size():
+    data = streamed_wav(3)
+    header = probe_header(data[:4096])
+    assert header.duration is None
+    assert header.bytes_per_second == 32000
+
+    header = probe_header(data[:4096], len(data))
+    assert header.duration == pytest.approx(3)
+
+
+def test_mp3_without_frame_count_has_no_duration():
+    header = probe_header(mp3_frame(128))
+    assert header.format == "mp3"
+    assert header.duration is None
+    assert header.bytes_per_second == 16000
+
+    # Estimating from the first frame would make this 10s clip about 40s long
+    data = vbr_mp3(10)
+    header = probe_header(data[:4096], len(data))
+    assert header.format == "mp3"
+    assert header.duration is None
+
+
+def test_vbri_header_gives_the_duration():
+    frames = 383
+    frame = bytearray(mp3_frame(128))
+    frame[36:54] = b"VBRI" + struct.pack(">HHHII", 1, 0, 75, 160000, frames)
+    header = probe_header(bytes(frame), 200000)
+    assert header.duration == pytest.approx(frames * 1152 / 44100)
+    assert header.bytes_per_second == pytest.approx(160000 / header.duration)
+
+
+def test_flac_without_total_size_has_no_byte_rate():
+    data = encode_clip("flac", 2, 16000, 1)
+    header = probe_header(data[:4096])
+    assert header.duration == pytest.approx(2)
+    assert header.bytes_for(1.0) is None
+
+
+@pytest.mark.parametrize("head", [b"", b"RIFF", b"not audio at all" * 10, b"ID3\x03\x00\x00\x00\x00\x10\x00"])
+def test_unknown_or_incomplete_headers(head):
+    assert probe_header(head) is None
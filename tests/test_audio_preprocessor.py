@@ -0,0 +1,44 @@
+"""Tests for audio preprocessing: window-bounded decoding and the decoded output."""
+import numpy as np
+import pytest
+
+from benchmarks.common import clip_formats, encode_clip
+from app.services.audio_preprocessor import AudioPreprocessor
+from config.settings import settings
+
+
+@pytest.fixture
+def preprocessor(monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_WINDOW_SECONDS", 2.0)
+    monkeypatch.setattr(settings, "SEGMENTED_INFERENCE", False)
+    return AudioPreprocessor()
+
+
+@pytest.mark.parametrize("fmt", clip_formats())
+def test_only_the_analysis_window_is_decoded(preprocessor, fmt):
+    info = {}
+    timings = {}
+    audio = preprocessor.preprocess(encode_clip(fmt, 6, 22050, 2), timings=timings, info=info)
+    assert len(audio) == pytest.approx(2 * settings.SAMPLE_RATE, abs=settings.SAMPLE_RATE // 100)
+    assert info["decoder"] == "libsndfile"
+    assert info["channels"] == 2
+    assert info["sample_rate"] == 22050
+    assert set(timings) == {"decode", "downmix", "resample", "normalize"}
+
+
+def test_short_clips_are_decoded_whole(preprocessor):
+    audio = preprocessor.preprocess(encode_clip("wav", 0.5, 16000, 1))
+    assert len(audio) == 8000
+
+
+def test_duration_check_uses_the_header(preprocessor):
+    preprocessor.check_duration(encode_clip("wav", 3, 16000, 1), max_seconds=5)
+    with pytest.raises(ValueError, match="exceeds 2"):
+        preprocessor.check_duration(encode_clip("wav", 3, 16000, 1), max_seconds=2)
+    with pytest.raises(ValueError, match="metadata"):
+        preprocessor.check_duration(b"not audio", max_seconds=2)
+
+
+def test_undecodable_audio_is_rejected(preprocessor):
+    with pytest.raises(ValueError, match="preprocessing failed"):
+        preprocessor.preprocess(b"RIFF\x00\x00\x00\x00WAVEjunk")
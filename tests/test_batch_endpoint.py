@@ -0,0 +1,110 @@
+"""Tests for /detect-voice/batch and its streamed NDJSON results."""
+import asyncio
+import json
+
+import pytest
+
+from app.services.detection_pipeline import DetectionResult
+from tests.conftest import API_HEADERS
+
+
+@pytest.fixture
+def detections(client, monkeypatch):
+    """Fake pipeline: URLs ending in "bad.wav" fail, "slow.wav" finishes last."""
+    from app import main
+
+    async def detect_url(url, include_segments=False):
+        if url.endswith("bad.wav"):
+            raise ValueError("Unsupported audio format")
+        if url.endswith("slow.wav"):
+            await asyncio.sleep(0.1)
+        return DetectionResult("HUMAN", 0.8, "test", 5)
+
+    monkeypatch.setattr(main.detection_pipeline, "detect_url", detect_url)
+    return client
+
+
+def results(response) -> list:
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_results_stream_in_completion_order_with_their_index(detections):
+    urls = ["https://example.com/slow.wav", "https://example.com/bad.wav", "https://example.com/a.wav"]
+    response = detections.post(
+        "/detect-voice/batch", headers=API_HEADERS, json={"items": [{"audio_url": url, "language": "English"} for url in urls]}
+    )
+    lines = results(response)
+    assert lines[-1]["index"] == 0
+    by_index = {line["index"]: line for line in lines}
+    assert (by_index[0]["status"], by_index[0]["prediction"], by_index[0]["language"]) == (200, "HUMAN", "English")
+    assert (by_index[1]["status"], by_index[1]["error"]) == (400, "Unsupported audio format")
+    assert by_index[2]["audio_url"] == urls[2]
+
+
+def test_jsonl_and_multipart_bodies(detections):
+    body = b'{"audio_url": "https://example.com/a.wav"}\n\n{"audio_url": "https://example.com/b.wav"}\n'
+    jsonl = detections.post(
+        "/detect-voice/batch", headers={**API_HEADERS, "Content-Type": "application/x-ndjson"}, content=body
+    )
+    assert sorted(line["index"] for line in results(jsonl)) == [0, 1]
+
+    multipart = detections.post("/detect-voice/batch", headers=API_HEADERS, files={"file": ("items.jsonl", body)})
+    assert sorted(line["index"] for line in results(multipart)) == [0, 1]
+
+
+@pytest.mark.parametrize("body", [{"items": []}, {"items": [{"audio_url": "not a url"}]}])
+def test_invalid_batches_are_rejected(detections, body):
+    response = detections.post("/detect-voice/batch", headers=API_HEADERS, json=body)
+    assert response.status_code == 400
+
+
+def test_oversized_batches_are_rejected(detections, monkeypatch):
+    from config.settings import settings
+    monkeypatch.setattr(settings, "BATCH_REQUEST_MAX_ITEMS", 2)
+    items = [{"audio_url": f"https://example.com/{i}.wav"} for i in range(3)]
+    response = detections.post("/detect-voice/batch", headers=API_HEADERS, json={"items": items})
+    assert response.status_code == 400
+    assert "max 2" in response.json()["detail"]
+
+
+def jsonl_items(count: int) -> bytes:
+    return b"".join(b'{"audio_url": "https://example.com/%d.wav"}\n' % i for i in range(count))
+
+
+def test_large_bodies_are_rejected_from_their_content_length(detections, monkeypatch):
+    from config.settings import settings
+    monkeypatch.setattr(settings, "BATCH_REQUEST_MAX_BYTES", 1024)
+    response = detections.post(
+        "/detect-voice/batch",
+        headers={**API_HEADERS, "Content-Type": "application/x-ndjson"},
+        content=jsonl_items(2000)
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Batch request exceeds size limit"
+
+
+def test_large_bodies_without_content_length_are_cut_off_while_streaming(detections, monkeypatch):
+    from config.settings import settings
+    monkeypatch.setattr(settings, "BATCH_REQUEST_MAX_BYTES", 1024)
+    body = jsonl_items(100)
+    response = detections.post(
+        "/detect-voice/batch",
+        headers={**API_HEADERS, "Content-Type": "application/x-ndjson"},
+        content=(body[i:i + 256] for i in range(0, len(body), 256))
+    )
+    assert response.status_code == 400
+    assert "Request body exceeds" in response.json()["detail"]
+
+
+def test_multipart_file_part_is_capped(detections, monkeypatch):
+    from config.settings import settings
+    monkeypatch.setattr(settings, "BATCH_REQUEST_MAX_BYTES", 1024)
+    response = detections.post("/detect-voice/batch", headers=API_HEADERS, files={"file": ("items.jsonl", jsonl_items(100))})
+    assert response.status_code == 400
+    assert "'file' exceeds" in response.json()["detail"]
+
+    response = detections.post("/detect-voice/batch", headers=API_HEADERS, files={"other": ("items.jsonl", jsonl_items(1))})
+    assert response.status_code == 400
+    assert "no 'file' field" in response.json()["detail"]
@@ -0,0 +1,137 @@
+"""Tests for the micro-batching inference scheduler."""
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from app.services.batch_scheduler import BatchScheduler
+from app.services.stage_executor import StageSaturatedError
+
+
+class FakeInference:
+    """Scores each clip by its first sample, recording every batch it is given."""
+
+    def __init__(self, gate: threading.Event = None):
+        self.batches = []
+        self.gate = gate
+
+    def predict_batch(self, audios):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.batches.append([len(audio) for audio in audios])
+        return [("AI_GENERATED", float(audio[0])) for audio in audios]
+
+
+def clip(value: float, samples: int) -> np.ndarray:
+    audio = np.zeros(samples, dtype=np.float32)
+    audio[0] = value
+    return audio
+
+
+def test_results_are_routed_back_to_their_callers():
+    async def run():
+        inference = FakeInference()
+        scheduler = BatchScheduler(inference, max_batch_size=8, max_wait_ms=20, bucket_seconds=1.0)
+        await scheduler.start()
+        try:
+            values = [i / 10 for i in range(6)]
+            results = await asyncio.gather(*(scheduler.predict(clip(v, 16000)) for v in values))
+        finally:
+            await scheduler.stop()
+        assert [confidence for _, confidence in results] == pytest.approx(values)
+        assert inference.batches == [[16000] * 6]
+
+    asyncio.run(run())
+
+
+def test_clips_are_bucketed_by_length():
+    async def run():
+        inference = FakeInference()
+        scheduler = BatchScheduler(inference, max_batch_size=8, max_wait_ms=20, bucket_seconds=1.0)
+        await scheduler.start()
+        try:
+            # 0.5s and 1s round up to the first bucket, 3s to the third
+            lengths = [8000, 16000, 48000, 8000]
+            results = await asyncio.gather(*(scheduler.predict(clip(i, n)) for i, n in enumerate(lengths)))
+        finally:
+            await scheduler.stop()
+        assert [confidence for _, confidence in results] == [0, 1, 2, 3]
+        assert sorted(inference.batches) == [[8000, 16000, 8000], [48000]]
+
+    asyncio.run(run())
+
+
+def test_batches_never_exceed_max_batch_size():
+    async def run():
+        inference = FakeInference()
+        scheduler = BatchScheduler(inference, max_batch_size=3, max_wait_ms=20)
+        await scheduler.start()
+        try:
+            await asyncio.gather(*(scheduler.predict(clip(0.1, 1600)) for _ in range(7)))
+        finally:
+            await scheduler.stop()
+        assert max(len(batch) for batch in inference.batches) <= 3
+        assert sum(len(batch) for batch in inference.batches) == 7
+
+    asyncio.run(run())
+
+
+def test_full_queue_is_rejected():
+    async def run():
+        gate = threading.Event()
+        scheduler = BatchScheduler(
+            FakeInference(gate), max_batch_size=1, max_wait_ms=0, max_concurrent_batches=1, max_queue_size=1
+        )
+        await scheduler.start()
+        # One clip in the running batch, one waiting for a batch slot, one filling the queue
+        tasks = []
+        for _ in range(3):
+            tasks.append(asyncio.create_task(scheduler.predict(clip(0.1, 1600))))
+            await asyncio.sleep(0.02)
+        with pytest.raises(StageSaturatedError):
+            await scheduler.predict(clip(0.1, 1600))
+        gate.set()
+        await asyncio.gather(*tasks)
+        await scheduler.stop()
+
+    asyncio.run(run())
+
+
+def test_batch_errors_reach_every_caller():
+    class Failing:
+        def predict_batch(self, audios):
+            raise ValueError("model exploded")
+
+    async def run():
+        scheduler = BatchScheduler(Failing(), max_batch_size=4, max_wait_ms=20)
+        await scheduler.start()
+        try:
+            results = await asyncio.gather(
+                *(scheduler.predict(clip(0.1, 1600)) for _ in range(3)), return_exceptions=True
+            )
+        finally:
+            await scheduler.stop()
+        assert all(isinstance(result, ValueError) for result in results)
+
+    asyncio.run(run())
+
+
+def test_stop_fails_callers_waiting_anywhere():
+    async def run():
+        gate = threading.Event()
+        scheduler = BatchScheduler(
+            FakeInference(gate), max_batch_size=1, max_wait_ms=0, max_concurrent_batches=1
+        )
+        await scheduler.start()
+        # One clip in a running batch, one collected and waiting for a batch slot, one queued
+        tasks = []
+        for _ in range(3):
+            tasks.append(asyncio.create_task(scheduler.predict(clip(0.1, 1600))))
+            await asyncio.sleep(0.02)
+        await asyncio.wait_for(scheduler.stop(), 2)
+        results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), 2)
+        gate.set()
+        assert all(isinstance(result, ValueError) for result in results)
+
+    asyncio.run(run())
@@ -0,0 +1,77 @@
+"""Tests for the benchmark suite's helpers, result comparison and micro-benchmark runner."""
+import json
+
+import pytest
+
+from benchmarks import compare, load, micro
+from benchmarks.common import percentile, summarize
+
+
+def test_latency_summary_uses_nearest_rank_percentiles():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 50) == 0.0
+
+    summary = summarize([0.001, 0.003, 0.002])
+    assert summary["runs"] == 3
+    assert (summary["min_ms"], summary["p50_ms"], summary["max_ms"]) == (1.0, 2.0, 3.0)
+    assert summary["mean_ms"] == pytest.approx(2.0)
+
+
+def results(cases, claims=None):
+    return {"cases": {name: {"p50_ms": value} for name, value in cases.items()}, "claims": claims or {}}
+
+
+def test_compare_flags_slowdowns_beyond_tolerance_and_noise():
+    baseline = results({"slower": 10.0, "noise": 0.01, "steady": 5.0, "removed": 1.0})
+    current = results(
+        {"slower": 13.0, "noise": 0.03, "steady": 5.5, "added": 1.0},
+        claims={"window": {"status": "failed", "claim": "faster", "ratio": 0.9}, "fft": {"status": "passed"}}
+    )
+    assert compare.compare(baseline, current, tolerance=0.2, min_delta_ms=0.05) == ["slower", "claim:window"]
+
+
+def test_compare_exit_status_gates_on_regressions(tmp_path, capsys):
+    baseline, current = tmp_path / "base.json", tmp_path / "current.json"
+    baseline.write_text(json.dumps(results({"case": 10.0})))
+    current.write_text(json.dumps(results({"case": 10.5})))
+    assert compare.main([str(baseline), str(current)]) == 0
+    assert compare.main([str(baseline), str(current), "--tolerance", "0.01", "--min-delta-ms", "0"]) == 1
+    assert "1 regression(s): case" in capsys.readouterr().err
+
+
+def test_load_requests_point_at_the_local_audio_server(tmp_path):
+    requests_file = tmp_path / "requests.jsonl"
+    requests_file.write_text(
+        '{"audio_url": "https://audio.example.com/clips/a.wav", "language": "English"}\n\n'
+        '{"endpoint": "/detect-voice/batch", "audio_url": "https://x.example/b.mp3"}\n'
+    )
+    assert load.load_requests(str(requests_file), "http://127.0.0.1:9000") == [
+        ("/detect-voice", {"audio_url": "http://127.0.0.1:9000/a.wav", "language": "English"}),
+        ("/detect-voice/batch", {"audio_url": "http://127.0.0.1:9000/b.mp3"}),
+    ]
+
+    requests_file.write_text('{"language": "English"}\n')
+    with pytest.raises(ValueError, match="missing audio_url"):
+        load.load_requests(str(requests_file), "http://127.0.0.1:9000")
+
+
+def test_load_plan_can_give_every_request_its_own_audio():
+    requests = [("/detect-voice", {"audio_url": "http://local/a.wav"})]
+    plan = load.build_plan(requests, 3, unique=True)
+    assert [body["audio_url"] for _, body in plan] == [f"http://local/a.wav?seed={i}" for i in range(3)]
+    assert requests[0][1] == {"audio_url": "http://local/a.wav"}
+    assert load._parse_server_timing("download;dur=12.5, inference;dur=3.0, bogus") == {
+        "download": 12.5, "inference": 3.0
+    }
+
+
+def test_micro_benchmarks_write_a_result_file(tmp_path, capsys):
+    output = tmp_path / "results" / "micro.json"
+    assert micro.main(["--quick", "--repeat", "1", "--only", "normalize", "-o", str(output)]) == 0
+    written = json.loads(output.read_text())
+    assert written["kind"] == "micro"
+    assert written["environment"]["python"]
+    assert any(name.startswith("normalize/") and name.endswith("/out") for name in written["cases"])
+    assert all(case["runs"] >= 1 for case in written["cases"].values())
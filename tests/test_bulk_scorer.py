@@ -0,0 +1,84 @@
+"""Tests for offline bulk scoring: file discovery, manifests, resumable output."""
+import json
+import os
+
+import pytest
+
+from benchmarks.common import encode_clip
+from app.bulk_scorer import JsonlResultWriter, find_audio_files, read_manifest, score_files
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """Three clips in nested directories, a non-audio file and a broken "clip"."""
+    (tmp_path / "b").mkdir()
+    (tmp_path / "a").mkdir()
+    for index, name in enumerate(("a/one.wav", "a/two.FLAC", "b/three.wav")):
+        fmt = "flac" if name.endswith("FLAC") else "wav"
+        (tmp_path / name).write_bytes(encode_clip(fmt, 1 + index, 16000, 1, seed=index))
+    (tmp_path / "b" / "notes.txt").write_text("not audio")
+    (tmp_path / "b" / "broken.wav").write_bytes(b"RIFF garbage")
+    return tmp_path
+
+
+def read_records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_audio_files_are_found_in_a_stable_order(corpus):
+    found = [os.path.relpath(path, corpus) for path in find_audio_files(str(corpus))]
+    assert found == ["a/one.wav", "a/two.FLAC", "b/broken.wav", "b/three.wav"]
+
+
+def test_manifest_accepts_paths_and_json_objects(tmp_path):
+    manifest = tmp_path / "list.txt"
+    manifest.write_text('# corpus\na.wav\n\n{"path": "/data/b.wav", "label": "HUMAN"}\n')
+    assert list(read_manifest(str(manifest))) == [str(tmp_path / "a.wav"), "/data/b.wav"]
+
+    manifest.write_text('{"file": "c.wav"}\n')
+    with pytest.raises(ValueError, match="list.txt:1"):
+        list(read_manifest(str(manifest)))
+
+
+def test_resumed_jsonl_drops_a_partial_last_line(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text('{"path": "a.wav", "prediction": "HUMAN"}\n{"path": "b.wav", "error": "bad"}\n{"path": "c.w')
+    writer = JsonlResultWriter(str(output))
+    assert writer.results == {"a.wav": True, "b.wav": False}
+    writer.write([{"path": "c.wav", "prediction": "HUMAN"}])
+    writer.close()
+    assert [record["path"] for record in read_records(output)] == ["a.wav", "b.wav", "c.wav"]
+
+
+def test_files_are_scored_and_failures_recorded(api_settings, corpus):
+    output = corpus / "results.jsonl"
+    counts = score_files(find_audio_files(str(corpus)), str(output), workers=1, batch_size=2)
+    assert counts == {"scored": 3, "failed": 1, "skipped": 0}
+
+    records = {os.path.basename(record["path"]): record for record in read_records(output)}
+    assert records["broken.wav"]["error"]
+    for name in ("one.wav", "two.FLAC", "three.wav"):
+        assert records[name]["prediction"] in ("AI_GENERATED", "HUMAN")
+        assert 0.0 <= records[name]["confidence"] <= 1.0
+
+
+def test_resume_skips_finished_files_and_can_retry_failures(api_settings, corpus):
+    output = str(corpus / "results.jsonl")
+    paths = list(find_audio_files(str(corpus)))
+    score_files(paths, output, workers=1)
+
+    assert score_files(paths, output, workers=1) == {"scored": 0, "failed": 0, "skipped": 4}
+    assert score_files(paths, output, workers=1, retry_errors=True) == {"scored": 0, "failed": 1, "skipped": 3}
+    assert len(read_records(output)) == 5
+
+    assert score_files(paths, output, workers=1, resume=False)["skipped"] == 0
+    assert len(read_records(output)) == 4
+
+
+def test_worker_processes_score_every_shard(api_settings, corpus):
+    output = str(corpus / "results.jsonl")
+    paths = list(find_audio_files(str(corpus)))
+    counts = score_files(paths, output, workers=2, shard_size=1)
+    assert counts == {"scored": 3, "failed": 1, "skipped": 0}
+    assert sorted(record["path"] for record in read_records(output)) == sorted(paths)
@@ -0,0 +1,166 @@
+"""Tests for the detection pipeline: result caching, buffer cleanup and request coalescing."""
+import asyncio
+from typing import List
+
+import numpy as np
+
+from app.services.audio_buffer import AudioBuffer
+from app.services.detection_pipeline import DetectionPipeline, _normalize_url
+from app.services.result_cache import ResultCache
+
+
+class FakeInference:
+    """Inference service scoring every clip as AI_GENERATED with a fixed confidence."""
+
+    model_version = "test"
+    ready = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, audio):
+        self.calls += 1
+        return "AI_GENERATED", 0.75
+
+
+class FakeStage:
+    async def run(self, fn, *args):
+        return fn(*args)
+
+
+class FakeBackend:
+    """Execution backend that "preprocesses" by turning bytes into samples, with an optional delay."""
+
+    def __init__(self, delay: float = 0.0):
+        self.inference = FakeStage()
+        self.delay = delay
+        self.preprocessed = 0
+
+    async def run_preprocess(self, audio_source, max_seconds, cache_path=None):
+        self.preprocessed += 1
+        await asyncio.sleep(self.delay)
+        return np.frombuffer(audio_source, dtype=np.uint8).astype(np.float32)
+
+
+class FakeDownloader:
+    """Serves queued responses in order; each one is the body bytes, or "304"."""
+
+    def __init__(self, responses: List, delay: float = 0.0):
+        self.responses = list(responses)
+        self.delay = delay
+        self.buffers: List[AudioBuffer] = []
+        self.closed: List[AudioBuffer] = []
+
+    async def download(self, url, validators=None, max_seconds=None):
+        await asyncio.sleep(self.delay)
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        downloader = self
+
+        class TrackedBuffer(AudioBuffer):
+            def close(self):
+                downloader.closed.append(self)
+                super().close()
+
+        buffer = TrackedBuffer()
+        if response == "304":
+            buffer.not_modified = True
+        else:
+            buffer.write(response)
+            buffer.etag = '"v1"'
+        self.buffers.append(buffer)
+        return buffer
+
+
+def make_pipeline(downloader, backend=None, result_cache=None, coalesce=True):
+    return DetectionPipeline(
+        downloader,
+        backend or FakeBackend(),
+        FakeInference(),
+        result_cache=result_cache,
+        coalesce=coalesce
+    )
+
+
+def test_not_modified_with_evicted_result_downloads_again_and_closes_both_buffers():
+    async def run():
+        cache = ResultCache()
+        url = "https://example.com/a.wav"
+        # Validators are cached, but the result goes missing between lookup and use
+        cache.store_url(url, '"v1"', None, "stale-hash")
+        cache.put_result("stale-hash", "test", "HUMAN", 0.5)
+
+        downloader = FakeDownloader(["304", b"\x01\x02\x03"])
+        pipeline = make_pipeline(downloader, result_cache=cache)
+        original_get_result = cache.get_result
+
+        def evicted(content_hash, model_version):
+            if content_hash == "stale-hash":
+                return None
+            return original_get_result(content_hash, model_version)
+
+        cache.get_result = evicted
+        result = await pipeline.detect_url(url)
+
+        assert result.prediction == "AI_GENERATED"
+        assert len(downloader.buffers) == 2
+        assert all(buffer in downloader.closed for buffer in downloader.buffers)
+
+    asyncio.run(run())
+
+
+def test_repeated_content_is_served_from_the_result_cache():
+    async def run():
+        backend = FakeBackend()
+        pipeline = make_pipeline(FakeDownloader([b"abc"]), backend=backend, result_cache=ResultCache())
+        first = await pipeline.detect_url("https://example.com/a.wav")
+        second = await pipeline.detect_url("https://example.com/other.wav")
+        assert (first.prediction, first.confidence) == (second.prediction, second.confidence)
+        assert backend.preprocessed == 1
+
+    asyncio.run(run())
+
+
+def test_concurrent_requests_for_the_same_url_share_one_download():
+    async def run():
+        downloader = FakeDownloader([b"abc"], delay=0.02)
+        backend = FakeBackend()
+        pipeline = make_pipeline(downloader, backend=backend)
+        results = await asyncio.gather(
+            pipeline.detect_url("https://example.com/a.wav"),
+            pipeline.detect_url("HTTPS://EXAMPLE.com:443/a.wav#t=1"),
+            pipeline.detect_url("https://example.com/a.wav")
+        )
+        assert len({(r.prediction, r.confidence) for r in results}) == 1
+        assert len(downloader.buffers) == 1
+        assert backend.preprocessed == 1
+
+    asyncio.run(run())
+
+
+def test_identical_content_from_different_urls_is_analyzed_once():
+    async def run():
+        backend = FakeBackend(delay=0.05)
+        pipeline = make_pipeline(FakeDownloader([b"abc"]), backend=backend)
+        await asyncio.gather(
+            pipeline.detect_url("https://example.com/a.wav"),
+            pipeline.detect_url("https://mirror.example.com/a.wav")
+        )
+        assert backend.preprocessed == 1
+
+    asyncio.run(run())
+
+
+def test_coalescing_can_be_disabled():
+    async def run():
+        downloader = FakeDownloader([b"abc"], delay=0.02)
+        pipeline = make_pipeline(downloader, coalesce=False)
+        await asyncio.gather(*(pipeline.detect_url("https://example.com/a.wav") for _ in range(2)))
+        assert len(downloader.buffers) == 2
+
+    asyncio.run(run())
+
+
+def test_url_normalization():
+    assert _normalize_url("HTTPS://Example.COM:443/a.wav#frag") == "https://example.com/a.wav"
+    assert _normalize_url("http://example.com:80") == "http://example.com/"
+    assert _normalize_url("https://example.com:8443/a.wav?x=1") == "https://example.com:8443/a.wav?x=1"
@@ -0,0 +1,71 @@
+"""Tests for the vectorized log-mel and LFCC feature extractor."""
+import numpy as np
+import pytest
+from scipy import fft as sp_fft
+
+from app.services import feature_extractor
+from app.services.feature_extractor import FeatureExtractor
+
+
+def clips(count: int, samples: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.uniform(-0.5, 0.5, (count, samples)).astype(np.float32)
+
+
+def test_log_mel_matches_librosa():
+    librosa = pytest.importorskip("librosa")
+    audio = clips(1, 8000)[0]
+    reference = librosa.feature.melspectrogram(
+        y=audio, sr=16000, n_fft=512, hop_length=160, win_length=400,
+        center=True, pad_mode="constant", power=2.0, n_mels=80
+    )
+    features = FeatureExtractor("log_mel").extract(audio)
+    assert features.shape == (80, 1 + 8000 // 160)
+    np.testing.assert_allclose(features, np.log(reference + 1e-6), atol=1e-3)
+
+
+def test_lfcc_is_the_dct_of_log_linear_energies():
+    batch = clips(2, 4000)
+    extractor = FeatureExtractor("lfcc", n_filters=40, n_coeffs=20)
+    coeffs = extractor.extract_batch(batch).copy()
+    assert coeffs.shape == (2, 20, 1 + 4000 // 160)
+
+    # Reference: frame, window and filter with plain numpy, then scipy's orthonormal DCT
+    padded = np.pad(batch, ((0, 0), (256, 256)))
+    frames = np.stack([padded[:, i * 160:i * 160 + 512] for i in range(coeffs.shape[-1])], axis=1)
+    power = np.abs(np.fft.rfft(frames * extractor.window, axis=-1)) ** 2
+    energies = np.log(power @ extractor.filters.T + 1e-6)
+    expected = sp_fft.dct(energies, type=2, norm="ortho", axis=-1)[..., :20].transpose(0, 2, 1)
+    np.testing.assert_allclose(coeffs, expected, atol=2e-3)
+
+
+def test_batch_and_single_clip_features_agree():
+    batch = clips(3, 3200)
+    extractor = FeatureExtractor("log_mel")
+    batched = extractor.extract_batch(batch).copy()
+    for clip, features in zip(batch, batched):
+        np.testing.assert_allclose(extractor.extract(clip), features, atol=1e-5)
+
+
+def test_waveform_kind_passes_the_batch_through():
+    batch = clips(2, 1600)
+    assert FeatureExtractor("waveform").extract_batch(batch) is batch
+
+
+def test_filterbanks_are_shared_between_extractors():
+    first = FeatureExtractor("log_mel", n_filters=64)
+    second = FeatureExtractor("log_mel", n_filters=64)
+    assert first.filters is second.filters
+    assert first.window is second.window
+    assert feature_extractor._mel_filterbank.cache_info().hits >= 1
+
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"kind": "mfcc"}, "Unknown feature kind"),
+    ({"win_length": 1024}, "must not exceed n_fft"),
+    ({"fmin": 9000.0}, "Invalid filter range"),
+    ({"kind": "lfcc", "n_filters": 20, "n_coeffs": 30}, "must not exceed n_filters"),
+])
+def test_invalid_configurations_are_rejected(kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        FeatureExtractor(**kwargs)
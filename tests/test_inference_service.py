@@ -0,0 +1,123 @@
+"""Tests for segmented inference: window layout, aggregation and early stop."""
+import numpy as np
+import pytest
+
+from config.settings import settings
+from app.services.inference_service import InferenceService
+
+
+@pytest.fixture
+def segments(monkeypatch):
+    """Ten-second windows every five seconds at 1 kHz, with the shipped batch size."""
+    monkeypatch.setattr(settings, "SAMPLE_RATE", 1000)
+    monkeypatch.setattr(settings, "SEGMENT_SECONDS", 10.0)
+    monkeypatch.setattr(settings, "SEGMENT_HOP_SECONDS", 5.0)
+    monkeypatch.setattr(settings, "SEGMENT_AGGREGATION", "mean")
+    monkeypatch.setattr(settings, "SEGMENT_EARLY_STOP_CONFIDENCE", 0.95)
+
+
+def scored_service(ai_probability):
+    """Service whose model returns ``ai_probability(window)`` and records every batch it runs."""
+    service = InferenceService()
+    service.batches = []
+
+    def predict_batch(audios):
+        service.batches.append(len(audios))
+        return [("AI_GENERATED", ai_probability(audio)) for audio in audios]
+
+    service.predict_batch = predict_batch
+    return service
+
+
+def test_windows_cover_the_clip_and_the_last_is_aligned_to_its_end(segments):
+    service = InferenceService()
+    assert service._split_windows(np.zeros(8000)) == [(0, 8000)]
+    assert service._split_windows(np.zeros(27000)) == [(0, 10000), (5000, 15000), (10000, 20000), (15000, 25000), (17000, 27000)]
+
+
+def test_confident_clip_stops_after_the_first_pass_with_default_batch_size(segments):
+    service = scored_service(lambda audio: 0.99)
+    prediction, confidence, scored = service.predict_segments(np.zeros(60000, dtype=np.float32))
+    windows = len(service._split_windows(np.zeros(60000)))
+    assert settings.SEGMENT_BATCH_SIZE > 0
+    assert prediction == "AI_GENERATED"
+    assert confidence == pytest.approx(0.99)
+    assert service.batches == [settings.SEGMENT_BATCH_SIZE]
+    assert len(scored) == settings.SEGMENT_BATCH_SIZE < windows
+
+
+def test_uncertain_clip_scores_every_window(segments):
+    service = scored_service(lambda audio: 0.6)
+    _, confidence, scored = service.predict_segments(np.zeros(60000, dtype=np.float32))
+    assert len(scored) == len(service._split_windows(np.zeros(60000)))
+    assert confidence == pytest.approx(0.6)
+
+
+def test_batch_size_zero_scores_all_windows_in_one_pass(segments, monkeypatch):
+    monkeypatch.setattr(settings, "SEGMENT_BATCH_SIZE", 0)
+    service = scored_service(lambda audio: 0.99)
+    _, _, scored = service.predict_segments(np.zeros(60000, dtype=np.float32))
+    assert service.batches == [len(scored)]
+
+
+@pytest.mark.parametrize("aggregation, expected", [
+    ("mean", ("HUMAN", 1 - 0.4)),
+    ("max", ("AI_GENERATED", 0.9)),
+    ("vote", ("HUMAN", 2 / 3)),
+])
+def test_aggregation(monkeypatch, aggregation, expected):
+    monkeypatch.setattr(settings, "SEGMENT_AGGREGATION", aggregation)
+    prediction, confidence = InferenceService()._aggregate([0.9, 0.2, 0.1])
+    assert prediction == expected[0]
+    assert confidence == pytest.approx(expected[1])
+
+
+def test_segments_report_window_times(segments):
+    # The first window sounds human, the rest AI
+    service = scored_service(lambda audio: 0.1 if audio[0] == 0 else 0.8)
+    audio = np.ones(20000, dtype=np.float32)
+    audio[:10] = 0
+    _, _, scored = service.predict_segments(audio)
+    assert scored[0] == {"start_seconds": 0.0, "end_seconds": 10.0, "ai_probability": 0.1}
+    assert scored[-1]["end_seconds"] == 20.0
+    assert all(segment["ai_probability"] == 0.8 for segment in scored[1:])
+
+
+def test_max_keeps_scoring_a_confident_human_clip(segments, monkeypatch):
+    monkeypatch.setattr(settings, "SEGMENT_AGGREGATION", "max")
+    # Only the last window contains the AI-sounding part
+    audio = np.zeros(60000, dtype=np.float32)
+    audio[55000:] = 1.0
+    service = scored_service(lambda window: 0.99 if window.max() > 0 else 0.01)
+    prediction, confidence, scored = service.predict_segments(audio)
+    assert (prediction, confidence) == ("AI_GENERATED", 0.99)
+    assert len(scored) == 11
+
+
+def test_max_stops_once_a_window_is_ai(segments, monkeypatch):
+    monkeypatch.setattr(settings, "SEGMENT_AGGREGATION", "max")
+    audio = np.zeros(60000, dtype=np.float32)
+    audio[:1000] = 1.0
+    service = scored_service(lambda window: 0.99 if window.max() > 0 else 0.01)
+    prediction, _, scored = service.predict_segments(audio)
+    assert prediction == "AI_GENERATED"
+    assert len(scored) == 4
+
+
+def test_vote_waits_for_a_majority_of_all_windows(segments, monkeypatch):
+    monkeypatch.setattr(settings, "SEGMENT_AGGREGATION", "vote")
+    # The first four windows vote HUMAN, the remaining seven AI_GENERATED
+    audio = np.zeros(60000, dtype=np.float32)
+    audio[20000:] = 1.0
+    service = scored_service(lambda window: 0.99 if window.mean() > 0.5 else 0.01)
+    prediction, _, scored = service.predict_segments(audio)
+    assert prediction == "AI_GENERATED"
+    assert len(scored) == 11
+
+
+def test_vote_stops_once_the_majority_is_settled(segments, monkeypatch):
+    monkeypatch.setattr(settings, "SEGMENT_AGGREGATION", "vote")
+    service = scored_service(lambda window: 0.99)
+    prediction, _, scored = service.predict_segments(np.zeros(60000, dtype=np.float32))
+    assert prediction == "AI_GENERATED"
+    assert len(scored) == 8
@@ -0,0 +1,119 @@
+"""Tests for the background job queue and the jobs API."""
+import asyncio
+import time
+
+import pytest
+
+from app.services import admission
+from app.services.admission import AdmissionRejectedError
+from app.services.detection_pipeline import DetectionResult
+from app.services.job_queue import JobQueue
+from app.services.job_store import JOB_FAILED, JOB_SUCCEEDED, InMemoryJobStore, Job
+from tests.conftest import API_HEADERS
+
+
+def make_job(owner: str = "key-a", url: str = "https://example.com/a.wav") -> Job:
+    return Job(audio_url=url, owner=owner)
+
+
+async def wait_finished(store, job_id: str) -> Job:
+    deadline = time.monotonic() + 5
+    while True:
+        job = await store.get(job_id)
+        if job.finished:
+            return job
+        assert time.monotonic() < deadline, "job did not finish"
+        await asyncio.sleep(0.01)
+
+
+def test_jobs_succeed_or_fail_with_a_status():
+    async def run_job(job):
+        if job.audio_url.endswith("bad.wav"):
+            raise ValueError("Unsupported audio format")
+        return {"prediction": "HUMAN"}
+
+    async def run():
+        queue = JobQueue(InMemoryJobStore(), run_job, workers=2)
+        await queue.start()
+        try:
+            good = await queue.submit(make_job())
+            bad = await queue.submit(make_job(url="https://example.com/bad.wav"))
+            good = await wait_finished(queue.store, good.job_id)
+            bad = await wait_finished(queue.store, bad.job_id)
+        finally:
+            await queue.stop()
+        assert (good.status, good.result) == (JOB_SUCCEEDED, {"prediction": "HUMAN"})
+        assert (bad.status, bad.error_status) == (JOB_FAILED, 400)
+
+    asyncio.run(run())
+
+
+def test_pending_jobs_are_limited_per_key():
+    release = asyncio.Event()
+
+    async def run_job(job):
+        await release.wait()
+        return {}
+
+    async def run():
+        queue = JobQueue(InMemoryJobStore(), run_job, workers=1, max_pending_per_key=2)
+        await queue.start()
+        try:
+            first = await queue.submit(make_job())
+            await queue.submit(make_job())
+            with pytest.raises(AdmissionRejectedError) as rejected:
+                await queue.submit(make_job())
+            assert rejected.value.status_code == 429
+            # Other keys are not affected
+            await queue.submit(make_job(owner="key-b"))
+
+            release.set()
+            await wait_finished(queue.store, first.job_id)
+            await asyncio.sleep(0.05)
+            await queue.submit(make_job())
+            assert queue._per_owner.get("key-a", 0) <= 2
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_recovered_jobs_count_toward_their_key_limit():
+    async def run():
+        store = InMemoryJobStore()
+        await store.save(make_job())
+        queue = JobQueue(store, lambda job: asyncio.sleep(10), workers=1, max_pending_per_key=1)
+        await queue.start(recover=True)
+        try:
+            with pytest.raises(AdmissionRejectedError):
+                await queue.submit(make_job())
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_jobs_run_under_admission_for_the_submitting_key(client, monkeypatch):
+    from app import main
+    from app.middleware.auth import api_key_id
+    from config.settings import settings
+
+    tickets = []
+
+    async def detect_url(url, include_segments=False):
+        tickets.append(admission._current_ticket.get())
+        return DetectionResult("HUMAN", 0.9, "test", 1)
+
+    monkeypatch.setattr(main.detection_pipeline, "detect_url", detect_url)
+    response = client.post("/jobs", headers=API_HEADERS, json={"audio_url": "https://example.com/a.wav"})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    deadline = time.monotonic() + 5
+    while (body := client.get(f"/jobs/{job_id}", headers=API_HEADERS).json())["status"] != "succeeded":
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.01)
+    assert body["result"]["prediction"] == "HUMAN"
+    assert tickets[0] is not None
+    assert tickets[0].key == api_key_id(settings.API_KEY)
+    assert main.admission_controller.active == 0
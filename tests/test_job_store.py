@@ -0,0 +1,93 @@
+"""Tests for the in-memory and SQLite job stores."""
+import asyncio
+import time
+
+import pytest
+
+from app.services.job_store import (
+    JOB_FAILED, JOB_RUNNING, JOB_SUCCEEDED, InMemoryJobStore, Job, JobStore, create_job_store
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = create_job_store(request.param, str(tmp_path / "jobs" / "jobs.db"))
+    yield store
+    store.close()
+
+
+def test_store_without_all_methods_cannot_be_created():
+    class Incomplete(JobStore):
+        async def save(self, job):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_saved_jobs_round_trip(store):
+    async def run():
+        job = Job(audio_url="https://example.com/a.wav", owner="key", include_segments=True)
+        await store.save(job)
+        job.status = JOB_SUCCEEDED
+        job.result = {"prediction": "HUMAN", "confidence": 0.9}
+        await store.save(job)
+
+        loaded = await store.get(job.job_id)
+        assert loaded.status == JOB_SUCCEEDED
+        assert loaded.result == {"prediction": "HUMAN", "confidence": 0.9}
+        assert loaded.include_segments
+        assert await store.get("missing") is None
+
+    asyncio.run(run())
+
+
+def test_unfinished_jobs_are_listed_for_recovery(store):
+    async def run():
+        queued = Job(audio_url="https://example.com/a.wav", owner="key")
+        running = Job(audio_url="https://example.com/b.wav", owner="key", status=JOB_RUNNING)
+        failed = Job(audio_url="https://example.com/c.wav", owner="key", status=JOB_FAILED)
+        for job in (queued, running, failed):
+            await store.save(job)
+        unfinished = await store.list_unfinished()
+        assert {job.job_id for job in unfinished} == {queued.job_id, running.job_id}
+
+    asyncio.run(run())
+
+
+def test_purge_only_removes_old_finished_jobs(store):
+    async def run():
+        finished = Job(audio_url="https://example.com/a.wav", owner="key", status=JOB_SUCCEEDED)
+        queued = Job(audio_url="https://example.com/b.wav", owner="key")
+        await store.save(finished)
+        await store.save(queued)
+
+        assert await store.purge(time.time() - 60) == 0
+        assert await store.purge(time.time() + 1) == 1
+        assert await store.get(finished.job_id) is None
+        assert await store.get(queued.job_id) is not None
+
+    asyncio.run(run())
+
+
+def test_sqlite_jobs_survive_reopening(tmp_path):
+    async def run():
+        path = str(tmp_path / "jobs.db")
+        first = create_job_store("sqlite", path)
+        job = Job(audio_url="https://example.com/a.wav", owner="key")
+        await first.save(job)
+        first.close()
+
+        second = create_job_store("sqlite", path)
+        try:
+            assert [j.job_id for j in await second.list_unfinished()] == [job.job_id]
+        finally:
+            second.close()
+
+    asyncio.run(run())
+
+
+def test_unknown_store_kind_is_rejected():
+    assert isinstance(create_job_store("memory", ""), InMemoryJobStore)
+    with pytest.raises(ValueError, match="Unknown job store"):
+        create_job_store("redis", "")
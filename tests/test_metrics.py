@@ -0,0 +1,94 @@
+"""Tests for the metrics registry, /metrics and the Server-Timing header."""
+import base64
+
+import pytest
+
+from benchmarks.common import encode_clip
+from app.services.metrics import Counter, Gauge, Histogram, MetricsRegistry, _Metric, server_timing_header
+from tests.conftest import API_HEADERS
+
+
+def test_metrics_render_in_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.register(Counter("requests_total", "Requests.", ["status"]))
+    in_flight = registry.register(Gauge("in_flight", "In flight."))
+    latency = registry.register(Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0)))
+    requests.inc(status="200")
+    requests.inc(2, status="200")
+    in_flight.inc()
+    in_flight.dec()
+    in_flight.inc(3)
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{status="200"} 3' in lines
+    assert "in_flight 3" in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "latency_seconds_sum 5.55" in lines
+    assert "latency_seconds_count 3" in lines
+
+
+def test_label_values_are_escaped_and_label_names_checked():
+    registry = MetricsRegistry()
+    errors = registry.register(Counter("errors_total", "Errors.", ["type"]))
+    errors.inc(type='say "hi"\n')
+    assert 'errors_total{type="say \\"hi\\"\\n"} 1' in registry.render()
+    with pytest.raises(ValueError, match="expects labels"):
+        errors.inc(kind="x")
+
+
+
+def test_metric_types_must_render_their_samples():
+    class Incomplete(_Metric):
+        type = "counter"
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "Missing _samples.")
+
+    class Constant(_Metric):
+        type = "gauge"
+
+        def _samples(self):
+            return [f"{self.name} 1"]
+
+    assert Constant("constant", "Always one.").render() == [
+        "# HELP constant Always one.", "# TYPE constant gauge", "constant 1"
+    ]
+
+
+def test_collectors_refresh_gauges_before_each_scrape():
+    registry = MetricsRegistry()
+    depth = registry.register(Gauge("depth", "Depth."))
+    registry.add_collector(lambda: depth.set(7))
+    assert "depth 7" in registry.render()
+
+
+def test_server_timing_header_is_in_milliseconds():
+    assert server_timing_header({"download": 0.0123, "total": 0.05}) == "download;dur=12.3, total;dur=50.0"
+
+
+def test_detections_report_stage_timings(client):
+    clip = base64.b64encode(encode_clip("wav", 1, 16000, 1)).decode()
+    response = client.post(
+        "/detect-voice/base64",
+        headers=API_HEADERS,
+        json={"language": "English", "audioFormat": "mp3", "audioBase64": clip}
+    )
+    assert response.status_code == 200
+    stages = [part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")]
+    assert "inference" in stages and stages[-1] == "total"
+
+    metrics = client.get("/metrics")
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'voice_api_requests_total{endpoint="/detect-voice/base64",status="200"}' in metrics.text
+    assert 'voice_api_stage_duration_seconds_count{stage="inference"}' in metrics.text
+
+
+def test_metrics_endpoint_can_be_disabled(client, monkeypatch):
+    from config.settings import settings
+    monkeypatch.setattr(settings, "METRICS_ENABLED", False)
+    assert client.get("/metrics").status_code == 404
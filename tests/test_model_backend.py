@@ -0,0 +1,37 @@
+"""Tests for the model backend interface and loader."""
+import numpy as np
+import pytest
+
+from app.services.model_backend import ModelBackend, load_backend
+
+
+class RecordingBackend(ModelBackend):
+    """Returns one zero logit pair per clip, recording the batch shapes it sees."""
+
+    name = "recording"
+
+    def __init__(self):
+        self.shapes = []
+
+    def run(self, batch: np.ndarray) -> np.ndarray:
+        self.shapes.append(batch.shape)
+        return np.zeros((batch.shape[0], 2), dtype=np.float32)
+
+
+def test_backend_without_run_cannot_be_created():
+    class Incomplete(ModelBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_warmup_runs_each_batch_size_through_the_transform():
+    backend = RecordingBackend()
+    backend.warmup(400, batch_sizes=(1, 4), runs=2, transform=lambda batch: batch[:, :100])
+    assert backend.shapes == [(1, 100), (1, 100), (4, 100), (4, 100)]
+
+
+def test_missing_model_file_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="not found"):
+        load_backend(str(tmp_path / "missing.onnx"))
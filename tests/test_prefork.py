@@ -0,0 +1,101 @@
+"""Tests for pre-fork worker roles and job recovery across worker restarts."""
+import asyncio
+import logging
+
+import pytest
+
+from app import prefork
+from app.services.job_queue import JobQueue
+from app.services.job_store import JOB_RUNNING, Job, SQLiteJobStore
+from config.settings import settings
+
+
+@pytest.mark.parametrize("index, respawned, primary", [(None, False, True), (0, False, True), (0, True, False), (1, False, False)])
+def test_only_the_first_start_of_worker_zero_is_primary(monkeypatch, index, respawned, primary):
+    monkeypatch.setattr(prefork, "_worker_index", index)
+    monkeypatch.setattr(prefork, "_respawned", respawned)
+    assert prefork.is_primary_worker() is primary
+    assert prefork.worker_index() == index
+
+
+def test_memory_job_store_is_replaced_for_several_workers(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "JOBS_ENABLED", True)
+    monkeypatch.setattr(settings, "JOBS_STORE", "memory")
+    prefork.share_job_store(1)
+    assert settings.JOBS_STORE == "memory"
+
+    with caplog.at_level(logging.WARNING, logger=prefork.__name__):
+        prefork.share_job_store(4)
+    assert settings.JOBS_STORE == "sqlite"
+    assert "JOBS_STORE=memory" in caplog.text
+
+
+def test_restarted_worker_resumes_only_its_own_jobs(tmp_path):
+    started = []
+
+    async def run_job(job):
+        started.append(job.audio_url)
+        return {}
+
+    async def run():
+        path = str(tmp_path / "jobs.db")
+        store = SQLiteJobStore(path)
+        for worker in (1, 2):
+            await store.save(Job(audio_url=f"https://example.com/{worker}.wav", owner="key", worker=worker))
+        await store.save(Job(audio_url="https://example.com/2b.wav", owner="key", worker=2, status=JOB_RUNNING))
+        store.close()
+
+        queue = JobQueue(SQLiteJobStore(path), run_job, worker=2)
+        await queue.start(recover=True, only_own=True)
+        await asyncio.sleep(0.1)
+        unfinished = await queue.store.list_unfinished()
+        await queue.stop()
+        assert sorted(started) == ["https://example.com/2.wav", "https://example.com/2b.wav"]
+        assert [job.audio_url for job in unfinished] == ["https://example.com/1.wav"]
+
+    asyncio.run(run())
+
+
+def test_recovered_jobs_are_taken_over_by_the_recovering_worker(tmp_path):
+    async def run():
+        path = str(tmp_path / "jobs.db")
+        store = SQLiteJobStore(path)
+        job = Job(audio_url="https://example.com/a.wav", owner="key", worker=3)
+        await store.save(job)
+        store.close()
+
+        # Worker 0 resumes everything, but is stopped before running the job
+        queue = JobQueue(SQLiteJobStore(path), lambda job: asyncio.sleep(10), workers=1, worker=0)
+        await queue.start(recover=True)
+        await asyncio.sleep(0.05)
+        await queue.stop()
+
+        store = SQLiteJobStore(path)
+        assert (await store.get(job.job_id)).worker == 0
+        store.close()
+
+    asyncio.run(run())
+
+
+def test_first_worker_leaves_jobs_queued_since_the_server_started(tmp_path):
+    async def run():
+        path = str(tmp_path / "jobs.db")
+        store = SQLiteJobStore(path)
+        old = Job(audio_url="https://example.com/old.wav", owner="key", worker=1, created_at=100.0)
+        new = Job(audio_url="https://example.com/new.wav", owner="key", worker=1, created_at=200.0)
+        for job in (old, new):
+            await store.save(job)
+        store.close()
+
+        queue = JobQueue(SQLiteJobStore(path), lambda job: asyncio.sleep(10), workers=1, worker=0)
+        await queue.start(recover=True, created_before=150.0)
+        assert queue._owners == {old.job_id: "key"}
+        await queue.stop()
+
+        store = SQLiteJobStore(path)
+        assert (await store.get(old.job_id)).worker == 0
+        assert (await store.get(new.job_id)).worker == 1
+        store.close()
+
+    asyncio.run(run())
+
@@ -0,0 +1,155 @@
+"""Tests for the sampling profiler, the slow-request log, X-Trace and the /admin endpoints."""
+import base64
+import threading
+import time
+
+import pytest
+
+from benchmarks.common import encode_clip
+from app.services.metrics import RequestTrace
+from app.services.profiler import SamplingProfiler, SlowRequestLog
+from tests.conftest import API_HEADERS
+
+ADMIN_KEY = "test-admin-key"
+ADMIN_HEADERS = {"Authorization": f"Bearer {ADMIN_KEY}"}
+
+
+def spin_until_profiled(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def run_threads(*targets):
+    stop = threading.Event()
+    threads = [threading.Thread(target=target, args=(stop,), name=target.__name__) for target in targets]
+    for thread in threads:
+        thread.start()
+    return stop, threads
+
+
+def test_profiler_collects_collapsed_stacks_of_busy_threads():
+    stop, threads = run_threads(spin_until_profiled, threading.Event.wait)
+    profiler = SamplingProfiler()
+    try:
+        profiler.start(0.002, max_seconds=10)
+        with pytest.raises(RuntimeError, match="already running"):
+            profiler.start(0.002, max_seconds=10)
+        time.sleep(0.1)
+        stacks = profiler.stop()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    assert profiler.samples > 0
+    lines = stacks.splitlines()
+    busy = [line for line in lines if line.startswith("spin_until_profiled;")]
+    assert busy and all("spin_until_profiled (tests/test_profiler.py:" in line for line in busy)
+    # Threads blocked waiting are left out by default
+    assert not any(line.startswith("wait;") for line in lines)
+    counts = [int(line.rsplit(" ", 1)[1]) for line in lines]
+    assert counts == sorted(counts, reverse=True)
+
+    with pytest.raises(RuntimeError, match="not running"):
+        profiler.stop()
+
+
+def test_profiler_can_include_idle_threads():
+    stop, threads = run_threads(threading.Event.wait)
+    profiler = SamplingProfiler()
+    try:
+        profiler.start(0.002, max_seconds=10, idle=True)
+        time.sleep(0.05)
+        stacks = profiler.stop()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert any(line.startswith("wait;") for line in stacks.splitlines())
+
+
+def test_profiler_stops_by_itself_and_keeps_its_result():
+    profiler = SamplingProfiler()
+    profiler.start(0.001, max_seconds=0.05)
+    time.sleep(0.2)
+    assert not profiler.running
+    samples = profiler.samples
+    profiler.stop()
+    assert 0 < samples == profiler.samples
+
+
+def test_slow_request_log_keeps_recent_slow_requests():
+    log = SlowRequestLog(threshold_seconds=0.5, max_entries=2)
+    trace = RequestTrace()
+    trace.timings["decode"] = 0.4
+    trace.info["sample_rate"] = 8000
+    log.record("POST", "/detect-voice", 200, 0.1, trace)
+    for status in (200, 400, 503):
+        log.record("POST", "/detect-voice", status, 0.6, trace)
+
+    assert log.total == 3
+    entries = log.entries()
+    assert [entry["status"] for entry in entries] == [503, 400]
+    assert entries[0]["duration_ms"] == 600.0
+    assert entries[0]["stages_ms"] == {"decode": 400.0}
+    assert entries[0]["input"] == {"sample_rate": 8000}
+
+
+def detect(client, headers=None):
+    clip = base64.b64encode(encode_clip("wav", 1, 16000, 1)).decode()
+    return client.post(
+        "/detect-voice/base64",
+        headers={**API_HEADERS, **(headers or {})},
+        json={"language": "English", "audioFormat": "mp3", "audioBase64": clip}
+    )
+
+
+def test_trace_header_is_only_sent_when_asked_for(client):
+    assert "X-Trace" not in detect(client).headers
+    spans = detect(client, {"X-Trace": "1"}).headers["X-Trace"].split(", ")
+    stages = [span.split(";")[0] for span in spans]
+    assert "inference" in stages
+    assert all(";start=" in span and ";dur=" in span for span in spans)
+
+
+def test_admin_endpoints_are_hidden_without_an_admin_key(client):
+    assert client.get("/admin/slow-requests", headers=API_HEADERS).status_code == 404
+    assert client.post("/admin/profiler/start", headers=API_HEADERS).status_code == 404
+
+
+def test_admin_endpoints_reject_other_keys(client, monkeypatch):
+    from config.settings import settings
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", ADMIN_KEY)
+    assert client.get("/admin/slow-requests", headers=API_HEADERS).status_code == 401
+
+
+def test_profiler_endpoints(client, monkeypatch):
+    from config.settings import settings
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", ADMIN_KEY)
+
+    assert client.post("/admin/profiler/stop", headers=ADMIN_HEADERS).status_code == 409
+    started = client.post("/admin/profiler/start?interval_ms=2&seconds=10", headers=ADMIN_HEADERS)
+    assert started.status_code == 200
+    assert started.json()["status"] == "started"
+    assert client.post("/admin/profiler/start", headers=ADMIN_HEADERS).status_code == 409
+
+    detect(client)
+    stopped = client.post("/admin/profiler/stop", headers=ADMIN_HEADERS)
+    assert stopped.status_code == 200
+    assert stopped.headers["content-type"].startswith("text/plain")
+    assert int(stopped.headers["X-Profile-Samples"]) > 0
+
+
+def test_slow_requests_are_captured_with_their_input(client, monkeypatch):
+    from app import main
+    from config.settings import settings
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", ADMIN_KEY)
+    monkeypatch.setattr(main.slow_request_log, "threshold_seconds", 0.0)
+
+    assert detect(client).status_code == 200
+    response = client.get("/admin/slow-requests", headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    entry = next(e for e in response.json()["requests"] if e["endpoint"] == "/detect-voice/base64")
+    assert entry["status"] == 200
+    assert "inference" in entry["stages_ms"]
+    assert entry["input"]["bytes"] > 0
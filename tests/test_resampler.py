@@ -0,0 +1,75 @@
+"""Tests for resampling, pooled scratch buffers and the fused downmix/normalize step."""
+import threading
+
+import numpy as np
+import pytest
+
+from benchmarks.common import encode_clip
+from app.services import resampler
+from app.services.audio_preprocessor import AudioPreprocessor
+from app.services.buffer_pool import BufferPool
+from app.services.resampler import Resampler
+
+
+def tone(frequency: float, sample_rate: int, seconds: float = 1.0) -> np.ndarray:
+    return np.sin(2 * np.pi * frequency * np.arange(int(seconds * sample_rate)) / sample_rate).astype(np.float32)
+
+
+def dominant_frequency(audio: np.ndarray, sample_rate: int) -> float:
+    spectrum = np.abs(np.fft.rfft(audio))
+    return np.argmax(spectrum) * sample_rate / len(audio)
+
+
+@pytest.mark.parametrize("method", resampler.RESAMPLERS)
+def test_resampling_keeps_the_tone_and_the_input(method):
+    audio = tone(440, 44100)
+    original = audio.copy()
+    out = Resampler(16000, method).resample(audio, 44100)
+    assert out.dtype == np.float32
+    assert len(out) == 16000
+    assert dominant_frequency(out, 16000) == pytest.approx(440, abs=2)
+    np.testing.assert_array_equal(audio, original)
+
+
+def test_polyphase_filter_is_designed_once_per_rate_pair():
+    resampler._polyphase_filter.cache_clear()
+    polyphase = Resampler(16000, "polyphase")
+    for _ in range(3):
+        polyphase.resample(tone(440, 22050), 22050)
+    assert resampler._polyphase_filter.cache_info().misses == 1
+
+
+def test_same_rate_returns_a_copy():
+    audio = tone(440, 16000)
+    out = Resampler(16000).resample(audio, 16000)
+    assert out is not audio
+    np.testing.assert_array_equal(out, audio)
+
+
+def test_unknown_resampler_is_rejected():
+    with pytest.raises(ValueError, match="Unknown resampler"):
+        Resampler(16000, "linear")
+
+
+def test_buffer_pool_reuses_memory_per_name_and_thread():
+    pool = BufferPool()
+    first = pool.get("decode", (100, 2))
+    smaller = pool.get("decode", (50,))
+    assert first.shape == (100, 2) and smaller.shape == (50,)
+    assert np.shares_memory(first, smaller)
+    assert not np.shares_memory(first, pool.get("mono", (100,)))
+
+    other_thread = []
+    thread = threading.Thread(target=lambda: other_thread.append(pool.get("decode", (100, 2))))
+    thread.start()
+    thread.join()
+    assert not np.shares_memory(first, other_thread[0])
+
+
+def test_preprocessed_audio_is_normalized_mono_and_never_pooled():
+    preprocessor = AudioPreprocessor()
+    first = preprocessor.preprocess(encode_clip("wav", 1, 22050, 2, seed=1))
+    second = preprocessor.preprocess(encode_clip("wav", 1, 16000, 2, seed=2))
+    assert first.ndim == second.ndim == 1
+    assert max(first.max(), -first.min()) == pytest.approx(1.0, abs=1e-6)
+    assert not np.shares_memory(first, second)
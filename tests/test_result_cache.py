@@ -0,0 +1,101 @@
+"""Tests for the LRU result cache and its URL and content levels."""
+import pytest
+
+from app.services import result_cache
+from app.services.result_cache import LRUCache, ResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(result_cache.time, "monotonic", clock)
+    return clock
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = LRUCache("test", max_entries=2, max_bytes=10**6, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_budget_evicts_and_rejects_oversized_entries():
+    overhead = result_cache._ENTRY_OVERHEAD_BYTES
+    cache = LRUCache("test", max_entries=100, max_bytes=3 * (overhead + 100), ttl_seconds=60)
+    for key in "abcd":
+        cache.put(key, key, size_bytes=100)
+    assert len(cache) == 3
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 3 * (overhead + 100)
+
+    cache.put("huge", "x", size_bytes=10**6)
+    assert cache.get("huge") is None
+    assert len(cache) == 3
+
+
+def test_replacing_a_key_does_not_leak_its_size():
+    cache = LRUCache("test", max_entries=10, max_bytes=10**6, ttl_seconds=60)
+    cache.put("a", 1, size_bytes=500)
+    cache.put("a", 2, size_bytes=100)
+    assert cache.get("a") == 2
+    assert cache.stats()["bytes"] == 100 + result_cache._ENTRY_OVERHEAD_BYTES
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = LRUCache("test", max_entries=10, max_bytes=10**6, ttl_seconds=5)
+    cache.put("a", 1)
+    clock.now += 4.9
+    assert cache.get("a") == 1
+    clock.now += 0.2
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats()["bytes"] == 0
+
+
+def test_hit_and_miss_counters():
+    cache = LRUCache("test", max_entries=10, max_bytes=10**6, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+    cache.get("b", count=False)
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_results_are_keyed_by_model_version():
+    cache = ResultCache()
+    cache.put_result("hash", "1.0", "HUMAN", 0.9)
+    assert cache.get_result("hash", "1.0").prediction == "HUMAN"
+    assert cache.get_result("hash", "2.0") is None
+
+
+def test_validators_are_only_offered_while_the_result_is_cached():
+    cache = ResultCache()
+    url = "https://example.com/a.wav"
+    cache.store_url(url, '"etag"', None, "hash")
+    assert cache.get_validators(url, "1.0") is None
+
+    cache.put_result("hash", "1.0", "AI_GENERATED", 0.8)
+    validators = cache.get_validators(url, "1.0")
+    assert validators.etag == '"etag"'
+    assert validators.content_hash == "hash"
+    assert cache.get_validators(url, "2.0") is None
+
+
+def test_urls_without_validators_are_not_stored():
+    cache = ResultCache()
+    cache.store_url("https://example.com/a.wav", None, None, "hash")
+    assert len(cache.urls) == 0
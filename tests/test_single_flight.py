@@ -0,0 +1,117 @@
+"""Tests for single-flight execution of concurrent identical calls."""
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+class Work:
+    """Counts executions; each waits for ``release`` and returns ``result``."""
+
+    def __init__(self, result="done"):
+        self.result = result
+        self.started = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.started += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+async def settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_calls_share_one_execution():
+    async def run():
+        flights = SingleFlight("test")
+        work = Work()
+        callers = [asyncio.create_task(flights.run("key", work)) for _ in range(3)]
+        await settle()
+        assert len(flights) == 1
+        work.release.set()
+        assert await asyncio.gather(*callers) == ["done"] * 3
+        assert work.started == 1
+        assert len(flights) == 0
+
+        # Finished work is not cached
+        assert await flights.run("key", work) == "done"
+        assert work.started == 2
+
+    asyncio.run(run())
+
+
+def test_different_keys_run_separately():
+    async def run():
+        flights = SingleFlight("test")
+        work = Work()
+        work.release.set()
+        await asyncio.gather(flights.run("a", work), flights.run("b", work))
+        assert work.started == 2
+
+    asyncio.run(run())
+
+
+def test_errors_reach_every_caller():
+    async def run():
+        flights = SingleFlight("test")
+        work = Work(ValueError("bad audio"))
+        callers = [asyncio.create_task(flights.run("key", work)) for _ in range(2)]
+        await settle()
+        work.release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+
+    asyncio.run(run())
+
+
+def test_cancelled_first_caller_does_not_cancel_the_others():
+    async def run():
+        flights = SingleFlight("test")
+        work = Work()
+        first = asyncio.create_task(flights.run("key", work))
+        await settle()
+        second = asyncio.create_task(flights.run("key", work))
+        await settle()
+
+        first.cancel()
+        await settle()
+        assert not work.cancelled
+        work.release.set()
+        assert await second == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert work.started == 1
+
+    asyncio.run(run())
+
+
+def test_work_is_cancelled_once_no_caller_is_left():
+    async def run():
+        flights = SingleFlight("test")
+        work = Work()
+        callers = [asyncio.create_task(flights.run("key", work)) for _ in range(2)]
+        await settle()
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await settle()
+        assert work.cancelled
+        assert len(flights) == 0
+
+        # A new caller starts fresh work instead of joining the cancelled one
+        fresh = Work()
+        fresh.release.set()
+        assert await flights.run("key", fresh) == "done"
+
+    asyncio.run(run())
@@ -0,0 +1,78 @@
+"""Tests for the bounded worker pools that run pipeline stages off the event loop."""
+import asyncio
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from benchmarks.common import encode_clip
+from app.services import stage_executor
+from app.services.stage_executor import StageExecutor, StageSaturatedError, run_preprocess
+
+
+def test_work_runs_off_the_event_loop():
+    async def run():
+        stage = StageExecutor("test", "thread", max_workers=2, max_queue=0)
+        try:
+            name = await stage.run(lambda: threading.current_thread().name)
+        finally:
+            stage.shutdown()
+        assert name.startswith("stage-test")
+
+    asyncio.run(run())
+
+
+def test_calls_beyond_workers_and_queue_are_rejected():
+    async def run():
+        stage = StageExecutor("test", "thread", max_workers=1, max_queue=1)
+        gate = threading.Event()
+        try:
+            running = [asyncio.ensure_future(stage.run(gate.wait, 5)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            assert stage.in_flight == 2
+            with pytest.raises(StageSaturatedError, match="test stage is saturated"):
+                await stage.run(gate.wait, 5)
+            gate.set()
+            await asyncio.gather(*running)
+            assert stage.in_flight == 0
+        finally:
+            gate.set()
+            stage.shutdown()
+
+    asyncio.run(run())
+
+
+def test_unknown_executor_kind_is_rejected():
+    with pytest.raises(ValueError, match="Unknown executor kind"):
+        StageExecutor("test", "fiber", 1, 0)
+
+
+def test_preprocessing_reports_timings_and_writes_the_cache_file(tmp_path):
+    path = str(tmp_path / "ab" / "clip.npy")
+    audio, timings, info = run_preprocess(encode_clip("wav", 1, 22050, 2), 30.0, path)
+    assert audio.dtype == np.float32
+    assert list(timings)[0] == "duration_check"
+    assert "decode" in timings
+    assert info["channels"] == 2
+    np.testing.assert_array_equal(np.load(path), audio)
+
+
+def test_preprocessing_rejects_clips_over_the_limit():
+    with pytest.raises(ValueError, match="exceeds 1.0"):
+        run_preprocess(encode_clip("wav", 2, 16000, 1), 1.0)
+
+
+def test_broken_process_pool_is_replaced():
+    async def run():
+        stage = StageExecutor("test", "process", max_workers=1, max_queue=0)
+        try:
+            broken = stage.executor
+            with pytest.raises(stage_executor.BrokenProcessPool):
+                await stage.run(os._exit, 1)
+            assert stage.executor is not broken
+            assert await stage.run(abs, -3) == 3
+        finally:
+            stage.shutdown()
+
+    asyncio.run(run())
@@ -0,0 +1,81 @@
+"""Tests for fast startup: lazy heavy imports, background warm-up and /ready."""
+import base64
+import subprocess
+import sys
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from benchmarks.common import encode_clip
+from app.services.inference_service import InferenceService
+from tests.conftest import API_HEADERS
+
+
+def test_importing_the_app_does_not_load_heavy_libraries():
+    heavy = ("soundfile", "scipy", "soxr", "torch", "onnxruntime", "audioread")
+    code = f"import sys, app.main; print([m for m in {heavy!r} if m in sys.modules])"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_not_ready_until_the_model_is_loaded(api_settings, monkeypatch):
+    from app.main import app
+    from app.middleware import auth
+
+    monkeypatch.setattr(auth, "_registry", None)
+    gate = threading.Event()
+    load = InferenceService.load
+
+    def slow_load(self):
+        gate.wait(10)
+        load(self)
+
+    monkeypatch.setattr(InferenceService, "load", slow_load)
+    clip = base64.b64encode(encode_clip("wav", 1, 16000, 1)).decode()
+    request = {"language": "English", "audioFormat": "mp3", "audioBase64": clip}
+
+    with TestClient(app) as client:
+        try:
+            assert client.get("/health").status_code == 200
+            assert client.get("/ready").json() == {"status": "starting"}
+            response = client.post("/detect-voice/base64", headers=API_HEADERS, json=request)
+            assert response.status_code == 503
+            assert "Retry-After" in response.headers
+        finally:
+            gate.set()
+
+        deadline = time.monotonic() + 30
+        while client.get("/ready").status_code != 200:
+            assert time.monotonic() < deadline, "API did not become ready"
+            time.sleep(0.02)
+        assert client.get("/ready").json()["status"] == "ready"
+        assert client.post("/detect-voice/base64", headers=API_HEADERS, json=request).status_code == 200
+
+
+def test_failed_warm_up_is_reported_by_health(api_settings, monkeypatch):
+    from app.main import app
+    from app.middleware import auth
+
+    monkeypatch.setattr(auth, "_registry", None)
+
+    def broken_load(self):
+        raise ValueError("Model file not found: /models/missing.onnx")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(InferenceService, "load", broken_load)
+        with TestClient(app) as client:
+            deadline = time.monotonic() + 30
+            while client.get("/health").status_code != 503:
+                assert time.monotonic() < deadline, "warm-up failure was not reported"
+                time.sleep(0.02)
+            health = client.get("/health").json()
+            assert health["status"] == "unhealthy"
+            assert "Model file not found" in health["error"]
+            ready = client.get("/ready")
+            assert ready.status_code == 503
+            assert ready.json()["status"] == "failed"
+
+    # A restarted app warms up afresh
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
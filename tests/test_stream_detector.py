@@ -0,0 +1,183 @@
+"""Tests for streaming detection: the rolling window session and the WebSocket endpoint."""
+import threading
+
+import numpy as np
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from benchmarks.common import encode_clip
+from app.services.stream_detector import StreamSession
+from tests.conftest import API_HEADERS
+
+SAMPLE_RATE = 16000
+
+
+def make_session(input_format="pcm_f32le", sample_rate=SAMPLE_RATE, channels=1, **overrides) -> StreamSession:
+    options = dict(
+        target_sr=SAMPLE_RATE,
+        window_seconds=2.0,
+        hop_seconds=0.5,
+        min_seconds=1.0,
+        stable_updates=3,
+        early_stop_confidence=0.9
+    )
+    options.update(overrides)
+    return StreamSession(input_format, sample_rate, channels, **options)
+
+
+def pcm_f32(seconds: float, value: float = 0.5) -> bytes:
+    return np.full(int(seconds * SAMPLE_RATE), value, dtype="<f4").tobytes()
+
+
+def test_first_verdict_after_min_seconds_then_every_hop():
+    session = make_session()
+    session.push(pcm_f32(0.9))
+    assert not session.due()
+    session.push(pcm_f32(0.1))
+    assert session.due()
+    session.take_window()
+    assert not session.due()
+    session.push(pcm_f32(0.4))
+    assert not session.due()
+    assert session.due(final=True)
+    session.push(pcm_f32(0.1))
+    assert session.due()
+
+
+def test_window_keeps_only_the_newest_audio():
+    session = make_session()
+    for value in (0.1, 0.2, 0.3, 0.4, 0.5):
+        session.push(pcm_f32(0.75, value))
+    window = session.take_window()
+    assert len(window) == 2 * SAMPLE_RATE
+    assert session.audio_seconds == pytest.approx(3.75)
+    # Peak-normalized: the newest chunk is the loudest, the oldest kept sample is from 0.3
+    assert window[-1] == pytest.approx(1.0, abs=1e-6)
+    assert window[0] == pytest.approx(0.3 / 0.5, abs=1e-6)
+
+
+def test_stereo_s16_is_downmixed():
+    session = make_session("pcm_s16le", channels=2)
+    frames = np.array([[16384, 0]] * SAMPLE_RATE, dtype="<i2")
+    assert session.push(frames.tobytes()) == SAMPLE_RATE
+    with pytest.raises(ValueError, match="whole number of frames"):
+        session.push(b"\x00\x00")
+
+
+def test_resampling_across_chunks_matches_one_pass():
+    tone = np.sin(2 * np.pi * 440 * np.arange(48000) / 48000).astype("<f4")
+    chunked = make_session(sample_rate=48000, window_seconds=1.0)
+    for start in range(0, len(tone), 4800):
+        chunked.push(tone[start:start + 4800].tobytes())
+    chunked.flush()
+    whole = make_session(sample_rate=48000, window_seconds=1.0)
+    whole.push(tone.tobytes())
+    whole.flush()
+    assert chunked.total_samples == whole.total_samples == SAMPLE_RATE
+    np.testing.assert_allclose(chunked.take_window(), whole.take_window(), atol=1e-5)
+
+
+def test_encoded_chunks_are_decoded():
+    session = make_session("encoded", sample_rate=None)
+    session.push(encode_clip("wav", 1.0, 8000, 1))
+    session.flush()
+    assert session.audio_seconds == pytest.approx(1.0, abs=0.01)
+    with pytest.raises(ValueError, match="sample rate changed"):
+        session.push(encode_clip("wav", 0.5, 22050, 1))
+
+
+def test_verdict_is_stable_after_agreeing_confident_updates():
+    session = make_session()
+    assert not session.record("AI_GENERATED", 0.95)
+    assert not session.record("AI_GENERATED", 0.97)
+    assert session.record("AI_GENERATED", 0.92)
+    assert not session.record("HUMAN", 0.99)
+    session = make_session()
+    for confidence in (0.95, 0.8, 0.95):
+        stable = session.record("HUMAN", confidence)
+    assert not stable
+
+
+@pytest.mark.parametrize("input_format, sample_rate, channels", [("opus", None, 1), ("pcm_s16le", None, 1), ("pcm_f32le", 16000, 0)])
+def test_invalid_parameters_are_rejected(input_format, sample_rate, channels):
+    with pytest.raises(ValueError):
+        make_session(input_format, sample_rate, channels)
+
+
+def stream_url(**params) -> str:
+    query = "&".join(f"{name}={value}" for name, value in {"format": "pcm_f32le", "sample_rate": SAMPLE_RATE, **params}.items())
+    return f"/detect-voice/stream?{query}"
+
+
+def test_stream_ends_with_a_final_verdict(client):
+    with client.websocket_connect(stream_url(), headers=API_HEADERS) as websocket:
+        websocket.send_bytes(pcm_f32(1.5, 0.1))
+        websocket.send_json({"type": "end"})
+        messages = []
+        while not messages or not messages[-1]["final"]:
+            message = websocket.receive_json()
+            assert message["type"] == "verdict"
+            messages.append(message)
+    assert messages[-1]["prediction"] in ("AI_GENERATED", "HUMAN")
+    assert messages[-1]["audio_seconds"] == pytest.approx(1.5)
+
+
+def test_chunks_are_decoded_off_the_event_loop(client, monkeypatch):
+    threads = []
+    push, flush = StreamSession.push, StreamSession.flush
+
+    def recording(method):
+        def wrapper(self, *args):
+            threads.append(threading.get_ident())
+            return method(self, *args)
+        return wrapper
+
+    monkeypatch.setattr(StreamSession, "push", recording(push))
+    monkeypatch.setattr(StreamSession, "flush", recording(flush))
+    with client.websocket_connect(stream_url(), headers=API_HEADERS) as websocket:
+        loop_thread = websocket.portal.call(threading.get_ident)
+        websocket.send_bytes(pcm_f32(1.5, 0.1))
+        websocket.send_json({"type": "end"})
+        while not websocket.receive_json()["final"]:
+            pass
+    assert len(threads) == 2
+    assert loop_thread not in threads
+
+
+def test_stream_holds_an_admission_slot_until_it_closes(client):
+    from app import main
+
+    with client.websocket_connect(stream_url(), headers=API_HEADERS) as websocket:
+        assert main.admission_controller.active == 1
+        assert main.stream_sessions == 1
+        websocket.send_json({"type": "end"})
+        assert websocket.receive_json()["type"] == "error"
+    assert main.admission_controller.active == 0
+    assert main.stream_sessions == 0
+
+
+def test_handshake_is_refused_when_streams_are_at_the_limit(client, monkeypatch):
+    from config.settings import settings
+    monkeypatch.setattr(settings, "STREAM_MAX_SESSIONS", 0)
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with client.websocket_connect(stream_url(), headers=API_HEADERS):
+            pass
+    assert refused.value.code == 1013
+
+
+def test_handshake_is_refused_when_admission_rejects_the_stream(client, monkeypatch):
+    from app import main
+    monkeypatch.setattr(main.admission_controller, "max_concurrent", 1)
+    monkeypatch.setattr(main.admission_controller, "max_queue", 0)
+    with client.websocket_connect(stream_url(), headers=API_HEADERS):
+        with pytest.raises(WebSocketDisconnect) as refused:
+            with client.websocket_connect(stream_url(), headers=API_HEADERS):
+                pass
+    assert refused.value.code == 1013
+
+
+def test_handshake_is_refused_for_invalid_parameters(client):
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with client.websocket_connect(stream_url(format="opus"), headers=API_HEADERS):
+            pass
+    assert refused.value.code == 1008
@@ -0,0 +1,109 @@
+"""Tests for the base64 and upload detection endpoints."""
+import base64
+
+import pytest
+
+from benchmarks.common import encode_clip
+from tests.conftest import API_HEADERS
+
+
+@pytest.fixture
+def small_uploads(api_settings, monkeypatch):
+    monkeypatch.setattr(api_settings, "UPLOAD_MAX_BYTES", 256 * 1024)
+
+
+def base64_request(data: bytes) -> dict:
+    return {"language": "English", "audioFormat": "mp3", "audioBase64": base64.b64encode(data).decode()}
+
+
+def test_base64_detection(small_uploads, client):
+    response = client.post("/detect-voice/base64", headers=API_HEADERS, json=base64_request(encode_clip("wav", 2, 16000, 1)))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["prediction"] in ("AI_GENERATED", "HUMAN")
+    assert body["language"] == "English"
+
+
+def test_base64_rejects_declared_oversize_body_without_reading_it(small_uploads, client):
+    consumed = []
+
+    def body():
+        consumed.append(True)
+        yield b"{}"
+
+    headers = {**API_HEADERS, "Content-Type": "application/json", "Content-Length": str(10 * 1024 * 1024)}
+    response = client.post("/detect-voice/base64", headers=headers, content=body())
+    assert response.status_code == 400
+    assert "size limit" in response.json()["detail"]
+    assert not consumed
+
+
+def test_base64_stops_reading_once_the_streamed_body_crosses_the_limit(small_uploads, client):
+    chunk = b"A" * 65536
+
+    def body():
+        yield b'{"language": "English", "audioFormat": "mp3", "audioBase64": "'
+        for _ in range(64):
+            yield chunk
+        yield b'"}'
+
+    headers = {**API_HEADERS, "Content-Type": "application/json"}
+    response = client.post("/detect-voice/base64", headers=headers, content=body())
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Request body exceeds")
+
+
+def test_base64_schema_errors_are_422(client):
+    response = client.post("/detect-voice/base64", headers=API_HEADERS, json={"language": "English"})
+    assert response.status_code == 422
+    locations = {tuple(error["loc"]) for error in response.json()["detail"]}
+    assert ("body", "audioBase64") in locations
+
+    response = client.post(
+        "/detect-voice/base64", headers={**API_HEADERS, "Content-Type": "application/json"}, content=b"{not json"
+    )
+    assert response.status_code == 422
+
+
+def test_base64_rejects_invalid_audio(client):
+    response = client.post("/detect-voice/base64", headers=API_HEADERS, json=base64_request(b"not audio"))
+    assert response.status_code == 400
+
+
+def test_base64_request_body_is_documented(client):
+    schema = client.get("/openapi.json").json()
+    body = schema["paths"]["/detect-voice/base64"]["post"]["requestBody"]
+    assert "audioBase64" in body["content"]["application/json"]["schema"]["properties"]
+
+
+def test_raw_and_multipart_uploads(client):
+    clip = encode_clip("flac", 2, 22050, 2)
+    raw = client.post(
+        "/detect-voice/upload?language=Tamil",
+        headers={**API_HEADERS, "Content-Type": "audio/flac"},
+        content=clip
+    )
+    multipart = client.post("/detect-voice/upload", headers=API_HEADERS, files={"file": ("a.flac", clip, "audio/flac")})
+    assert raw.status_code == multipart.status_code == 200
+    assert raw.json()["language"] == "Tamil"
+    assert raw.json()["confidence"] == multipart.json()["confidence"]
+
+
+def test_upload_over_the_limit_is_rejected(small_uploads, client):
+    def body():
+        for _ in range(8):
+            yield b"\0" * 65536
+
+    response = client.post("/detect-voice/upload", headers={**API_HEADERS, "Content-Type": "audio/wav"}, content=body())
+    assert response.status_code == 400
+    assert "exceeds" in response.json()["detail"]
+
+
+def test_multipart_without_file_field(client):
+    response = client.post("/detect-voice/upload", headers=API_HEADERS, files={"other": ("a.wav", b"123", "audio/wav")})
+    assert response.status_code == 400
+    assert "'file'" in response.json()["detail"]
+
+
+def test_missing_api_key(client):
+    assert client.post("/detect-voice/upload", content=b"123").status_code in (401, 403)